@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Policy backtester for PeakPause
+Replays the rate-period and temperature-threshold policy over every minute of a
+date range in one NumPy batch, using recorded temperatures instead of the live
+sensor, then the flap guard over the minutes where the miner would change state,
+and reports mining hours, energy and cost per rate period.
+
+The thermal forecast and the profitability check are not simulated: they need
+the learned room model and live miner telemetry of the moment.
+"""
+
+import sys
+import csv
+import time
+from pathlib import Path
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("backtest.py needs NumPy: pip install numpy", file=sys.stderr)
+    raise
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import PeakPauseConfig, RatePeriod, TempThresholds, StartStopGuard, Decision, make_scheduler
+from decisions import ReasonCode
+
+PERIODS = list(RatePeriod)
+
+@dataclass
+class PeriodResult:
+    """Totals for one rate period"""
+    period: RatePeriod
+    hours: float          # Hours of the range in this period
+    mined_hours: float
+    kwh: float
+    cost: float           # Dollars
+
+@dataclass
+class BacktestResult:
+    """Outcome of a backtest run"""
+    start: datetime
+    end: datetime
+    minutes: int
+    periods: List[PeriodResult]
+    starts: int
+    stops: int
+    elapsed_ms: float     # Policy evaluation time, excluding CSV parsing
+    mining: np.ndarray    # Per-minute miner state from start, after the flap guard
+    policy: np.ndarray    # Per-minute decision before the flap guard
+    restarts_avoided: int
+
+    @property
+    def mined_hours(self) -> float:
+        return sum(p.mined_hours for p in self.periods)
+
+    @property
+    def kwh(self) -> float:
+        return sum(p.kwh for p in self.periods)
+
+    @property
+    def cost(self) -> float:
+        return sum(p.cost for p in self.periods)
+
+def _parse_timestamp(value: str) -> datetime:
+    """Local wall-clock time from epoch seconds or an ISO 8601 string"""
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        parsed = datetime.fromisoformat(value.strip())
+        return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def load_temperature_csv(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(local wall-clock seconds, °C) sorted by time from a timestamp,temperature CSV
+
+    Times stay in local wall-clock seconds, like the minute grid and the tariff.
+    A header row and unparseable rows (e.g. Home Assistant "unavailable") are skipped.
+    """
+    times, temps = [], []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                timestamp, temp = _parse_timestamp(row[0]), float(row[1])
+            except ValueError:
+                continue
+            times.append(timestamp)
+            temps.append(temp)
+
+    times = np.array(times, dtype="datetime64[s]").astype(np.int64).astype(np.float64)
+    temps = np.array(temps, dtype=np.float64)
+    order = np.argsort(times, kind="stable")
+    return times[order], temps[order]
+
+def minute_grid(start: datetime, end: datetime) -> np.ndarray:
+    """Local wall-clock minutes in [start, end) as datetime64[m]"""
+    return np.arange(np.datetime64(start, "m"), np.datetime64(end, "m"), dtype="datetime64[m]")
+
+def periods_and_rates(scheduler, minutes: np.ndarray, start: datetime,
+                      end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """(index into PERIODS, ¢/kWh) for every minute, from the scheduler's period segments"""
+    segments = scheduler.periods_between(start, end)
+    segment_starts = np.array([segment[0] for segment in segments], dtype="datetime64[m]")
+    segment_periods = np.array([PERIODS.index(period) for _, _, period in segments], dtype=np.int8)
+    segment_rates = np.array([scheduler.get_rate(period, segment_start)
+                              for segment_start, _, period in segments])
+
+    segment = np.searchsorted(segment_starts, minutes, side="right") - 1
+    return segment_periods[segment], segment_rates[segment]
+
+def tiered_rates(scheduler, minutes: np.ndarray, rates: np.ndarray, minute_kwh: np.ndarray) -> np.ndarray:
+    """Switch minutes to the tier-2 rate once the month's mining consumption passes the tier threshold"""
+    if not hasattr(scheduler, "tier2"):
+        return rates
+
+    rates = rates.copy()
+    months = minutes.astype("datetime64[M]")
+    for month in np.unique(months):
+        tier = scheduler.tier2(month.astype(datetime))
+        if tier is None:
+            continue
+        selected = months == month
+        used = np.cumsum(minute_kwh[selected])
+        rates[selected] = np.where(used > tier[1], tier[0], rates[selected])
+    return rates
+
+def temperatures_at(minutes: np.ndarray, times: np.ndarray, temps: np.ndarray,
+                    max_gap: float = 1800.0) -> np.ndarray:
+    """Linearly interpolated temperature per minute; NaN where the sensor had no data nearby"""
+    if len(times) == 0:
+        return np.full(len(minutes), np.nan)
+
+    seconds = minutes.astype("datetime64[s]").astype(np.int64).astype(np.float64)
+
+    values = np.interp(seconds, times, temps)
+    after = np.clip(np.searchsorted(times, seconds), 0, len(times) - 1)
+    before = np.clip(after - 1, 0, len(times) - 1)
+    nearest = np.minimum(np.abs(times[after] - seconds), np.abs(seconds - times[before]))
+    values[nearest > max_gap] = np.nan
+    return values
+
+def mining_mask(period_index: np.ndarray, rate: np.ndarray, temps: np.ndarray,
+                thresholds: TempThresholds, policy: Dict[str, Any],
+                cheapest_period: RatePeriod, hard_margin: float = 0.0) -> np.ndarray:
+    """PeakPause.evaluate for every minute at once"""
+    limit = np.array([getattr(thresholds, p.value) for p in PERIODS])[period_index] + hard_margin
+    cheapest = period_index == PERIODS.index(cheapest_period)
+    on_peak = period_index == PERIODS.index(RatePeriod.ON_PEAK)
+
+    have_temp = ~np.isnan(temps)
+    with np.errstate(invalid="ignore"):
+        run = have_temp & (temps <= limit)
+    if not policy["mine_on_peak"]:
+        run &= ~on_peak
+    else:
+        run &= ~(on_peak & (rate < policy["force_mine_threshold"]))
+
+    # Without a reading, only the cheapest period is mined
+    return np.where(have_temp, run, cheapest)
+
+def guarded_mask(run: np.ndarray, too_hot: np.ndarray, period_index: np.ndarray, rate: np.ndarray,
+                 temps: np.ndarray, thresholds: np.ndarray, guard_config: Dict[str, Any], start: datetime,
+                 hard_margin: float = 0.0, warm_resumes: bool = False) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """StartStopGuard applied to the per-minute decisions in order; returns (miner state, guard state)
+
+    The guard only sees minutes where the decision differs from the miner state,
+    and every minute while a hold is pending. A hysteresis hold skips ahead to the
+    first minute that could end it. With warm_resumes (control_mode api or freeze)
+    every start after the first resumes the paused miner, outside the restart budget.
+    """
+    state: Dict[str, Any] = {}
+    guard = StartStopGuard(guard_config, state)
+    n = len(run)
+    mining = np.zeros(n, dtype=bool)
+    wants_change = {False: np.flatnonzero(run), True: np.flatnonzero(~run)}
+    bands = np.array([guard.band(p) for p in PERIODS])[period_index]
+    with np.errstate(invalid="ignore"):
+        restart_possible = np.flatnonzero(~run | ~(temps > thresholds + hard_margin - bands))
+    first = start.timestamp()
+
+    def after(indices: np.ndarray, i: int) -> int:
+        k = np.searchsorted(indices, i)
+        return int(indices[k]) if k < len(indices) else n
+
+    running = launched = False
+    i = 0
+    while i < n:
+        j = i if "hold" in state else after(wants_change[running], i)
+        mining[i:j] = running
+        if j == n:
+            break
+
+        temp = None if np.isnan(temps[j]) else float(temps[j])
+        # Codes only matter to the guard as "too hot" or not
+        code = ReasonCode.TOO_HOT if too_hot[j] else ReasonCode.APPROVED if run[j] else ReasonCode.UNKNOWN
+        decision = Decision(bool(run[j]), "", PERIODS[period_index[j]], float(rate[j]), temp,
+                            float(thresholds[j]), code=code)
+        now = first + j * 60
+        warm = warm_resumes and launched
+        acted = guard.filter(decision, running, hard_margin, now, warm)
+        if acted.should_run != running:
+            guard.record(acted.should_run, running, acted, now, cold=not warm)
+            running = acted.should_run
+            launched = launched or running
+        mining[j] = running
+        i = j + 1
+
+        hold = state.get("hold")
+        if hold is not None and hold["code"] == ReasonCode.HYSTERESIS:
+            j = after(restart_possible, i)
+            mining[i:j] = running
+            i = j
+    return mining, state
+
+def backtest(config: Dict[str, Any], start: datetime, end: datetime,
+             times: np.ndarray, temps: np.ndarray, watts: float, max_gap: float = 1800.0) -> BacktestResult:
+    """Evaluate the configured policy for every minute in [start, end)"""
+    started = time.perf_counter()
+
+    scheduler = make_scheduler(config)
+    thresholds = TempThresholds(**config["temperature"]["thresholds"])
+    throttle = config.get("throttle", {})
+    hard_margin = throttle.get("hard_margin", 1.5) if throttle.get("enabled", False) else 0.0
+
+    minutes = minute_grid(start, end)
+    index, rate = periods_and_rates(scheduler, minutes, start, end)
+    minute_temps = temperatures_at(minutes, times, temps, max_gap)
+    policy = mining_mask(index, rate, minute_temps, thresholds, config["mining_policy"],
+                         scheduler.cheapest_period, hard_margin)
+    run, guard_state = policy, {}
+    guard_config = config.get("hysteresis", {})
+    if guard_config.get("enabled", False):
+        minute_thresholds = np.array([getattr(thresholds, p.value) for p in PERIODS])[index]
+        with np.errstate(invalid="ignore"):
+            too_hot = minute_temps > minute_thresholds + hard_margin
+        run, guard_state = guarded_mask(policy, too_hot, index, rate, minute_temps, minute_thresholds,
+                                        guard_config, start, hard_margin,
+                                        config["mining"].get("control_mode", "kill") in ("api", "freeze"))
+
+    minute_kwh = run * (watts / 60000)
+    minute_cost = minute_kwh * tiered_rates(scheduler, minutes, rate, minute_kwh) / 100
+    total_minutes = np.bincount(index, minlength=len(PERIODS))
+    mined_minutes = np.bincount(index, weights=run, minlength=len(PERIODS))
+    cost = np.bincount(index, weights=minute_cost, minlength=len(PERIODS))
+    changes = np.diff(run.astype(np.int8))
+
+    periods = []
+    for i, period in enumerate(PERIODS):
+        if not total_minutes[i]:
+            continue  # Not part of this tariff plan
+        periods.append(PeriodResult(period, total_minutes[i] / 60, mined_minutes[i] / 60,
+                                    mined_minutes[i] * watts / 60000, cost[i]))
+
+    return BacktestResult(start, end, len(minutes), periods,
+                          starts=int(np.count_nonzero(changes == 1)) + (int(run[0]) if len(run) else 0),
+                          stops=int(np.count_nonzero(changes == -1)),
+                          elapsed_ms=(time.perf_counter() - started) * 1000,
+                          mining=run, policy=policy, restarts_avoided=guard_state.get("avoided", 0))
+
+def print_report(result: BacktestResult, watts: float, config: Dict[str, Any]) -> None:
+    print(f"📊 Backtest {result.start:%Y-%m-%d} → {result.end:%Y-%m-%d} "
+          f"({result.minutes:,} minutes at {watts:.0f} W, evaluated in {result.elapsed_ms:.0f} ms)")
+    print(f"{'Period':18} {'Hours':>8} {'Mined h':>9} {'kWh':>9} {'Cost $':>9}")
+    for p in result.periods:
+        print(f"{p.period.value:18} {p.hours:8.0f} {p.mined_hours:9.1f} {p.kwh:9.1f} {p.cost:9.2f}")
+    print(f"{'total':18} {result.minutes / 60:8.0f} {result.mined_hours:9.1f} {result.kwh:9.1f} {result.cost:9.2f}")
+    if result.kwh:
+        print(f"Average rate: {result.cost * 100 / result.kwh:.2f}¢/kWh")
+    print(f"Starts: {result.starts}, stops: {result.stops}")
+    if config.get("hysteresis", {}).get("enabled", False):
+        print(f"Flap guard: {result.restarts_avoided} restarts avoided")
+    skipped = [name for name in ("thermal", "profitability") if config.get(name, {}).get("enabled", False)]
+    if skipped:
+        print(f"Not simulated: {', '.join(skipped)}")
+
+def one_year_after(start: datetime) -> datetime:
+    """The same date and time a year later; February 29 becomes February 28"""
+    try:
+        return start.replace(year=start.year + 1)
+    except ValueError:
+        return start.replace(year=start.year + 1, day=28)
+
+def main():
+    """Main entry point for the backtester"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest the PeakPause mining policy")
+    parser.add_argument("temperature_csv", help="CSV of timestamp,temperature (epoch or ISO local time)")
+    parser.add_argument("--config", default=str(script_dir / "peakpause_config.json"), help="Config file path")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Start date (default: first reading)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="End date (default: one year after start)")
+    parser.add_argument("--watts", type=float, default=150.0, help="Miner power draw in watts")
+    parser.add_argument("--max-gap", type=float, default=30.0,
+                        help="Minutes from the nearest reading before treating the sensor as missing")
+    parser.add_argument("--threshold", action="append", default=[], metavar="PERIOD=°C",
+                        help="Override a temperature threshold, e.g. mid_peak=26")
+    parser.add_argument("--mine-on-peak", action="store_true", help="Override mining_policy.mine_on_peak")
+
+    args = parser.parse_args()
+
+    config = PeakPauseConfig(args.config).config
+    for override in args.threshold:
+        period, _, value = override.partition("=")
+        config["temperature"]["thresholds"][RatePeriod(period).value] = float(value)
+    if args.mine_on_peak:
+        config["mining_policy"]["mine_on_peak"] = True
+
+    times, temps = load_temperature_csv(args.temperature_csv)
+    first = times[0].astype("datetime64[s]").item() if len(times) else datetime.now()
+    start = args.start or first.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = args.end or one_year_after(start)
+
+    result = backtest(config, start, end, times, temps, args.watts, args.max_gap * 60)
+    print_report(result, args.watts, config)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
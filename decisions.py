@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Reason codes and actions for PeakPause decisions
+Small integers stored with every decision, in the journal and the fleet payload.
+"""
+
+from enum import IntEnum
+
+class ReasonCode(IntEnum):
+    """Why the policy decided to mine or not"""
+    UNKNOWN = 0
+    APPROVED = 1                 # Temperature and rate allow mining
+    NO_SENSOR_CHEAPEST = 2       # No reading, cheapest period
+    NO_SENSOR_BLOCKED = 3        # No reading, any other period
+    TOO_HOT = 4
+    ON_PEAK_POLICY = 5           # mine_on_peak is off
+    ON_PEAK_RATE = 6             # Rate below force_mine_threshold
+    NOT_PROFITABLE = 7           # Revenue below min_profit_margin times the rate
+    PROFIT_FORCED = 8            # Revenue above force_mine_threshold on peak
+    FLEET_HOLD = 9
+    HYSTERESIS = 10              # Start held until the room is a band below the limit
+    MIN_RUN = 11                 # Temperature stop held for the minimum run time
+    MIN_OFF = 12                 # Start held for the minimum off time
+    RESTART_BUDGET = 13          # Start held, the restart cost budget is spent
+    PREWARM = 14                 # Started early so the miner is hashing when a cheaper period begins
+
+class Action(IntEnum):
+    """What the controller did with the decision"""
+    CONTINUE = 0                 # Already mining
+    IDLE = 1                     # Already stopped
+    START = 2
+    STOP = 3
+    DEFER = 4                    # Start held back by the fleet ramp window
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Fleet coordination for PeakPause
+One coordinator evaluates the mining decision and broadcasts it over UDP multicast
+with a time-to-live; agents apply it instead of reading the sensor themselves and
+fall back to their own decision when it expires.
+"""
+
+import hmac
+import json
+import time
+import socket
+import hashlib
+import logging
+import threading
+from typing import Optional, Callable, Tuple, Dict, Any
+
+from temperature_stream import multicast_sender, multicast_receiver
+
+DEFAULT_FLEET_GROUP = "239.255.48.92"  # Not the sensor readings' group, so agents never see those
+DEFAULT_FLEET_PORT = 48912
+PROTOCOL_VERSION = 1
+
+def encode_message(payload: Dict[str, Any], key: Optional[bytes] = None) -> bytes:
+    """JSON body, followed by an HMAC-SHA256 line when a shared key is set"""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    if key:
+        body += b"\n" + hmac.new(key, body, hashlib.sha256).hexdigest().encode()
+    return body
+
+def decode_message(datagram: bytes, key: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+    """Payload of a valid message, or None if it is malformed or fails authentication"""
+    body, _, signature = datagram.partition(b"\n")
+    if key:
+        expected = hmac.new(key, body, hashlib.sha256).hexdigest().encode()
+        if not hmac.compare_digest(signature, expected):
+            return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or payload.get("v") != PROTOCOL_VERSION:
+        return None
+    return payload
+
+def _key(config: Dict[str, Any]) -> Optional[bytes]:
+    return config["key"].encode() if config.get("key") else None
+
+class FleetCoordinator:
+    """Broadcasts the current decision and repeats it until it is replaced
+
+    Repeating every broadcast_interval lets short-lived cron agents catch a
+    decision while they wait for it.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.address = (config.get("group", DEFAULT_FLEET_GROUP), config.get("port", DEFAULT_FLEET_PORT))
+        self.ttl = config.get("ttl", 660)
+        self.broadcast_interval = config.get("broadcast_interval", 5.0)
+        self.hold = config.get("hold", False)  # Fleet-wide stop, e.g. for breaker work
+        self.key = _key(config)
+        self.name = config.get("name") or socket.gethostname()
+        self.sock = multicast_sender(config.get("multicast_ttl", 1), config.get("interface", "0.0.0.0"))
+        self.seq = 0
+        self._message = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self, decision: Dict[str, Any]) -> None:
+        """Broadcast a decision now and keep repeating it in the background"""
+        self.seq += 1
+        payload = dict(decision, v=PROTOCOL_VERSION, coordinator=self.name, seq=self.seq,
+                       issued=time.time(), ttl=self.ttl)
+        self._message = encode_message(payload, self.key)
+        self._send()
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._repeat, name="fleet-coordinator", daemon=True)
+            self._thread.start()
+
+    def _send(self) -> None:
+        try:
+            self.sock.sendto(self._message, self.address)
+        except OSError as e:
+            logging.warning(f"Fleet broadcast failed: {e}")
+
+    def _repeat(self) -> None:
+        while not self._stop.wait(self.broadcast_interval):
+            self._send()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.sock.close()
+
+class FleetAgent:
+    """Listens for coordinator decisions and keeps the newest one until its TTL runs out"""
+
+    def __init__(self, config: Dict[str, Any], on_change: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.group = config.get("group", DEFAULT_FLEET_GROUP)
+        self.port = config.get("port", DEFAULT_FLEET_PORT)
+        self.interface = config.get("interface", "0.0.0.0")
+        self.initial_wait = config.get("initial_wait", 6.0)
+        self.key = _key(config)
+        self.on_change = on_change
+        self._condition = threading.Condition()
+        self._latest: Optional[Tuple[Dict[str, Any], float]] = None  # (payload, expires)
+        self._last_seq: Dict[str, Tuple[float, int]] = {}
+        self._stop = threading.Event()
+        self._waited = False
+        self._thread = None
+
+    def start(self) -> "FleetAgent":
+        if self._thread is None:
+            self._sock = multicast_receiver(self.group, self.port, self.interface)
+            self._thread = threading.Thread(target=self._run, name="fleet-agent", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """Newest unexpired decision; the first call waits briefly for a broadcast"""
+        with self._condition:
+            if self._latest is None and not self._waited:
+                self._waited = True
+                self._condition.wait_for(lambda: self._latest is not None, self.initial_wait)
+            if self._latest is None or time.time() > self._latest[1]:
+                return None
+            return self._latest[0]
+
+    def _accept(self, payload: Dict[str, Any], received: float) -> bool:
+        """Reject replays: each coordinator's (issued, seq) must move forward"""
+        try:
+            position = (float(payload["issued"]), int(payload["seq"]))
+            ttl = float(payload["ttl"])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        coordinator = str(payload.get("coordinator"))
+        if position <= self._last_seq.get(coordinator, (0.0, 0)):
+            return False
+        # Expire by the earlier of the coordinator's and our own clock
+        expires = min(position[0], received) + ttl
+        if expires < received:
+            return False
+
+        self._last_seq[coordinator] = position
+        with self._condition:
+            previous = self._latest[0] if self._latest else None
+            self._latest = (payload, expires)
+            self._condition.notify_all()
+        if self.on_change and (previous is None or previous.get("should_run") != payload.get("should_run")):
+            self.on_change(payload)
+        return True
+
+    def _run(self) -> None:
+        with self._sock as sock:
+            logging.info(f"Listening for fleet decisions on {self.group}:{self.port}")
+            while not self._stop.is_set():
+                try:
+                    datagram = sock.recv(4096)
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    logging.warning(f"Fleet listener error: {e}")
+                    self._stop.wait(1.0)
+                    continue
+
+                payload = decode_message(datagram, self.key)
+                if payload is not None:
+                    try:
+                        self._accept(payload, time.time())
+                    except Exception as e:
+                        logging.warning(f"Fleet decision rejected: {e}")
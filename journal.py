@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Decision journal for PeakPause
+Every cycle's decision is appended to a binary file as one fixed-width record
+(32 bytes, about 3.4 MB per year at a 5-minute interval), so years of history
+can be memory-mapped and summarised in milliseconds instead of grepping the
+rotating text log.
+"""
+
+import os
+import sys
+import math
+import mmap
+import struct
+import logging
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+from decisions import ReasonCode, Action
+
+MAGIC = b"PPJOURNAL1\0\0\0\0\0\0"
+# timestamp, period, action, reason code, flags, rate, temperature, threshold, cycle ms, reserved
+RECORD = struct.Struct("<dBBBBffffI")
+HEADER = struct.Struct(f"<{len(MAGIC)}sI")
+
+# Index stored in the record; values match peakpause.RatePeriod
+PERIODS = ("ultra_low", "weekend_off_peak", "mid_peak", "on_peak", "off_peak")
+
+# Record flags
+SHOULD_RUN = 1
+MINING = 2                       # Miner hashing after the action
+STALE = 4                        # Temperature reading older than the cache TTL
+FLEET = 8                        # Decision taken from the fleet coordinator
+
+def journal_path(config_file: str, journal_config: Dict[str, Any]) -> str:
+    """The journal file; a relative path is next to the config file, not in whatever directory cron started in"""
+    return str(Path(config_file).parent / journal_config.get("file", "peakpause_journal.bin"))
+
+class JournalWriter:
+    """Appends records; a torn record left by a crash is dropped before the next append"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, timestamp: float, period: str, action: Action, code: int, flags: int, rate: float,
+               temperature: Optional[float], threshold: Optional[float], cycle_ms: float) -> bool:
+        record = RECORD.pack(timestamp, PERIODS.index(period), action, code, flags, rate,
+                             math.nan if temperature is None else temperature,
+                             math.nan if threshold is None else threshold, cycle_ms, 0)
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        except OSError as e:
+            logging.warning(f"Could not open journal {self.path}: {e}")
+            return False
+
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER.size:
+                os.ftruncate(fd, 0)
+                os.write(fd, HEADER.pack(MAGIC, RECORD.size))
+            else:
+                magic, record_size = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+                if magic != MAGIC or record_size != RECORD.size:
+                    logging.warning(f"{self.path} is not a compatible journal, not writing")
+                    return False
+                torn = (size - HEADER.size) % RECORD.size
+                if torn:
+                    os.ftruncate(fd, size - torn)
+            os.write(fd, record)
+            return True
+        except OSError as e:
+            logging.warning(f"Could not write journal {self.path}: {e}")
+            return False
+        finally:
+            os.close(fd)
+
+class Journal:
+    """Read-only memory-mapped view of a journal file, queried with NumPy"""
+
+    def __init__(self, path: str):
+        import numpy as np
+        self.np = np
+        self.dtype = np.dtype([("time", "<f8"), ("period", "u1"), ("action", "u1"), ("code", "u1"),
+                               ("flags", "u1"), ("rate", "<f4"), ("temperature", "<f4"),
+                               ("threshold", "<f4"), ("cycle_ms", "<f4"), ("reserved", "<u4")])
+        assert self.dtype.itemsize == RECORD.size
+
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        count = max(0, (size - HEADER.size) // RECORD.size)
+        if size >= HEADER.size:
+            magic, record_size = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"{path} is not a compatible journal")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+        self.records = (np.frombuffer(self._map, self.dtype, count, HEADER.size) if count
+                        else np.zeros(0, self.dtype))
+
+    def close(self) -> None:
+        self.records = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # Arrays taken from records still use it; unmapped when they are freed
+        self._file.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def between(self, start: datetime, end: datetime):
+        """Records in [start, end), found by binary search on the timestamps"""
+        times = self.records["time"]
+        lo, hi = self.np.searchsorted(times, [start.timestamp(), end.timestamp()])
+        return self.records[lo:hi]
+
+    def summary(self, start: datetime, end: datetime, max_gap: float = 900.0) -> Dict[str, Any]:
+        """Mining hours per period, starts/stops, flaps, reason counts and cycle latency for [start, end)
+
+        Each record's state lasts until the next record, at most max_gap seconds (the
+        controller was not running for longer gaps). A flap is a mining run or stop
+        shorter than 30 minutes.
+        """
+        np = self.np
+        records = self.between(start, end)
+        result = {"records": len(records), "mining_hours": {}, "hours": {}, "starts": 0, "stops": 0,
+                  "flaps": 0, "reasons": {}, "cycle_ms_p50": None, "cycle_ms_p99": None}
+        if not len(records):
+            return result
+
+        times = records["time"]
+        following = np.append(times[1:], min(end.timestamp(), times[-1] + max_gap))
+        durations = np.minimum(following - times, max_gap)
+        mining = (records["flags"] & MINING) != 0
+        for i, name in enumerate(PERIODS):
+            in_period = records["period"] == i
+            if in_period.any():
+                result["hours"][name] = float(durations[in_period].sum() / 3600)
+                result["mining_hours"][name] = float(durations[in_period & mining].sum() / 3600)
+
+        actions = records["action"]
+        result["starts"] = int(np.count_nonzero(actions == Action.START))
+        result["stops"] = int(np.count_nonzero(actions == Action.STOP))
+        changes = times[(actions == Action.START) | (actions == Action.STOP)]
+        result["flaps"] = int(np.count_nonzero(np.diff(changes) < 1800))
+
+        codes, counts = np.unique(records["code"], return_counts=True)
+        result["reasons"] = {ReasonCode(code).name: int(count) for code, count in zip(codes, counts)}
+        result["cycle_ms_p50"], result["cycle_ms_p99"] = (float(v) for v in
+                                                          np.percentile(records["cycle_ms"], [50, 99]))
+        return result
+
+def _day(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+def main():
+    """Summarise the decision journal over a date range"""
+    import time
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the PeakPause decision journal")
+    parser.add_argument("--config", default=str(Path(__file__).parent.absolute() / "peakpause_config.json"),
+                        help="Config file whose journal section names the file")
+    parser.add_argument("--file", help="Journal file (default: journal.file from the config)")
+    parser.add_argument("--since", type=_day, help="Start (ISO date/time)")
+    parser.add_argument("--until", type=_day, help="End (ISO date/time, default now)")
+    parser.add_argument("--yesterday", action="store_true")
+    parser.add_argument("--last-month", action="store_true", help="The previous calendar month")
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        try:
+            with open(args.config) as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Cannot read config {args.config}: {e}", file=sys.stderr)
+            return 1
+        path = journal_path(args.config, config.get("journal", {}))
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if args.yesterday:
+        start, end = today - timedelta(days=1), today
+    elif args.last_month:
+        end = today.replace(day=1)
+        start = (end - timedelta(days=1)).replace(day=1)
+    else:
+        end = args.until or datetime.now()
+        start = args.since or end - timedelta(days=1)
+
+    started = time.perf_counter()
+    with Journal(path) as journal:
+        result = journal.summary(start, end)
+        total = len(journal)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"📒 {start:%Y-%m-%d %H:%M} → {end:%Y-%m-%d %H:%M}: {result['records']:,} of {total:,} decisions "
+          f"({elapsed_ms:.1f} ms)")
+    print(f"{'Period':18} {'Hours':>8} {'Mined h':>9}")
+    for name, hours in result["hours"].items():
+        print(f"{name:18} {hours:8.1f} {result['mining_hours'][name]:9.1f}")
+    print(f"Starts: {result['starts']}, stops: {result['stops']}, flaps (<30 min): {result['flaps']}")
+    for name, count in sorted(result["reasons"].items(), key=lambda item: -item[1]):
+        print(f"  {name:20} {count:6}")
+    if result["cycle_ms_p50"] is not None:
+        print(f"Cycle time: p50 {result['cycle_ms_p50']:.1f} ms, p99 {result['cycle_ms_p99']:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for PeakPause
+A small registry of counters, gauges and histograms rendered in the Prometheus
+text format, served over HTTP by the daemon or written to a node_exporter
+textfile-collector file by cron runs. Counters and histograms can be saved in
+the controller state so they keep counting up across cron runs.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Tuple
+
+DEFAULT_METRICS_PORT = 9748
+
+# Seconds; sensor reads and decisions are milliseconds, miner stops can take the full stop_timeout
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for a named metric with optional labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples())
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1  # +Inf, which is also the observation count
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+class Registry:
+    """Metrics in registration order"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _add(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def state(self) -> Dict[str, Any]:
+        """Counter and histogram values as JSON-compatible data"""
+        saved = {}
+        for name, metric in self.metrics.items():
+            if isinstance(metric, (Counter, Histogram)):
+                with metric._lock:
+                    saved[name] = [[list(key), value] for key, value in metric._values.items()]
+        return saved
+
+    def restore(self, saved: Dict[str, Any]) -> None:
+        """Load values from state(); histograms whose buckets changed start over"""
+        for name, values in saved.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            for key, value in values:
+                if isinstance(metric, Histogram):
+                    if len(value[0]) != len(metric.buckets) + 1:
+                        continue
+                    value = (list(value[0]), value[1])
+                metric._values[tuple(key)] = value
+
+def write_textfile(registry: Registry, path: str) -> None:
+    """Write the metrics atomically for node_exporter's textfile collector (*.prom)"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+class MetricsServer:
+    """Serves GET /metrics from a background thread"""
+
+    def __init__(self, registry: Registry, host: str = "127.0.0.1", port: int = DEFAULT_METRICS_PORT):
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        self.thread.start()
+        logging.info(f"Serving metrics on http://{self.httpd.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class ControllerMetrics:
+    """The metrics PeakPause exports"""
+
+    def __init__(self):
+        self.registry = r = Registry()
+        self.sensor_read = r.histogram("peakpause_sensor_read_seconds", "Temperature source read latency",
+                                       ("source",))
+        self.sensor_failures = r.counter("peakpause_sensor_failures_total", "Temperature reads without a value",
+                                         ("source",))
+        self.decision = r.histogram("peakpause_decision_seconds", "Time to reach a mining decision")
+        self.cycle = r.histogram("peakpause_cycle_seconds", "Wall-clock time of a controller cycle")
+        self.slow_cycles = r.counter("peakpause_slow_cycles_total", "Cycles slower than slow_cycle_seconds")
+        self.start_duration = r.histogram("peakpause_miner_start_seconds", "Time to start or resume the miner")
+        self.stop_duration = r.histogram("peakpause_miner_stop_seconds", "Time to stop or pause the miner")
+        self.starts = r.counter("peakpause_miner_starts_total", "Miner starts and resumes")
+        self.stops = r.counter("peakpause_miner_stops_total", "Miner stops and pauses")
+        self.duplicate_kills = r.counter("peakpause_duplicate_kills_total", "Untracked miner processes killed")
+        self.flaps = r.counter("peakpause_flaps_total", "Starts or stops shortly after the opposite change")
+        self.holds = r.counter("peakpause_holds_total", "Starts and stops held back by the flap guard", ("reason",))
+        self.restarts_avoided = r.counter("peakpause_restarts_avoided_total",
+                                          "Held starts or stops that were no longer wanted when the hold ended")
+        self.period = r.gauge("peakpause_rate_period", "1 for the current rate period", ("period",))
+        self.rate = r.gauge("peakpause_rate_cents_per_kwh", "Current electricity rate")
+        self.temperature = r.gauge("peakpause_temperature_celsius", "Temperature the decision used")
+        self.threshold = r.gauge("peakpause_threshold_celsius", "Temperature threshold for the current period")
+        self.mining = r.gauge("peakpause_mining", "1 while the miner is hashing")
+        self.duty_cycle = r.gauge("peakpause_duty_cycle", "Fraction of time spent mining, 24h exponential average")
+
+    DUTY_CYCLE_SECONDS = 86400
+
+    def update_duty_cycle(self, state: Dict[str, Any], mining: bool, now: Optional[float] = None) -> float:
+        """Exponentially weighted fraction of time mining; state is kept between runs"""
+        now = time.time() if now is None else now
+        last = state.get("time")
+        duty = state.get("value", 1.0 if mining else 0.0)
+        if last is not None and now > last:
+            weight = 1 - math.exp(-(now - last) / self.DUTY_CYCLE_SECONDS)
+            duty += weight * ((1.0 if state.get("mining") else 0.0) - duty)
+        state.update(value=duty, time=now, mining=mining)
+        self.duty_cycle.set(duty)
+        return duty
@@ -5,17 +5,40 @@ Modernized Python version with updated ULO rates and flexible temperature monito
 """
 
 import json
+import math
+import bisect
+import hashlib
+import statistics
 import subprocess
 import time
 import logging
 import os
+import fcntl
+import select
 import signal
 import socket
+import stat
+import tempfile
+import threading
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta, date
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable
+from dataclasses import dataclass, field, replace
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from temperature_stream import (LatestValue, TemperatureStream, HomeAssistantStream, ESPHomeEventStream,
+                                MulticastListener, DEFAULT_MULTICAST_GROUP, DEFAULT_MULTICAST_PORT)
+from fleet import FleetCoordinator, FleetAgent
+from telemetry import TelemetryCollector
+from profitability import ProfitabilityEstimator
+from xmrig_log import LogTailer
+from metrics import ControllerMetrics, MetricsServer, write_textfile, DEFAULT_METRICS_PORT
+from decisions import ReasonCode, Action
+from journal import JournalWriter, journal_path, SHOULD_RUN, MINING, STALE, FLEET
 from enum import Enum
 
 class RatePeriod(Enum):
@@ -23,6 +46,7 @@ class RatePeriod(Enum):
     WEEKEND_OFF_PEAK = "weekend_off_peak"  # 7.6¢/kWh - Weekends 7am-11pm
     MID_PEAK = "mid_peak"        # 12.2¢/kWh - Weekdays 7am-4pm, 9pm-11pm
     ON_PEAK = "on_peak"          # 28.4¢/kWh - Weekdays 4pm-9pm
+    OFF_PEAK = "off_peak"        # TOU nights/weekends, and all hours of a tiered plan
 
 @dataclass
 class ULORates:
@@ -39,12 +63,114 @@ class TempThresholds:
     weekend_off_peak: float = 28.0
     mid_peak: float = 25.0       # Moderate - medium cost
     on_peak: float = 20.0        # Most restrictive - expensive rate
+    off_peak: float = 28.0       # TOU and tiered plans
+
+@dataclass
+class CycleStats:
+    """Timing of a single controller cycle"""
+    started: datetime
+    wall_ms: float               # Wall-clock time spent in run_once
+    cpu_ms: float                # CPU time spent in run_once
+    cycle: int                   # Cycle number since start
+    phases: Dict[str, float] = field(default_factory=dict)  # Milliseconds per phase of the cycle
+
+@dataclass
+class Decision:
+    """Outcome of one mining decision"""
+    should_run: bool
+    reason: str
+    period: RatePeriod
+    rate: float
+    temperature: Optional[float] = None
+    threshold: Optional[float] = None
+    temperature_age: Optional[float] = None  # Seconds since the reading was taken
+    code: int = ReasonCode.UNKNOWN           # Why, for the decision journal
+    forecast: Optional[float] = None         # Temperature expected after the thermal model's horizon of mining
+
+@dataclass
+class TemperatureReading:
+    """A temperature value and when it was measured"""
+    value: float
+    timestamp: float             # Epoch seconds of the sensor read
+    source: str
+    
+    @property
+    def age(self) -> float:
+        """Seconds since the sensor was read"""
+        return max(0.0, time.time() - self.timestamp)
+
+@dataclass
+class SourceStats:
+    """Latency statistics for one temperature source"""
+    reads: int = 0
+    failures: int = 0
+    first_ms: Optional[float] = None   # First read, including connection setup
+    last_ms: Optional[float] = None
+    min_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    total_ms: float = 0.0
+    
+    def record(self, elapsed_ms: float, ok: bool) -> None:
+        self.reads += 1
+        if not ok:
+            self.failures += 1
+        if self.first_ms is None:
+            self.first_ms = elapsed_ms
+        self.last_ms = elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = elapsed_ms if self.max_ms is None else max(self.max_ms, elapsed_ms)
+        self.total_ms += elapsed_ms
+    
+    @property
+    def mean_ms(self) -> Optional[float]:
+        return self.total_ms / self.reads if self.reads else None
 
 class TemperatureSource(Enum):
     SOCKET_SERVER = "socket"
     HOMEKIT = "homekit"
     HTTP_API = "http"
     SYSTEM_THERMAL = "system"
+    HOMEASSISTANT_WS = "homeassistant_ws"   # Push: Home Assistant WebSocket subscription
+    ESPHOME_EVENTS = "esphome_events"       # Push: ESPHome /events stream
+    MULTICAST = "multicast"                 # Push: LAN broadcast from sensor_server.py
+
+def _atomic_write_json(path: str, data: Dict[str, Any], indent: Optional[int] = None,
+                       mode: Optional[int] = None) -> None:
+    """Write JSON so readers never see a partial file; mode defaults to mkstemp's 0600"""
+    # mkstemp picks an unpredictable name and refuses to follow a planted symlink
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.")
+    try:
+        if mode is not None:
+            os.fchmod(fd, mode)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _private_dir() -> str:
+    """$XDG_RUNTIME_DIR, or a 0700 per-user directory in the system temp directory"""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return runtime
+    path = os.path.join(tempfile.gettempdir(), f"peakpause-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory of this user")
+    return path
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    """Read a JSON state file, returning None if missing or corrupt"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
 class PeakPauseConfig:
     """Configuration management for PeakPause"""
@@ -67,7 +193,15 @@ class PeakPauseConfig:
             "mining": {
                 "executable": "./xmrig",
                 "config_file": "./config.json",
-                "log_file": "./xmrig.log"
+                "log_file": "./xmrig.log",
+                "pid_file": "./xmrig.pid",
+                "stop_timeout": 10.0,  # Seconds to wait for a clean exit before SIGKILL
+                "control_mode": "kill",  # kill, api (pause/resume via xmrig HTTP API), freeze (SIGSTOP/SIGCONT)
+                "freeze": {
+                    "min_available_mb": 1024,  # Stop for real if less memory is available
+                    "max_memory_pressure": 10.0,  # Stop for real above this PSI some avg10 (%)
+                    "max_frozen_seconds": 21600  # Restart instead of thawing after 6 hours
+                }
             },
             "temperature": {
                 "source": "socket",  # socket, homekit, http, system
@@ -76,18 +210,115 @@ class PeakPauseConfig:
                 "homekit_url": "",
                 "http_url": "",
                 "bias": 0.0,
+                "cache": {
+                    "enabled": False,  # Share one reading between runs and instances on this host
+                    "ttl": 60,  # Seconds a reading is used without re-reading the sensor
+                    "max_stale": 600,  # Serve older readings while refreshing, up to this age
+                    "stale_margin": 1.0  # Lower thresholds by this much (°C) for stale readings
+                },
                 "thresholds": {
                     "ultra_low": 30.0,
                     "weekend_off_peak": 28.0,
                     "mid_peak": 25.0,
-                    "on_peak": 20.0
+                    "on_peak": 20.0,
+                    "off_peak": 28.0
                 }
             },
-            "rates": {
-                "ultra_low": 2.8,
-                "weekend_off_peak": 7.6,
-                "mid_peak": 12.2,
-                "on_peak": 28.4
+            "tariff": {
+                "plan": "ulo",  # ulo, tou or tiered from tariffs.json; null to use a fixed "rates" section
+                "file": None  # Default: tariffs.json next to peakpause.py
+            },
+            "throttle": {
+                "enabled": False,  # Scale mining threads with temperature headroom
+                "kp": 0.25,  # Thread fraction per °C of headroom error
+                "ki": 0.02,  # Thread fraction per °C per minute
+                "target_headroom": 0.5,  # Aim to stay this far below the threshold (°C)
+                "hard_margin": 1.5,  # Stop completely this far over the threshold (°C)
+                "min_threads": 1,
+                "max_threads": None,  # Default: all CPUs
+                "min_change_interval": 300,  # Seconds between thread changes
+                "max_step": 2,  # Threads added/removed per change
+                "apply_via": "config"  # config (xmrig watches its config file) or api
+            },
+            "fleet": {
+                "role": "standalone",  # standalone, coordinator (decides for the fleet) or agent
+                "group": "239.255.48.92",  # Its own group: 239.255.48.91 carries sensor readings
+                "port": 48912,
+                "ttl": 660,  # Seconds an agent trusts a decision before deciding locally
+                "broadcast_interval": 5.0,  # Coordinator repeats its decision this often
+                "key": None,  # Shared secret for HMAC-signed decisions
+                "hold": False,  # Coordinator only: stop mining on every agent
+                "ramp_window": 0,  # Spread starts after a period change over this many seconds
+                "worker_name": None  # Stagger slot key; default: xmrig rig-id, then hostname
+            },
+            "miner_log": {
+                "enabled": True,  # Parse new xmrig log lines every cycle and rotate the log
+                "max_bytes": 10485760,  # Rotate xmrig.log at 10MB
+                "backup_count": 5,
+                "compress": True  # gzip rotated copies
+            },
+            "telemetry": {
+                "enabled": False,  # Record hashrate and shares from the xmrig HTTP API
+                "interval": 10,  # Seconds between samples in continuous mode
+                "file": "telemetry.bin",
+                "raw_samples": 360,  # Ring buffer sizes: 1 hour of raw samples,
+                "minute_samples": 10080,  # 7 days of minutes,
+                "hour_samples": 8784,  # and a year of hours
+                "stall_seconds": 900  # Warn when a running miner reports 0 H/s this long
+            },
+            "metrics": {
+                "enabled": False,  # Prometheus metrics
+                "listen": "127.0.0.1",
+                "port": 9748,  # /metrics endpoint while running continuously; null to disable
+                "textfile": None,  # Write e.g. /var/lib/node_exporter/textfile/peakpause.prom every cycle
+                "slow_cycle_seconds": 2.0  # Log a phase breakdown for slower cycles
+            },
+            "thermal": {
+                "enabled": True,  # Decide and throttle on a temperature forecast, not just the reading
+                "model": "first_order",  # first_order (learned heating/cooling) or slope (recent trend only)
+                "horizon_minutes": 15,  # Stop if mining is forecast to pass the limit within this time
+                "slope_window": 1800,  # Seconds of recent readings for the trend
+                "learning_half_life": 604800,  # Older heating/cooling observations fade over a week
+                "min_samples": 12  # Reading pairs per state before the learned model is used
+            },
+            "prewarm": {
+                "enabled": True,  # Launch xmrig early enough to be hashing when a cheaper period begins
+                "margin_seconds": 5,  # Added to the longest measured launch-to-hashing time
+                "max_seconds": 300,  # Never launch earlier than this before the period change
+                "samples": 5,  # Launch-to-hashing measurements kept
+                "idle_priority": True  # Run a pre-warming miner under SCHED_IDLE until the period begins
+            },
+            "hysteresis": {
+                "enabled": True,  # Hold back starts and stops that would make the miner flap
+                "bands": {  # After a temperature stop, restart only this far (°C) below the limit
+                    "ultra_low": 1.0,
+                    "weekend_off_peak": 1.0,
+                    "mid_peak": 1.0,
+                    "on_peak": 0.5,
+                    "off_peak": 1.0
+                },
+                "min_run_seconds": 900,  # Hold temperature stops this long after a start
+                "min_off_seconds": 600,  # Hold starts this long after a stop
+                "restart_cost_seconds": 30,  # Full-power RandomX dataset init per start
+                "restart_budget_seconds": 120,  # Restart cost allowed per budget_window
+                "budget_window": 3600,
+                "flap_seconds": 1800  # Runs or stops shorter than this count as flaps
+            },
+            "journal": {
+                "enabled": True,  # Append every decision to a binary journal (32 bytes each)
+                "file": "peakpause_journal.bin"  # Query with: python3 journal.py --last-month
+            },
+            "profitability": {
+                "enabled": False,  # Mine mid/on-peak only when revenue beats the rate by min_profit_margin
+                "source": "file",  # file (snapshot_file kept current by you), url, or module:function
+                "url": "",  # JSON with difficulty, block_reward and price
+                "snapshot_file": "profitability.json",
+                "refresh_interval": 3600,  # Seconds between fetches
+                "max_age": 86400,  # Ignore older snapshots and use the rate-only policy
+                "hashrate": None,  # H/s when telemetry has no measurement
+                "watts": 150.0,  # Miner power draw
+                "measure_power": False,  # Measure the draw with the RAPL energy counter instead
+                "pool_fee": 0.01
             },
             "mining_policy": {
                 "mine_on_peak": False,  # Only mine on peak if absolutely necessary
@@ -110,73 +341,409 @@ class PeakPauseConfig:
         with open(self.config_file, 'w') as f:
             json.dump(config, f, indent=2)
 
+class TemperatureCache:
+    """Shared on-disk cache of the latest temperature reading
+    
+    The reading lives in a small JSON file that is replaced atomically, so the
+    cron wrapper, --test and several PeakPause instances on one host share a
+    single sensor read. Within ttl the cached value is used as is; up to
+    max_stale it is still served while one process refreshes it in the
+    background. A lock file makes sure only one refresh runs at a time.
+    """
+    
+    def __init__(self, config: Dict[str, Any], key: str, fetch: Callable[[], Optional[float]]):
+        self.path = config.get("file") or os.path.join(_private_dir(), "peakpause_temperature.json")
+        self.ttl = config.get("ttl", 60)
+        self.max_stale = config.get("max_stale", 600)
+        self.key = key
+        self.fetch = fetch
+        self._refresh_thread = None
+    
+    def _load(self) -> Optional[TemperatureReading]:
+        data = _read_json(self.path)
+        if not data or data.get("key") != self.key:
+            return None
+        return TemperatureReading(data["value"], data["timestamp"], data["source"])
+    
+    def _refresh(self, blocking: bool = True) -> Optional[TemperatureReading]:
+        """Read the sensor and publish the value; only one process refreshes at a time"""
+        try:
+            lock = os.open(f"{self.path}.lock", os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o600)
+        except OSError as e:
+            logging.warning(f"Could not open temperature cache lock {self.path}.lock: {e}")
+            if not blocking:
+                return None
+            value = self.fetch()  # Read the sensor uncached rather than not at all
+            return TemperatureReading(value, time.time(), self.key) if value is not None else None
+        
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return None  # Someone else is already refreshing
+            
+            if blocking:
+                # Another process may have refreshed while we waited for the lock
+                cached = self._load()
+                if cached and cached.age <= self.ttl:
+                    return cached
+            
+            value = self.fetch()
+            if value is None:
+                return None
+            
+            reading = TemperatureReading(value, time.time(), self.key)
+            try:
+                _atomic_write_json(self.path, {"key": self.key, "value": reading.value,
+                                               "timestamp": reading.timestamp, "source": reading.source})
+            except OSError as e:
+                logging.warning(f"Could not write temperature cache {self.path}: {e}")
+            return reading
+        finally:
+            os.close(lock)
+    
+    def _refresh_in_background(self) -> None:
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        # Not a daemon thread: a cron run finishes the refresh before exiting
+        self._refresh_thread = threading.Thread(target=self._refresh, args=(False,),
+                                                name="temperature-refresh")
+        self._refresh_thread.start()
+    
+    def get(self) -> Optional[TemperatureReading]:
+        """Cached reading if fresh, stale reading while refreshing, else a blocking refresh"""
+        cached = self._load()
+        if cached and cached.age <= self.ttl:
+            return cached
+        
+        if cached and cached.age <= self.max_stale:
+            self._refresh_in_background()
+            return cached
+        
+        return self._refresh()
+
 class TemperatureMonitor:
-    """Modern temperature monitoring with multiple sources"""
+    """Modern temperature monitoring with multiple sources
+    
+    A single source is read directly. With a "sources" list, all sources are
+    queried in parallel under one overall deadline and the valid results are
+    fused (first valid, median or max) after outlier rejection, optionally
+    smoothed with an EMA. Each source entry inherits unset keys from the
+    temperature section.
+    """
+    
+    FUSION_STRATEGIES = ("first", "median", "max")
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.source = TemperatureSource(config.get("source", "socket"))
         self.bias = config.get("bias", 0.0)
+        self.sources = [dict(config, **source) for source in config.get("sources", [])] or [config]
+        
+        fusion = config.get("fusion", {})
+        self.strategy = fusion.get("strategy", "median")
+        if self.strategy not in self.FUSION_STRATEGIES:
+            raise ValueError(f"Unknown fusion strategy {self.strategy!r}, use one of {self.FUSION_STRATEGIES}")
+        self.deadline = fusion.get("deadline", 3.0)                    # Seconds for all sources together
+        self.outlier_threshold = fusion.get("outlier_threshold", 3.0)  # °C from the median
+        self.ema_alpha = fusion.get("ema_alpha")                       # None disables smoothing
+        self._ema = None
+        self._executor = None
+        self._late = set()  # Reads that missed the deadline, possibly still blocking a worker
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, SourceStats] = {}
+        self._stats_lock = threading.Lock()
+        self._streams: Dict[str, TemperatureStream] = {}
+        self._stream_times: Dict[str, float] = {}  # When each stream's value was last known current
+        self._listeners: List[Callable[[float], None]] = []
+        self._read_observers: List[Callable[[str, float, bool], None]] = []
+        
+        cache_config = config.get("cache", {})
+        self.cache = None
+        self.stale_margin = 0.0
+        self.fresh_age = float("inf")  # Readings older than this are treated conservatively
+        if cache_config.get("enabled", False):
+            try:
+                self.cache = TemperatureCache(cache_config, self._cache_key(), self._read_source)
+            except OSError as e:
+                logging.error(f"Temperature cache disabled: {e}")
+        if self.cache:
+            self.stale_margin = cache_config.get("stale_margin", 1.0)
+            self.fresh_age = self.cache.ttl
+    
+    @staticmethod
+    def _source_key(source_config: Dict[str, Any]) -> str:
+        """Identifies one source, so instances with different sources don't share readings"""
+        source = TemperatureSource(source_config.get("source", "socket"))
+        location = {
+            TemperatureSource.SOCKET_SERVER: f"{source_config.get('socket_host')}:{source_config.get('socket_port')}",
+            TemperatureSource.HOMEKIT: source_config.get("homekit_url"),
+            TemperatureSource.HTTP_API: source_config.get("http_url"),
+            TemperatureSource.HOMEASSISTANT_WS: f"{source_config.get('ha_ws_url')}#{source_config.get('entity_id')}",
+            TemperatureSource.ESPHOME_EVENTS: f"{source_config.get('esphome_url')}#{source_config.get('esphome_sensor_id')}",
+            TemperatureSource.MULTICAST: f"{source_config.get('multicast_group', DEFAULT_MULTICAST_GROUP)}:"
+                                         f"{source_config.get('multicast_port', DEFAULT_MULTICAST_PORT)}",
+        }.get(source, "")
+        return f"{source.value}:{location}:{source_config.get('bias', 0.0)}"
+    
+    @staticmethod
+    def _source_name(source_config: Dict[str, Any]) -> str:
+        return source_config.get("name") or source_config.get("source", "socket")
+    
+    def _cache_key(self) -> str:
+        keys = sorted(self._source_key(source) for source in self.sources)
+        if len(keys) == 1:
+            return keys[0]
+        return f"{self.strategy}[{','.join(keys)}]"
+    
+    def get_reading(self) -> Optional[TemperatureReading]:
+        """Get the current reading with its age, from the cache when enabled"""
+        if self.cache:
+            return self.cache.get()
+        
+        value = self._read_source()
+        if value is None:
+            return None
+        if len(self.sources) == 1:
+            # A pushed value is as old as its event, not the read
+            timestamp = self._stream_times.get(self._source_name(self.sources[0]), time.time())
+            return TemperatureReading(value, timestamp, self.source.value)
+        return TemperatureReading(value, time.time(), f"{self.strategy} of {len(self.sources)} sources")
     
     def get_temperature(self) -> Optional[float]:
         """Get current temperature from configured source"""
+        reading = self.get_reading()
+        return reading.value if reading else None
+    
+    def _read_source(self) -> Optional[float]:
+        """Read the configured sensor(s) directly"""
+        if len(self.sources) == 1:
+            return self._read_one(self.sources[0])
+        return self._read_fused()
+    
+    def latency_stats(self) -> Dict[str, SourceStats]:
+        """Per-source read latency since start"""
+        with self._stats_lock:
+            return {name: SourceStats(**vars(stats)) for name, stats in self._stats.items()}
+    
+    def _session(self, source_config: Dict[str, Any]) -> requests.Session:
+        """Pooled keep-alive session for an HTTP source, created on first use"""
+        name = self._source_name(source_config)
+        session = self._sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            # Retry once on a failed connect, e.g. a keep-alive connection the server closed
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=source_config.get("pool_size", 2),
+                                  max_retries=Retry(total=1, connect=1, read=0, backoff_factor=0))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._sessions[name] = session
+        return session
+    
+    @staticmethod
+    def _http_timeout(source_config: Dict[str, Any]) -> tuple[float, float]:
+        """Separate (connect, read) timeouts for HTTP sources"""
+        return (source_config.get("connect_timeout", 3.0),
+                source_config.get("read_timeout", source_config.get("timeout", 5.0)))
+    
+    def add_listener(self, callback: Callable[[float], None]) -> None:
+        """Call callback(temperature) whenever a push source delivers a new value"""
+        self._listeners.append(callback)
+    
+    def add_read_observer(self, callback: Callable[[str, float, bool], None]) -> None:
+        """Call callback(source, seconds, ok) after every timed source read"""
+        self._read_observers.append(callback)
+    
+    def _notify_listeners(self, value: float) -> None:
+        for callback in self._listeners:
+            callback(value)
+    
+    def close(self) -> None:
+        """Stop push subscriptions and release pooled connections"""
+        for stream in self._streams.values():
+            stream.stop()
+        for session in self._sessions.values():
+            session.close()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _stream(self, source_config: Dict[str, Any]) -> TemperatureStream:
+        """Push subscription for a source, started on first use and kept running"""
+        name = self._source_name(source_config)
+        stream = self._streams.get(name)
+        if stream is None:
+            source = TemperatureSource(source_config["source"])
+            if source == TemperatureSource.HOMEASSISTANT_WS:
+                stream = HomeAssistantStream(source_config["ha_ws_url"], source_config.get("homekit_token", ""),
+                                             source_config["entity_id"],
+                                             source_config.get("subscription", "trigger"),
+                                             heartbeat=source_config.get("heartbeat", 30.0))
+            elif source == TemperatureSource.MULTICAST:
+                stream = MulticastListener(source_config.get("multicast_group", DEFAULT_MULTICAST_GROUP),
+                                           source_config.get("multicast_port", DEFAULT_MULTICAST_PORT),
+                                           source_config.get("multicast_interface", "0.0.0.0"))
+            else:
+                stream = ESPHomeEventStream(source_config["esphome_url"], source_config["esphome_sensor_id"])
+            
+            bias = source_config.get("bias", 0.0)
+            stream.slot.add_listener(lambda value: self._notify_listeners(value + bias))
+            self._streams[name] = stream.start()
+        return stream
+    
+    def _get_stream_temperature(self, source_config: Dict[str, Any]) -> Optional[float]:
+        """Latest pushed value - no request per read once subscribed"""
+        stream = self._stream(source_config)
+        latest = stream.slot.get(source_config.get("max_age", 600))
+        if latest is None and stream.slot.wait(source_config.get("initial_wait", 5.0)):
+            latest = stream.slot.get(source_config.get("max_age", 600))
+        if latest is None:
+            return None
+        self._stream_times[self._source_name(source_config)] = latest[1]
+        return latest[0] + source_config.get("bias", 0.0)
+    
+    def _read_one(self, source_config: Dict[str, Any]) -> Optional[float]:
+        """Read a single source, recording its latency"""
+        started = time.perf_counter()
+        value = self._read_one_untimed(source_config)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        
+        name = self._source_name(source_config)
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, SourceStats())
+            stats.record(elapsed_ms, value is not None)
+        for callback in self._read_observers:
+            callback(name, elapsed_ms / 1000.0, value is not None)
+        return value
+    
+    def _read_one_untimed(self, source_config: Dict[str, Any]) -> Optional[float]:
+        """Read a single source"""
         try:
-            if self.source == TemperatureSource.SOCKET_SERVER:
-                return self._get_socket_temperature()
-            elif self.source == TemperatureSource.HOMEKIT:
-                return self._get_homekit_temperature()
-            elif self.source == TemperatureSource.HTTP_API:
-                return self._get_http_temperature()
-            elif self.source == TemperatureSource.SYSTEM_THERMAL:
-                return self._get_system_temperature()
+            source = TemperatureSource(source_config.get("source", "socket"))
+            if source == TemperatureSource.SOCKET_SERVER:
+                return self._get_socket_temperature(source_config)
+            elif source == TemperatureSource.HOMEKIT:
+                return self._get_homekit_temperature(source_config)
+            elif source == TemperatureSource.HTTP_API:
+                return self._get_http_temperature(source_config)
+            elif source == TemperatureSource.SYSTEM_THERMAL:
+                return self._get_system_temperature(source_config)
+            elif source in (TemperatureSource.HOMEASSISTANT_WS, TemperatureSource.ESPHOME_EVENTS,
+                            TemperatureSource.MULTICAST):
+                return self._get_stream_temperature(source_config)
         except Exception as e:
             logging.warning(f"Failed to get temperature: {e}")
             return None
     
-    def _get_socket_temperature(self) -> Optional[float]:
+    def _read_fused(self) -> Optional[float]:
+        """Query all sources in parallel and combine what arrives before the deadline"""
+        self._late = {future for future in self._late if not future.done()}
+        if self._late:
+            # A running future can't be cancelled: leave the hung workers behind with the old pool
+            logging.warning(f"{len(self._late)} temperature read(s) still hung, starting new workers")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._late = set()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.sources),
+                                                thread_name_prefix="temperature")
+        
+        futures = {self._executor.submit(self._read_one, source): self._source_name(source)
+                   for source in self.sources}
+        values = {}
+        pending = set(futures)
+        deadline = time.monotonic() + self.deadline
+        
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                value = future.result()
+                if value is not None:
+                    values[futures[future]] = value
+            if values and self.strategy == "first":
+                break
+        
+        for future in pending:
+            if not future.cancel():
+                self._late.add(future)
+            logging.warning(f"Temperature source {futures[future]} missed the {self.deadline}s deadline")
+        
+        if not values:
+            return None
+        
+        value = self._fuse(values)
+        if self.ema_alpha:
+            self._ema = value if self._ema is None else self.ema_alpha * value + (1 - self.ema_alpha) * self._ema
+            value = self._ema
+        
+        logging.debug(f"Fused temperature {value:.2f}°C from {values}")
+        return value
+    
+    def _fuse(self, values: Dict[str, float]) -> float:
+        """Combine per-source readings using the configured strategy"""
+        if self.strategy == "first":
+            return next(iter(values.values()))
+        
+        # With three or more readings, drop those far from the median
+        readings = list(values.values())
+        if len(readings) >= 3:
+            median = statistics.median(readings)
+            kept = {name: v for name, v in values.items() if abs(v - median) <= self.outlier_threshold}
+            for name in values.keys() - kept.keys():
+                logging.warning(f"Rejected outlier from {name}: {values[name]:.1f}°C (median {median:.1f}°C)")
+            readings = list(kept.values())
+        
+        if self.strategy == "max":
+            return max(readings)
+        return statistics.median(readings)
+    
+    def _get_socket_temperature(self, source_config: Dict[str, Any]) -> Optional[float]:
         """Get temperature from socket server (legacy method)"""
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(5)
-                sock.connect((self.config["socket_host"], self.config["socket_port"]))
+                sock.settimeout(source_config.get("timeout", 5))
+                sock.connect((source_config["socket_host"], source_config["socket_port"]))
                 sock.send(b"temp")
                 data = sock.recv(1024).decode().strip()
-                return float(data) + self.bias
+                return float(data) + source_config.get("bias", 0.0)
         except Exception as e:
             logging.warning(f"Socket temperature failed: {e}")
             return None
     
-    def _get_homekit_temperature(self) -> Optional[float]:
+    def _get_homekit_temperature(self, source_config: Dict[str, Any]) -> Optional[float]:
         """Get temperature from HomeKit via Home Assistant API"""
         # Example for Home Assistant REST API
-        url = self.config.get("homekit_url")
+        url = source_config.get("homekit_url")
         if not url:
             return None
         
         try:
             headers = {
-                "Authorization": f"Bearer {self.config.get('homekit_token', '')}",
+                "Authorization": f"Bearer {source_config.get('homekit_token', '')}",
                 "Content-Type": "application/json"
             }
-            response = requests.get(url, headers=headers, timeout=5)
+            response = self._session(source_config).get(url, headers=headers,
+                                                         timeout=self._http_timeout(source_config))
             response.raise_for_status()
             data = response.json()
             
             # Adjust based on your HomeKit/Home Assistant sensor format
             temp = float(data.get("state", 0))
-            return temp + self.bias
+            return temp + source_config.get("bias", 0.0)
         except Exception as e:
             logging.warning(f"HomeKit temperature failed: {e}")
             return None
     
-    def _get_http_temperature(self) -> Optional[float]:
+    def _get_http_temperature(self, source_config: Dict[str, Any]) -> Optional[float]:
         """Get temperature from HTTP API"""
-        url = self.config.get("http_url")
+        url = source_config.get("http_url")
         if not url:
             return None
         
         try:
-            response = requests.get(url, timeout=5)
+            response = self._session(source_config).get(url, timeout=self._http_timeout(source_config))
             response.raise_for_status()
             
             # Try JSON first
@@ -187,12 +754,12 @@ class TemperatureMonitor:
                 # Fallback to plain text
                 temp = float(response.text.strip())
             
-            return temp + self.bias
+            return temp + source_config.get("bias", 0.0)
         except Exception as e:
             logging.warning(f"HTTP temperature failed: {e}")
             return None
     
-    def _get_system_temperature(self) -> Optional[float]:
+    def _get_system_temperature(self, source_config: Dict[str, Any]) -> Optional[float]:
         """Get temperature from system thermal zones"""
         try:
             # Try common thermal zone paths
@@ -207,7 +774,7 @@ class TemperatureMonitor:
                         # Usually in millidegrees
                         temp_millidegrees = int(f.read().strip())
                         temp_celsius = temp_millidegrees / 1000.0
-                        return temp_celsius + self.bias
+                        return temp_celsius + source_config.get("bias", 0.0)
             
             return None
         except Exception as e:
@@ -215,18 +782,25 @@ class TemperatureMonitor:
             return None
 
 class ULOScheduler:
-    """ULO rate period scheduler with updated 2024-2025 rates"""
+    """ULO rate period scheduler with updated 2024-2025 rates
+    
+    The rate plan is compiled into a 168-slot weekly table (one slot per hour)
+    so period lookups are O(1) and the next period change is known in advance.
+    """
+    
+    SLOTS_PER_WEEK = 7 * 24
+    cheapest_period = RatePeriod.ULTRA_LOW
     
     def __init__(self, rates: ULORates):
         self.rates = rates
+        self._week = [self._classify(weekday, hour)
+                      for weekday in range(7) for hour in range(24)]
+        self._hours_to_change = self._compile_transitions(self._week)
+        self._hours_since_change = self._compile_period_starts(self._week)
     
-    def get_current_period(self, dt: Optional[datetime] = None) -> RatePeriod:
-        """Get current ULO rate period"""
-        if dt is None:
-            dt = datetime.now()
-        
-        hour = dt.hour
-        weekday = dt.weekday()  # 0=Monday, 6=Sunday
+    @staticmethod
+    def _classify(weekday: int, hour: int) -> RatePeriod:
+        """Rate period for an hour of the week (weekday 0=Monday, 6=Sunday)"""
         is_weekend = weekday >= 5  # Saturday=5, Sunday=6
         
         # Ultra-low overnight: 11 PM to 7 AM every day
@@ -247,116 +821,1450 @@ class ULOScheduler:
         
         return RatePeriod.MID_PEAK  # Fallback
     
-    def get_rate(self, period: RatePeriod) -> float:
+    @classmethod
+    def _compile_transitions(cls, week: List[RatePeriod]) -> List[Optional[int]]:
+        """For every slot, the number of hours until the period changes (None if never)"""
+        n = cls.SLOTS_PER_WEEK
+        if len(set(week)) == 1:
+            return [None] * n
+        
+        hours_to_change = [0] * n
+        # Walk the week backwards twice so runs that wrap past Sunday are counted
+        for i in range(2 * n - 1, -1, -1):
+            slot = i % n
+            following = (slot + 1) % n
+            if week[following] != week[slot]:
+                hours_to_change[slot] = 1
+            elif i < 2 * n - 1:
+                hours_to_change[slot] = hours_to_change[following] + 1
+        return hours_to_change
+    
+    @classmethod
+    def _compile_period_starts(cls, week: List[RatePeriod]) -> List[Optional[int]]:
+        """For every slot, the number of hours since its period began (None if it never changes)"""
+        n = cls.SLOTS_PER_WEEK
+        if len(set(week)) == 1:
+            return [None] * n
+        
+        hours_since_change = [0] * n
+        # Walk the week forwards twice so runs that wrap past Sunday are counted
+        for i in range(2 * n):
+            slot = i % n
+            previous = (slot - 1) % n
+            if week[previous] != week[slot]:
+                hours_since_change[slot] = 0
+            elif i > 0:
+                hours_since_change[slot] = hours_since_change[previous] + 1
+        return hours_since_change
+    
+    @staticmethod
+    def _slot(dt: datetime) -> int:
+        return dt.weekday() * 24 + dt.hour
+    
+    def period_at(self, dt: datetime) -> RatePeriod:
+        """Rate period in effect at dt - O(1) table lookup"""
+        return self._week[self._slot(dt)]
+    
+    def get_current_period(self, dt: Optional[datetime] = None) -> RatePeriod:
+        """Get current ULO rate period"""
+        if dt is None:
+            dt = datetime.now()
+        
+        return self.period_at(dt)
+    
+    def next_transition(self, dt: Optional[datetime] = None) -> Optional[datetime]:
+        """Time of the next period change after dt, or None for a flat plan - O(1)"""
+        if dt is None:
+            dt = datetime.now()
+        
+        hours = self._hours_to_change[self._slot(dt)]
+        if hours is None:
+            return None
+        
+        return dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=hours)
+    
+    def last_transition(self, dt: Optional[datetime] = None) -> Optional[datetime]:
+        """Time the period in effect at dt began, or None for a flat plan - O(1)"""
+        if dt is None:
+            dt = datetime.now()
+        
+        hours = self._hours_since_change[self._slot(dt)]
+        if hours is None:
+            return None
+        
+        return dt.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours)
+    
+    def periods_between(self, start: datetime, end: datetime) -> List[tuple[datetime, datetime, RatePeriod]]:
+        """Split [start, end) into (from, to, period) segments - O(k) in the number of changes"""
+        segments = []
+        current = start
+        while current < end:
+            period = self.period_at(current)
+            change = self.next_transition(current)
+            segment_end = end if change is None else min(change, end)
+            segments.append((current, segment_end, period))
+            current = segment_end
+        return segments
+    
+    def get_rate(self, period: RatePeriod, dt: Optional[datetime] = None) -> float:
         """Get rate for given period in ¢/kWh"""
         return getattr(self.rates, period.value)
 
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def holiday_dates(rules: List[Dict[str, Any]], year: int) -> set:
+    """Dates billed as holidays in a year
+    
+    Rules are a fixed month/day, the nth weekday of a month, the last weekday
+    before a day, an offset from Easter, or a one-off ISO date. "observed":
+    "next_weekday" moves a weekend holiday to the next weekday not already taken.
+    """
+    holidays = set()
+    for rule in rules:
+        if "date" in rule:
+            day = date.fromisoformat(rule["date"])
+            if day.year != year:
+                continue
+        elif "easter_offset" in rule:
+            day = easter_sunday(year) + timedelta(days=rule["easter_offset"])
+        elif "nth" in rule:
+            first = date(year, rule["month"], 1)
+            day = first + timedelta(days=(rule["weekday"] - first.weekday()) % 7 + 7 * (rule["nth"] - 1))
+        elif "before_day" in rule:
+            last = date(year, rule["month"], rule["before_day"]) - timedelta(days=1)
+            day = last - timedelta(days=(last.weekday() - rule["weekday"]) % 7)
+        else:
+            day = date(year, rule["month"], rule["day"])
+        
+        if rule.get("observed") == "next_weekday":
+            while day.weekday() >= 5 or day in holidays:
+                day += timedelta(days=1)
+        holidays.add(day)
+    return holidays
+
+@dataclass
+class TariffInterval:
+    """A stretch of wall-clock time billed at one period and rate"""
+    start: datetime
+    end: datetime
+    period: RatePeriod
+    rate: float
+
+@dataclass
+class TariffVersion:
+    """Rates of a plan between two dates"""
+    effective: date
+    until: Optional[date]             # Last day (inclusive), None if open-ended
+    rates: Dict[str, float]           # ¢/kWh by period name
+    schedules: List[Dict[str, Any]]   # Seasonal weekday/weekend [start_hour, end_hour, period] blocks
+    tier2: Optional[Dict[str, float]] = None  # Tiered plans: rate above winter_kwh/summer_kwh per month
+
+class TariffScheduler:
+    """Date-versioned tariff plan from tariffs.json, compiled into sorted intervals
+    
+    Versions, seasons and holidays are expanded into (start, end, period, rate)
+    intervals a few years at a time, so lookups are a bisect - O(log n) - and new
+    rates take effect on their effective date without a code change.
+    """
+    
+    WINTER_MONTHS = (11, 12, 1, 2, 3, 4)
+    
+    def __init__(self, name: str, plan: Dict[str, Any], holiday_rules: List[Dict[str, Any]]):
+        self.name = name
+        self.holiday_rules = holiday_rules
+        self.versions = sorted(
+            (TariffVersion(date.fromisoformat(v["effective"]),
+                           date.fromisoformat(v["until"]) if v.get("until") else None,
+                           v["rates"], v.get("schedules", plan["schedules"]), v.get("tier2"))
+             for v in plan["versions"]),
+            key=lambda v: v.effective)
+        self._effective = [v.effective for v in self.versions]
+        
+        latest = self.versions[-1].rates
+        self.cheapest_period = RatePeriod(min(latest, key=latest.get))
+        
+        self._intervals: List[TariffInterval] = []
+        self._starts: List[datetime] = []
+        self._years = (0, -1)
+        self._expired_warned = False
+        year = datetime.now().year
+        self._compile(year - 1, year + 1)
+    
+    @classmethod
+    def from_file(cls, path: str, plan_name: str) -> "TariffScheduler":
+        """Load a plan (e.g. "ulo", "tou", "tiered") and its holiday calendar"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if plan_name not in data["plans"]:
+            raise ValueError(f"Unknown tariff plan {plan_name!r} in {path}")
+        plan = data["plans"][plan_name]
+        holidays = data.get("holidays", {}).get(plan.get("holidays"), []) if plan.get("holidays") else []
+        return cls(plan_name, plan, holidays)
+    
+    def version_on(self, day: date, warn: bool = False) -> TariffVersion:
+        """Version in effect on a day; the nearest one outside the covered range"""
+        version = self.versions[max(0, bisect.bisect_right(self._effective, day) - 1)]
+        if warn and version.until and day > version.until and not self._expired_warned:
+            self._expired_warned = True
+            logging.warning(f"Tariff plan {self.name} has no rates after {version.until}, "
+                            f"still using them - update tariffs.json")
+        return version
+    
+    def _day_blocks(self, version: TariffVersion, day: date, holidays: set) -> List[List[Any]]:
+        season = next((s for s in version.schedules if day.month in s.get("months", range(1, 13))),
+                      version.schedules[0])
+        kind = "weekend" if day.weekday() >= 5 or day in holidays else "weekday"
+        return season[kind]
+    
+    def _compile(self, first_year: int, last_year: int) -> None:
+        holidays = set()
+        for year in range(first_year, last_year + 1):
+            holidays |= holiday_dates(self.holiday_rules, year)
+        
+        intervals = []
+        day = date(first_year, 1, 1)
+        while day.year <= last_year:
+            version = self.version_on(day)
+            midnight = datetime(day.year, day.month, day.day)
+            for start_hour, end_hour, name in self._day_blocks(version, day, holidays):
+                start = midnight + timedelta(hours=start_hour)
+                end = midnight + timedelta(hours=end_hour)
+                period, rate = RatePeriod(name), version.rates[name]
+                if intervals and intervals[-1].end == start and \
+                        (intervals[-1].period, intervals[-1].rate) == (period, rate):
+                    intervals[-1].end = end
+                else:
+                    intervals.append(TariffInterval(start, end, period, rate))
+            day += timedelta(days=1)
+        
+        self._intervals = intervals
+        self._starts = [interval.start for interval in intervals]
+        self._years = (first_year, last_year)
+    
+    def interval_at(self, dt: datetime) -> TariffInterval:
+        """Interval containing dt - O(log n)"""
+        first_year, last_year = self._years
+        # Keep a year of margin after dt so the next transition is always known
+        if dt.year < first_year or dt.year + 1 > last_year:
+            self._compile(min(first_year, dt.year), max(last_year, dt.year + 1))
+        return self._intervals[bisect.bisect_right(self._starts, dt) - 1]
+    
+    def period_at(self, dt: datetime) -> RatePeriod:
+        return self.interval_at(dt).period
+    
+    def get_current_period(self, dt: Optional[datetime] = None) -> RatePeriod:
+        return self.period_at(dt or datetime.now())
+    
+    def next_transition(self, dt: Optional[datetime] = None) -> Optional[datetime]:
+        """Time of the next period or rate change after dt"""
+        return self.interval_at(dt or datetime.now()).end
+    
+    def last_transition(self, dt: Optional[datetime] = None) -> Optional[datetime]:
+        """Time the period in effect at dt began"""
+        return self.interval_at(dt or datetime.now()).start
+    
+    def periods_between(self, start: datetime, end: datetime) -> List[tuple[datetime, datetime, RatePeriod]]:
+        """Split [start, end) into (from, to, period) segments"""
+        segments = []
+        current = start
+        while current < end:
+            interval = self.interval_at(current)
+            segment_end = min(interval.end, end)
+            segments.append((current, segment_end, interval.period))
+            current = segment_end
+        return segments
+    
+    def get_rate(self, period: RatePeriod, dt: Optional[datetime] = None) -> float:
+        """Rate for a period in ¢/kWh under the version in effect at dt"""
+        return self.version_on((dt or datetime.now()).date(), warn=True).rates[period.value]
+    
+    def tier2(self, day: date) -> Optional[tuple[float, float]]:
+        """(tier-2 rate, monthly kWh where it starts) for tiered plans, else None"""
+        tier = self.version_on(day).tier2
+        if not tier:
+            return None
+        limit = tier["winter_kwh"] if day.month in self.WINTER_MONTHS else tier["summer_kwh"]
+        return tier["rate"], limit
+
+def make_scheduler(config: Dict[str, Any]):
+    """TariffScheduler for the configured plan, or the built-in ULO table from "rates" """
+    tariff = config.get("tariff", {})
+    if tariff.get("plan"):
+        if "rates" in config:
+            logging.warning(f"tariff.plan is {tariff['plan']!r}, so the \"rates\" section is ignored "
+                            f"(set plan to null to use it)")
+        tariff_file = tariff.get("file") or str(Path(__file__).with_name("tariffs.json"))
+        return TariffScheduler.from_file(tariff_file, tariff["plan"])
+    return ULOScheduler(ULORates(**config.get("rates", {})))
+
+class XmrigApiClient:
+    """Client for the local xmrig HTTP API (JSON-RPC control and /2 endpoints)"""
+    
+    def __init__(self, host: str, port: int, access_token: Optional[str] = None, timeout: float = 2.0):
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        if access_token:
+            self.session.headers["Authorization"] = f"Bearer {access_token}"
+    
+    @classmethod
+    def from_xmrig_config(cls, xmrig_config_file: str,
+                          overrides: Optional[Dict[str, Any]] = None) -> Optional["XmrigApiClient"]:
+        """Build a client from the "http" section of xmrig's config (or explicit overrides)"""
+        http = dict((_read_json(xmrig_config_file) or {}).get("http") or {})
+        if overrides:
+            http.update(overrides, enabled=True)
+        if not http.get("enabled") or not http.get("port"):
+            return None
+        
+        return cls(http.get("host", "127.0.0.1"), http["port"], http.get("access-token"),
+                   http.get("timeout", 2.0))
+    
+    def _rpc(self, method: str) -> Dict[str, Any]:
+        response = self.session.post(f"{self.base_url}/json_rpc",
+                                     json={"jsonrpc": "2.0", "id": 1, "method": method},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("error"):
+            raise RuntimeError(f"xmrig {method} failed: {data['error']}")
+        return data
+    
+    def pause(self) -> None:
+        """Stop hashing but keep the RandomX dataset and pool connection"""
+        self._rpc("pause")
+    
+    def resume(self) -> None:
+        """Resume hashing after pause()"""
+        self._rpc("resume")
+    
+    def get_config(self) -> Dict[str, Any]:
+        """GET /1/config - the running xmrig config"""
+        response = self.session.get(f"{self.base_url}/1/config", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def put_config(self, config: Dict[str, Any]) -> None:
+        """PUT /1/config - replace and reload the running xmrig config"""
+        response = self.session.put(f"{self.base_url}/1/config", json=config, timeout=self.timeout)
+        response.raise_for_status()
+    
+    def summary(self) -> Dict[str, Any]:
+        """GET /2/summary"""
+        response = self.session.get(f"{self.base_url}/2/summary", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def backends(self) -> List[Dict[str, Any]]:
+        """GET /2/backends"""
+        response = self.session.get(f"{self.base_url}/2/backends", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
 class MiningController:
-    """Mining process controller"""
+    """Mining process controller
+    
+    The PID of the launched miner is recorded in a pidfile together with its
+    kernel start time, so a recycled PID is never mistaken for the miner.
+    Liveness checks use a pidfd (or /proc) instead of spawning pgrep; the
+    full process scan only runs on the start path to catch duplicates.
+    
+    control_mode selects how mining is stopped: "kill" terminates xmrig,
+    "api" pauses it through its HTTP API so the RandomX dataset survives
+    (falling back to kill/restart if the API is unreachable), and "freeze"
+    suspends it with SIGSTOP/SIGCONT, stopping it for real under memory
+    pressure or after it has been frozen for too long.
+    """
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.executable = config["executable"]
         self.config_file = config["config_file"]
         self.log_file = config["log_file"]
+        self.pid_file = config.get("pid_file", str(Path(self.log_file).with_suffix(".pid")))
+        self.stop_timeout = config.get("stop_timeout", 10.0)  # Grace period before SIGKILL
+        self.last_stop_duration = None  # Seconds the last stop_mining() took
+        self.last_launch = None  # Epoch seconds when this controller last launched a new miner process
+        self.last_stop_forced = False
+        self.duplicates_killed = 0  # Untracked miners killed by this controller
+        self.control_mode = config.get("control_mode", "kill")
+        self.api = None
+        if self.control_mode == "api":
+            self.api = XmrigApiClient.from_xmrig_config(self.config_file, config.get("api"))
+            if self.api is None:
+                logging.warning("control_mode 'api' needs the xmrig http API enabled, using kill/restart")
+        freeze_config = config.get("freeze", {})
+        self.freeze_min_available_mb = freeze_config.get("min_available_mb", 1024)
+        self.freeze_max_pressure = freeze_config.get("max_memory_pressure", 10.0)  # PSI some avg10, %
+        self.freeze_max_seconds = freeze_config.get("max_frozen_seconds", 6 * 3600)
+        self.pause_method = None  # "api" or "freeze" while paused (process still running)
+        self.paused_since = None  # Epoch seconds when the pause started
         self.process_pid = None
+        self._start_time = None   # Kernel start time (clock ticks) of process_pid
+        self._pidfd = None
+        self._process = None      # Popen handle when launched by this process
+    
+    @staticmethod
+    def _proc_stat(pid: int) -> Optional[tuple[str, int]]:
+        """(state, start time) from /proc/<pid>/stat, or None if the PID is gone"""
+        try:
+            with open(f"/proc/{pid}/stat", 'r') as f:
+                stat = f.read()
+        except OSError:
+            return None
+        
+        # comm may contain spaces and parentheses, so split after the last ')'
+        fields = stat[stat.rindex(')') + 2:].split()
+        return fields[0], int(fields[19])
+    
+    def _is_same_process(self, pid: int, start_time: int) -> bool:
+        """True if pid is alive (not a zombie) and still the process started at start_time"""
+        stat = self._proc_stat(pid)
+        return stat is not None and stat[0] != 'Z' and stat[1] == start_time
+    
+    @property
+    def paused(self) -> bool:
+        """True while the process is alive but not hashing"""
+        return self.pause_method is not None
+    
+    @property
+    def resumable(self) -> bool:
+        """True if start_mining would resume the paused process, keeping its RandomX dataset"""
+        if self.pause_method == "freeze":
+            return self.paused_seconds() <= self.freeze_max_seconds
+        return self.pause_method == "api"
+    
+    def _track(self, pid: int, start_time: int, process: Optional[subprocess.Popen] = None,
+               pause_method: Optional[str] = None, paused_since: Optional[float] = None) -> bool:
+        """Start tracking pid, holding a pidfd when the platform supports it"""
+        self._untrack(remove_pid_file=False)
+        
+        if hasattr(os, "pidfd_open"):
+            try:
+                self._pidfd = os.pidfd_open(pid)
+            except OSError:
+                return False
+        
+        # Verify after opening the pidfd so a PID recycled in between is rejected
+        if not self._is_same_process(pid, start_time):
+            self._untrack(remove_pid_file=False)
+            return False
+        
+        self.process_pid = pid
+        self._start_time = start_time
+        self._process = process
+        self.pause_method = pause_method
+        self.paused_since = paused_since
+        self._save_state()
+        return True
+    
+    def _save_state(self) -> None:
+        """Record the tracked process and its control state in the pidfile"""
+        try:
+            _atomic_write_json(self.pid_file, {
+                "pid": self.process_pid,
+                "start_time": self._start_time,
+                "executable": self.executable,
+                "pause_method": self.pause_method,
+                "paused_since": self.paused_since
+            })
+        except OSError as e:
+            logging.warning(f"Could not write pidfile {self.pid_file}: {e}")
+    
+    def _untrack(self, remove_pid_file: bool = True) -> None:
+        """Forget the tracked process and release its pidfd"""
+        if self._pidfd is not None:
+            os.close(self._pidfd)
+            self._pidfd = None
+        self.process_pid = None
+        self._start_time = None
+        self._process = None
+        self.pause_method = None
+        self.paused_since = None
+        
+        if remove_pid_file:
+            try:
+                os.unlink(self.pid_file)
+            except FileNotFoundError:
+                pass
+    
+    def take_over(self, previous: "MiningController") -> None:
+        """Track the process previous was tracking (after a config reload), keeping its pidfd and Popen handle"""
+        if previous.process_pid is None:
+            return
+        self._untrack(remove_pid_file=False)
+        self.process_pid, self._start_time = previous.process_pid, previous._start_time
+        self._pidfd, self._process = previous._pidfd, previous._process
+        self.pause_method, self.paused_since = previous.pause_method, previous.paused_since
+        self.last_launch = previous.last_launch
+        previous._pidfd = None  # Now owned here
+        previous._untrack(remove_pid_file=False)
+        if self.pid_file != previous.pid_file:
+            self._save_state()
+    
+    def _adopt_from_pid_file(self) -> bool:
+        """Resume tracking a miner recorded by an earlier run (e.g. the previous cron cycle)"""
+        state = _read_json(self.pid_file)
+        if not state or state.get("executable") != self.executable:
+            return False
+        
+        if not self._track(state["pid"], state["start_time"],
+                           pause_method=state.get("pause_method"), paused_since=state.get("paused_since")):
+            self._untrack()
+            return False
+        return True
+    
+    def _tracked_alive(self) -> bool:
+        """Liveness of the tracked process without spawning anything"""
+        if self._process is not None:
+            # Our own child: poll() also reaps it once it exits
+            return self._process.poll() is None
+        
+        if self._pidfd is not None:
+            poller = select.poll()
+            poller.register(self._pidfd, select.POLLIN)
+            return not poller.poll(0)  # pidfd becomes readable when the process exits
+        
+        return self._is_same_process(self.process_pid, self._start_time)
+    
+    def _send_signal(self, sig: int) -> None:
+        """Signal the tracked process through its pidfd so a recycled PID can't be hit"""
+        if self._pidfd is not None and hasattr(signal, "pidfd_send_signal"):
+            signal.pidfd_send_signal(self._pidfd, sig)
+        else:
+            os.kill(self.process_pid, sig)
+    
+    def _wait_for_exit(self, timeout: float) -> bool:
+        """Block until the tracked process exits or timeout expires; True if it exited"""
+        if self._process is not None:
+            try:
+                self._process.wait(timeout)
+                return True
+            except subprocess.TimeoutExpired:
+                return False
+        
+        if self._pidfd is not None:
+            poller = select.poll()
+            poller.register(self._pidfd, select.POLLIN)
+            return bool(poller.poll(int(timeout * 1000)))
+        
+        # No pidfd support: fall back to polling /proc
+        deadline = time.monotonic() + timeout
+        while self._is_same_process(self.process_pid, self._start_time):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
     
     def is_running(self) -> bool:
         """Check if mining process is running"""
         pid = self.get_mining_pid()
         return pid is not None
     
+    def is_mining(self) -> bool:
+        """Check if the miner is running and actually hashing (not paused)"""
+        return self.is_running() and not self.paused
+    
     def get_mining_pid(self) -> Optional[int]:
-        """Get PID of running mining process"""
-        try:
-            result = subprocess.run([
-                'pgrep', '-f', self.executable
-            ], capture_output=True, text=True)
+        """Get PID of the tracked mining process (no process scan)"""
+        if self.process_pid is None and not self._adopt_from_pid_file():
+            return None
+        
+        if self._tracked_alive():
+            return self.process_pid
+        
+        logging.info(f"Mining process {self.process_pid} has exited")
+        self._untrack()
+        return None
+    
+    def _matches_executable(self, argv: List[str]) -> bool:
+        """True if a command line runs our executable (not just mentions it)"""
+        exe_name = os.path.basename(self.executable)
+        exe_path = os.path.realpath(self.executable)
+        
+        # Allow a 'nice -n 19' wrapper that has not exec'd yet
+        for arg in argv[:4]:
+            if os.path.basename(arg) != exe_name:
+                continue
+            if '/' not in arg or os.path.realpath(arg) == exe_path:
+                return True
+        return False
+    
+    def scan_mining_processes(self) -> List[int]:
+        """Slow path: scan /proc for every process running the mining executable"""
+        pids = []
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit() or int(entry) == os.getpid():
+                continue
             
-            if result.returncode == 0 and result.stdout.strip():
-                pids = result.stdout.strip().split('\n')
-                # Return first PID, kill others if multiple
-                main_pid = int(pids[0])
-                
-                # Kill duplicate processes
-                for pid_str in pids[1:]:
-                    try:
-                        os.kill(int(pid_str), signal.SIGTERM)
-                        logging.info(f"Killed duplicate mining process: {pid_str}")
-                    except ProcessLookupError:
-                        pass
-                
-                return main_pid
+            try:
+                with open(f"/proc/{entry}/cmdline", 'rb') as f:
+                    argv = f.read().decode(errors='replace').split('\0')
+            except OSError:
+                continue
             
-            return None
-        except Exception as e:
-            logging.error(f"Error getting mining PID: {e}")
-            return None
+            if argv and argv[0] and self._matches_executable(argv):
+                pids.append(int(entry))
+        return pids
     
-    def start_mining(self) -> bool:
-        """Start mining process"""
+    def kill_duplicates(self) -> int:
+        """Terminate untracked miners, adopting the oldest one if nothing is tracked"""
+        tracked = self.get_mining_pid()
+        stats = {pid: self._proc_stat(pid) for pid in self.scan_mining_processes()}
+        candidates = sorted((stat[1], pid) for pid, stat in stats.items()
+                            if stat is not None and stat[0] != 'Z' and pid != tracked)
+        
+        if tracked is None and candidates:
+            start_time, pid = candidates.pop(0)
+            if self._track(pid, start_time):
+                logging.info(f"Adopted running mining process: PID {pid}")
+        
+        killed = 0
+        for _, pid in candidates:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                logging.info(f"Killed duplicate mining process: {pid}")
+                killed += 1
+                self.duplicates_killed += 1
+            except ProcessLookupError:
+                pass
+        return killed
+    
+    def start_mining(self, idle_priority: bool = False) -> bool:
+        """Start mining process, or resume it if it was paused
+        
+        idle_priority launches a new process under SCHED_IDLE, so a pre-warm
+        start only uses otherwise idle CPU until set_idle_priority(False).
+        """
         if self.is_running():
+            if not self.paused:
+                logging.info("Mining already running")
+                return True
+            if self._resume():
+                return True
+            # API unavailable or stale frozen session: fall back to a full restart
+            self.terminate_mining()
+        
+        # Slow path: make sure no untracked miner is already running
+        self.kill_duplicates()
+        if self.process_pid is not None:
             logging.info("Mining already running")
             return True
         
         try:
             # Start mining process in background with low priority (nice 19)
+            launched = time.time()
             with open(self.log_file, 'a') as log_f:
                 process = subprocess.Popen([
                     'nice', '-n', '19', self.executable, '--config', self.config_file
                 ], stdout=log_f, stderr=log_f)
             
-            self.process_pid = process.pid
-            logging.info(f"Started mining process: PID {self.process_pid}")
+            stat = self._proc_stat(process.pid)
+            if stat is None or not self._track(process.pid, stat[1], process):
+                logging.error(f"Mining process {process.pid} exited immediately")
+                return False
+            
+            # xmrig creates its mining threads after start-up; threads started
+            # from the main thread inherit its policy
+            if idle_priority:
+                self.set_idle_priority(True)
+            self.last_launch = launched
+            logging.info(f"Started mining process: PID {self.process_pid}{' (SCHED_IDLE)' if idle_priority else ''}")
             return True
         
         except Exception as e:
             logging.error(f"Failed to start mining: {e}")
             return False
     
+    def set_idle_priority(self, idle: bool) -> bool:
+        """Move every miner thread to SCHED_IDLE, or back to SCHED_OTHER
+        
+        Leaving SCHED_IDLE needs CAP_SYS_NICE (or RLIMIT_NICE) for a nice 19
+        process; without it the miner keeps running on idle CPU time only.
+        """
+        pid = self.process_pid
+        if pid is None:
+            return False
+        policy = os.SCHED_IDLE if idle else os.SCHED_OTHER
+        try:
+            tids = sorted(int(tid) for tid in os.listdir(f"/proc/{pid}/task"))
+        except OSError:
+            return False
+        
+        for tid in tids:
+            try:
+                os.sched_setscheduler(tid, policy, os.sched_param(0))
+            except ProcessLookupError:
+                continue  # Thread exited
+            except PermissionError:
+                logging.warning(f"Not permitted to change the scheduling policy of mining process {pid}")
+                return False
+        return True
+    
+    def _set_paused(self, method: Optional[str]) -> None:
+        self.pause_method = method
+        self.paused_since = time.time() if method else None
+        self._save_state()
+    
+    def paused_seconds(self) -> float:
+        """How long the miner has been paused or frozen"""
+        return time.time() - self.paused_since if self.paused_since else 0.0
+    
+    def _memory_pressure_reason(self) -> Optional[str]:
+        """Why the host needs the frozen miner's memory back, or None"""
+        try:
+            with open("/proc/meminfo", 'r') as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        available_mb = int(line.split()[1]) / 1024
+                        if available_mb < self.freeze_min_available_mb:
+                            return f"MemAvailable {available_mb:.0f} MB < {self.freeze_min_available_mb} MB"
+                        break
+        except OSError:
+            pass
+        
+        try:
+            # Pressure stall information: "some avg10=1.23 avg60=... avg300=... total=..."
+            with open("/proc/pressure/memory", 'r') as f:
+                some = f.readline().split()
+            avg10 = float(some[1].split('=')[1])
+            if avg10 > self.freeze_max_pressure:
+                return f"memory pressure {avg10:.1f}% > {self.freeze_max_pressure}%"
+        except (OSError, IndexError, ValueError):
+            pass
+        
+        return None
+    
+    def _pause(self) -> bool:
+        """Pause hashing through the xmrig API or by freezing the process"""
+        if self.control_mode == "freeze":
+            reason = self._memory_pressure_reason()
+            if reason:
+                logging.info(f"Not freezing miner ({reason}), stopping process instead")
+                return False
+            
+            try:
+                self._send_signal(signal.SIGSTOP)
+            except ProcessLookupError:
+                return False
+            self._set_paused("freeze")
+            logging.info(f"Froze mining process: PID {self.process_pid}")
+            return True
+        
+        try:
+            self.api.pause()
+        except Exception as e:
+            logging.warning(f"xmrig API pause failed, stopping process instead: {e}")
+            return False
+        
+        self._set_paused("api")
+        logging.info(f"Paused mining via API: PID {self.process_pid}")
+        return True
+    
+    def _resume(self) -> bool:
+        """Resume hashing through the xmrig API or by thawing the process"""
+        if self.pause_method == "freeze":
+            frozen_for = self.paused_seconds()
+            if frozen_for > self.freeze_max_seconds:
+                logging.info(f"Miner frozen for {frozen_for / 3600:.1f}h, restarting for a fresh pool session")
+                return False
+            
+            try:
+                self._send_signal(signal.SIGCONT)
+            except ProcessLookupError:
+                logging.warning(f"Frozen mining process {self.process_pid} is gone, starting a new one")
+                self._untrack()
+                return False
+            self._set_paused(None)
+            logging.info(f"Thawed mining process after {frozen_for:.0f}s: PID {self.process_pid}")
+            return True
+        
+        if self.api is None:
+            return False
+        
+        try:
+            self.api.resume()
+        except Exception as e:
+            logging.warning(f"xmrig API resume failed, restarting process instead: {e}")
+            return False
+        
+        self._set_paused(None)
+        logging.info(f"Resumed mining via API: PID {self.process_pid}")
+        return True
+    
+    def check_paused(self) -> None:
+        """Stop a frozen miner for real if the host needs its memory or it has been frozen too long"""
+        if self.pause_method != "freeze" or not self.is_running():
+            return
+        
+        reason = self._memory_pressure_reason()
+        if reason is None and self.paused_seconds() > self.freeze_max_seconds:
+            reason = f"frozen for {self.paused_seconds() / 3600:.1f}h"
+        if reason:
+            logging.info(f"Stopping frozen miner: {reason}")
+            self.terminate_mining()
+    
     def stop_mining(self) -> bool:
-        """Stop mining process"""
+        """Stop mining using the configured control mode"""
+        if self.is_running():
+            if self.paused:
+                logging.info("Mining already paused")
+                return True
+            if (self.api is not None or self.control_mode == "freeze") and self._pause():
+                return True
+        
+        return self.terminate_mining()
+    
+    def terminate_mining(self) -> bool:
+        """Stop mining process, escalating to SIGKILL only after stop_timeout"""
         pid = self.get_mining_pid()
         if pid is None:
             logging.info("No mining process to stop")
             return True
         
+        started = time.monotonic()
         try:
-            # Try graceful shutdown first
-            os.kill(pid, signal.SIGTERM)
-            time.sleep(2)
+            # Try graceful shutdown first and return as soon as the process exits
+            self._send_signal(signal.SIGTERM)
+            if self.pause_method == "freeze":
+                self._send_signal(signal.SIGCONT)  # A stopped process can't handle SIGTERM
+            forced = not self._wait_for_exit(self.stop_timeout)
             
-            # Force kill if still running
-            try:
-                os.kill(pid, signal.SIGKILL)
-            except ProcessLookupError:
-                pass  # Process already dead
+            # Force kill if still running after the grace period
+            if forced:
+                logging.warning(f"Mining process {pid} ignored SIGTERM for {self.stop_timeout}s, sending SIGKILL")
+                try:
+                    self._send_signal(signal.SIGKILL)
+                except ProcessLookupError:
+                    pass  # Process already dead
+                if not self._wait_for_exit(5.0):
+                    logging.error(f"Mining process {pid} survived SIGKILL")
+                    return False
             
-            logging.info(f"Stopped mining process: PID {pid}")
+            self._untrack()
+            self.last_stop_duration = time.monotonic() - started
+            self.last_stop_forced = forced
+            logging.info(f"Stopped mining process: PID {pid} in {self.last_stop_duration:.2f}s"
+                         f"{' (forced)' if forced else ''}")
             return True
         
         except Exception as e:
             logging.error(f"Failed to stop mining: {e}")
             return False
 
+class ThreadThrottle:
+    """PI controller mapping temperature headroom to a number of mining threads
+    
+    Headroom is the period threshold minus the current temperature, steered
+    towards target_headroom. The integral term holds the steady-state thread
+    fraction, so a room sitting near its threshold settles on partial hashrate
+    instead of switching off. Changes are rate limited so xmrig isn't
+    reconfigured every cycle; state lives in the controller state file.
+    """
+    
+    def __init__(self, config: Dict[str, Any], state: Dict[str, Any]):
+        self.kp = config.get("kp", 0.25)                  # Thread fraction per °C of headroom error
+        self.ki = config.get("ki", 0.02)                  # Thread fraction per °C per minute
+        self.target_headroom = config.get("target_headroom", 0.5)
+        self.hard_margin = config.get("hard_margin", 1.5)  # Stop completely this far over threshold
+        self.min_threads = config.get("min_threads", 1)
+        self.max_threads = config.get("max_threads") or os.cpu_count() or 1
+        self.min_change_interval = config.get("min_change_interval", 300)
+        self.max_step = config.get("max_step", 2)          # Threads added/removed per change
+        self.apply_via = config.get("apply_via", "config")  # config (watched file) or api
+        self.state = state
+        self.state.setdefault("integral", 1.0)
+    
+    @property
+    def threads(self) -> int:
+        return self.state.get("threads", self.max_threads)
+    
+    def update(self, temp: float, threshold: float, now: Optional[float] = None) -> Optional[int]:
+        """Feed a reading; returns a new thread count to apply, or None to keep the current one"""
+        if now is None:
+            now = time.time()
+        
+        error = (threshold - temp) - self.target_headroom
+        last_update = self.state.get("last_update")
+        minutes = min((now - last_update) / 60, 30.0) if last_update else 0.0
+        
+        # Clamp the integral to [0, 1] so it can't wind up while saturated
+        integral = min(1.0, max(0.0, self.state["integral"] + self.ki * error * minutes))
+        fraction = min(1.0, max(0.0, self.kp * error + integral))
+        target = max(self.min_threads, round(fraction * self.max_threads))
+        self.state.update(integral=integral, last_update=now, target=target)
+        
+        current = self.threads
+        if target == current or now - self.state.get("last_change", 0) < self.min_change_interval:
+            return None
+        
+        step = max(-self.max_step, min(self.max_step, target - current))
+        self.state.update(threads=current + step, last_change=now)
+        return current + step
+    
+    def _limit_cpu_profile(self, xmrig_config: Dict[str, Any], threads: int) -> None:
+        """Trim the RandomX thread list (or thread hint) in an xmrig config"""
+        cpu = xmrig_config.setdefault("cpu", {})
+        profile = self.state.get("rx_profile")
+        if profile is None and isinstance(cpu.get("rx"), list):
+            profile = self.state["rx_profile"] = cpu["rx"]
+        
+        if profile:
+            cpu["rx"] = profile[:threads]
+        else:
+            self.state.setdefault("threads_hint", cpu.get("max-threads-hint"))  # None: there was no hint
+            cpu["max-threads-hint"] = -(-100 * threads // self.max_threads)
+    
+    def _restore_cpu_profile(self, xmrig_config: Dict[str, Any]) -> None:
+        """Put back the thread list and hint saved before the first change"""
+        cpu = xmrig_config.setdefault("cpu", {})
+        if self.state.get("rx_profile"):
+            cpu["rx"] = self.state["rx_profile"]
+        if "threads_hint" in self.state:
+            if self.state["threads_hint"] is None:
+                cpu.pop("max-threads-hint", None)
+            else:
+                cpu["max-threads-hint"] = self.state["threads_hint"]
+    
+    def _edit_config(self, controller: "MiningController", edit: Callable[[Dict[str, Any]], None]) -> bool:
+        """Apply edit to xmrig's config through its watched config file or its API"""
+        try:
+            if self.apply_via == "api":
+                if controller.api is None:
+                    logging.warning("Throttle apply_via 'api' needs the xmrig http API enabled")
+                    return False
+                xmrig_config = controller.api.get_config()
+                edit(xmrig_config)
+                controller.api.put_config(xmrig_config)
+            else:
+                xmrig_config = _read_json(controller.config_file)
+                if xmrig_config is None:
+                    logging.warning(f"Cannot read xmrig config {controller.config_file}")
+                    return False
+                edit(xmrig_config)
+                # Replaced whole, never left half-written; xmrig ("watch": true) re-arms its
+                # watcher on the new file after every reload
+                _atomic_write_json(controller.config_file, xmrig_config, indent=4,
+                                   mode=stat.S_IMODE(os.stat(controller.config_file).st_mode))
+        except Exception as e:
+            logging.warning(f"Failed to update xmrig threads: {e}")
+            return False
+        return True
+    
+    def apply(self, threads: int, controller: "MiningController") -> bool:
+        """Push the thread count to xmrig through its watched config file or its API"""
+        if not self._edit_config(controller, lambda xmrig_config: self._limit_cpu_profile(xmrig_config, threads)):
+            return False
+        
+        logging.info(f"Throttle: {threads}/{self.max_threads} mining threads "
+                     f"(target {self.state.get('target')})")
+        return True
+    
+    def restore(self, controller: "MiningController") -> bool:
+        """Give xmrig back its own thread configuration, when throttling is turned off or the daemon exits"""
+        if not self.state.get("rx_profile") and "threads_hint" not in self.state:
+            return True
+        if not self._edit_config(controller, self._restore_cpu_profile):
+            return False
+        
+        for key in ("rx_profile", "threads_hint", "threads", "last_change"):
+            self.state.pop(key, None)
+        logging.info("Throttle: restored xmrig's thread configuration")
+        return True
+
+class ThermalModel:
+    """Forecasts the room temperature from recent readings
+    
+    Every reading is stored with whether the miner was hashing. Consecutive
+    readings in the same state give a heating (mining) or cooling (idle) rate,
+    and a decaying linear regression of rate against temperature learns a
+    first-order model per state: dT/dt = k (E - T), with E the temperature the
+    room settles at. Until a state has min_samples pairs and enough spread in
+    temperature, the forecast falls back to the slope of the recent readings,
+    then to the state's mean rate. Readings and statistics live in the
+    controller state file, so cron runs keep learning.
+    """
+    
+    MIN_PAIR_SECONDS = 30        # Shorter gaps are mostly sensor noise
+    MAX_PAIR_SECONDS = 1800      # Longer gaps may hide a start or stop
+    MIN_VARIANCE = 0.1           # °C² of temperature spread needed to fit k and E
+    MAX_READINGS = 120
+    
+    def __init__(self, config: Dict[str, Any], state: Dict[str, Any]):
+        self.model = config.get("model", "first_order")      # first_order or slope
+        self.horizon = config.get("horizon_minutes", 15)
+        self.slope_window = config.get("slope_window", 1800)  # Seconds of readings for the recent slope
+        self.half_life = config.get("learning_half_life", 7 * 86400)
+        self.min_samples = config.get("min_samples", 12)
+        self.state = state
+        self.state.setdefault("readings", [])
+        self.state.setdefault("stats", {})
+    
+    def observe(self, timestamp: float, temp: float, mining: bool) -> None:
+        """Add a reading; a repeated (cached) reading is ignored"""
+        readings = self.state["readings"]
+        if readings and timestamp <= readings[-1][0]:
+            return
+        if readings:
+            last_time, last_temp, last_mining = readings[-1]
+            elapsed = timestamp - last_time
+            if last_mining == mining and self.MIN_PAIR_SECONDS <= elapsed <= self.MAX_PAIR_SECONDS:
+                self._learn("mining" if mining else "idle", (last_temp + temp) / 2,
+                            (temp - last_temp) / (elapsed / 60), timestamp)
+        readings.append([timestamp, temp, mining])
+        self.state["readings"] = [r for r in readings if timestamp - r[0] <= self.slope_window][-self.MAX_READINGS:]
+    
+    def _learn(self, mode: str, temp: float, rate: float, now: float) -> None:
+        stats = self.state["stats"].setdefault(mode, {"w": 0.0, "x": 0.0, "y": 0.0, "xx": 0.0, "xy": 0.0,
+                                                      "time": now})
+        decay = 0.5 ** (max(0.0, now - stats["time"]) / self.half_life)
+        for key in ("w", "x", "y", "xx", "xy"):
+            stats[key] *= decay
+        stats["w"] += 1
+        stats["x"] += temp
+        stats["y"] += rate
+        stats["xx"] += temp * temp
+        stats["xy"] += temp * rate
+        stats["time"] = now
+    
+    def learned(self, mining: bool) -> Optional[Dict[str, Optional[float]]]:
+        """Mean rate (°C/min), k (1/min) and settling temperature E for a state, once learned"""
+        stats = self.state["stats"].get("mining" if mining else "idle")
+        if not stats or stats["w"] < self.min_samples:
+            return None
+        mean_temp, mean_rate = stats["x"] / stats["w"], stats["y"] / stats["w"]
+        variance = stats["xx"] / stats["w"] - mean_temp ** 2
+        covariance = stats["xy"] / stats["w"] - mean_temp * mean_rate
+        k = equilibrium = None
+        if variance >= self.MIN_VARIANCE and covariance < 0:
+            k = -covariance / variance
+            equilibrium = mean_temp + mean_rate / k
+        return {"rate": mean_rate, "k": k, "equilibrium": equilibrium}
+    
+    def slope(self, mining: bool) -> Optional[float]:
+        """Least-squares °C/min over the latest readings taken in this state"""
+        points = []
+        for timestamp, temp, was_mining in reversed(self.state["readings"]):
+            if was_mining != mining:
+                break
+            points.append((timestamp / 60, temp))
+        if len(points) < 3 or points[0][0] - points[-1][0] < 2:
+            return None
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_temp = sum(temp for _, temp in points) / len(points)
+        return (sum((t - mean_t) * (temp - mean_temp) for t, temp in points) /
+                sum((t - mean_t) ** 2 for t, _ in points))
+    
+    def forecast(self, temp: float, mining: bool, minutes: Optional[float] = None) -> Optional[float]:
+        """Temperature after minutes (default: the horizon) with the miner in this state"""
+        minutes = self.horizon if minutes is None else minutes
+        learned = self.learned(mining)
+        if self.model == "first_order" and learned and learned["k"] is not None:
+            return learned["equilibrium"] + (temp - learned["equilibrium"]) * math.exp(-learned["k"] * minutes)
+        slope = self.slope(mining)
+        if slope is not None:
+            return temp + slope * minutes
+        if learned:
+            return temp + learned["rate"] * minutes
+        return None
+    
+    def seconds_until_headroom(self, temp: float, limit: float, max_seconds: float,
+                               step: float = 30.0) -> Optional[float]:
+        """Idle time after which mining for the horizon is forecast to stay at or below limit"""
+        waited = 0.0
+        while waited <= max_seconds:
+            idle_temp = self.forecast(temp, False, waited / 60) if waited else temp
+            if idle_temp is None:
+                return None
+            mining_temp = self.forecast(idle_temp, True)
+            if mining_temp is None:
+                return None
+            if mining_temp <= limit:
+                return waited
+            waited += step
+        return None
+
+class Prewarm:
+    """Measured miner start-up and stop times, for acting ahead of rate period changes
+    
+    A fresh xmrig spends its first seconds allocating huge pages and building
+    the RandomX dataset. The time from launch to xmrig's "READY threads" log
+    line is measured on every launch, and starts before a cheaper period are
+    brought forward by the longest recent measurement so the miner is hashing
+    when the period begins. Stops before a more expensive period are brought
+    forward by the measured stop time. Measurements live in the controller
+    state file.
+    """
+    
+    def __init__(self, config: Dict[str, Any], state: Dict[str, Any]):
+        self.margin = config.get("margin_seconds", 5)       # Added to the measured start-up time
+        self.max_seconds = config.get("max_seconds", 300)   # Never start earlier than this
+        self.samples = config.get("samples", 5)             # Start-up measurements kept
+        self.idle_priority = config.get("idle_priority", True)  # SCHED_IDLE until the period begins
+        self.state = state
+    
+    def start_lead(self) -> Optional[float]:
+        """Seconds before a period change to launch the miner, once measured"""
+        measured = self.state.get("init_seconds")
+        if not measured:
+            return None
+        return min(self.max_seconds, max(measured) + self.margin)
+    
+    def stop_lead(self) -> float:
+        return self.state.get("stop_seconds", 0.0)
+    
+    def launched(self, when: float, boundary: Optional[datetime] = None) -> None:
+        """Note a new miner process; boundary is the period change a pre-warm start is for"""
+        self.state["launched"] = when
+        self.state["boundary"] = boundary.timestamp() if boundary else None
+    
+    def ready(self, when: float) -> Optional[float]:
+        """Record xmrig's threads becoming ready; returns the start-up time"""
+        launched = self.state.get("launched")
+        if launched is None or when < launched - 1:
+            return None  # Not from the launch we timed
+        seconds = max(0.0, when - launched)
+        self.state["init_seconds"] = (self.state.get("init_seconds", []) + [round(seconds, 2)])[-self.samples:]
+        self.state["launched"] = None
+        return seconds
+    
+    def stopped(self, seconds: Optional[float]) -> None:
+        if seconds is not None:
+            previous = self.state.get("stop_seconds", seconds)
+            self.state["stop_seconds"] = round(0.7 * previous + 0.3 * seconds, 3)
+    
+    def settle(self, controller: "MiningController", now: Optional[float] = None) -> None:
+        """Give a pre-warmed miner normal priority once its period has begun"""
+        boundary = self.state.get("boundary")
+        if boundary is None or (time.time() if now is None else now) < boundary:
+            return
+        self.state["boundary"] = None
+        if self.idle_priority and controller.set_idle_priority(False):
+            logging.info("Pre-warmed miner moved to normal priority")
+
+class StartStopGuard:
+    """Hysteresis and minimum run/off times that keep the miner from flapping
+    
+    Without a deadband a room hovering at its threshold starts and stops xmrig
+    on alternate cycles, and every start spends restart_cost_seconds at full
+    power rebuilding the RandomX dataset. After a temperature stop the miner
+    only restarts once the room is the period's band below the limit; a
+    temperature stop is held off for min_run_seconds after a start (unless the
+    room goes a band over the limit); starts wait min_off_seconds after a stop
+    and must fit the restart budget. Rate-driven stops are never held. Resuming
+    a paused miner keeps its dataset, so it skips min_off_seconds and the budget.
+    
+    State (recent starts, the current hold, counters) lives in the controller
+    state file so cron runs see each other's starts and stops.
+    """
+    
+    def __init__(self, config: Dict[str, Any], state: Dict[str, Any]):
+        self.enabled = config.get("enabled", False)
+        self.bands = config.get("bands", {})               # °C below the limit before restarting, per period
+        self.default_band = config.get("band", 1.0)
+        self.min_run_seconds = config.get("min_run_seconds", 900)
+        self.min_off_seconds = config.get("min_off_seconds", 600)
+        self.restart_cost_seconds = config.get("restart_cost_seconds", 30)  # Full-power dataset init per start
+        self.restart_budget_seconds = config.get("restart_budget_seconds", 120)  # Restart cost allowed per window
+        self.budget_window = config.get("budget_window", 3600)
+        self.flap_seconds = config.get("flap_seconds", 1800)  # Runs or stops shorter than this are flaps
+        self.state = state
+        self.events: List[str] = []                         # flap, hold, avoided - this cycle only
+    
+    def band(self, period: RatePeriod) -> float:
+        return self.bands.get(period.value, self.default_band)
+    
+    def _hold(self, decision: Decision, running: bool, margin: float, now: float,
+              warm: bool = False) -> Optional[tuple]:
+        """(reason code, explanation) if the wanted start or stop must wait"""
+        if running:
+            if decision.code != ReasonCode.TOO_HOT:
+                return None
+            ran = now - self.state.get("last_start", 0)
+            ceiling = decision.threshold + margin + self.band(decision.period)
+            if ran < self.min_run_seconds and decision.temperature <= ceiling:
+                return (ReasonCode.MIN_RUN, f"minimum run time ({self.min_run_seconds - ran:.0f}s left)")
+            return None
+        
+        stopped = now - self.state.get("last_stop", 0)
+        if stopped < self.min_off_seconds and not warm:
+            return (ReasonCode.MIN_OFF, f"minimum off time ({self.min_off_seconds - stopped:.0f}s left)")
+        if self.state.get("stopped_hot") and decision.temperature is not None and decision.threshold is not None:
+            restart_at = decision.threshold + margin - self.band(decision.period)
+            if decision.temperature > restart_at:
+                return (ReasonCode.HYSTERESIS, f"hysteresis, restarts at {restart_at:.1f}°C")
+        starts = [t for t in self.state.get("starts", []) if now - t < self.budget_window]
+        if not warm and (len(starts) + 1) * self.restart_cost_seconds > self.restart_budget_seconds:
+            return (ReasonCode.RESTART_BUDGET, f"restart budget, {len(starts)} starts in the last "
+                                               f"{self.budget_window / 60:.0f} min")
+        return None
+    
+    def filter(self, decision: Decision, running: bool, margin: float = 0.0,
+               now: Optional[float] = None, warm: bool = False) -> Decision:
+        """The decision to act on: unchanged, or held at the current miner state
+
+        warm means a start would resume a paused miner rather than launch a new one.
+        """
+        now = time.time() if now is None else now
+        self.events = []
+        held = self.state.get("hold")
+        if decision.should_run == running:
+            if held is not None:
+                # The start or stop held back is no longer wanted: one restart saved
+                self.state["avoided"] = self.state.get("avoided", 0) + 1
+                self.events.append("avoided")
+                del self.state["hold"]
+            return decision
+        
+        hold = self._hold(decision, running, margin, now, warm) if self.enabled else None
+        if hold is None:
+            self.state.pop("hold", None)
+            return decision
+        
+        code, explanation = hold
+        if held is None or held["code"] != code:
+            self.state["hold"] = {"code": int(code), "since": now}
+            self.events.append("hold")
+        return replace(decision, should_run=running, reason=f"{decision.reason}; held by {explanation}", code=code)
+    
+    def record(self, started: bool, stopped: bool, decision: Decision, now: Optional[float] = None,
+               cold: bool = True) -> None:
+        """Note an actual start or stop, counting flaps; only cold starts (a new process) use the budget"""
+        now = time.time() if now is None else now
+        if not (started or stopped):
+            return
+        last = self.state.get("last_stop" if started else "last_start")
+        if last is not None and now - last < self.flap_seconds:
+            self.state["flaps"] = self.state.get("flaps", 0) + 1
+            self.events.append("flap")
+        if started:
+            self.state["last_start"] = now
+            self.state["stopped_hot"] = False
+            starts = [t for t in self.state.get("starts", []) if now - t < self.budget_window]
+            self.state["starts"] = starts + [now] if cold else starts
+        else:
+            self.state["last_stop"] = now
+            self.state["stopped_hot"] = decision.code == ReasonCode.TOO_HOT
+
 class PeakPause:
     """Main PeakPause controller"""
     
     def __init__(self, config_file: str = "peakpause_config.json"):
-        self.config_manager = PeakPauseConfig(config_file)
+        self.config_file = config_file
+        self.state = None
+        self.last_decision = None
+        self._last_reading: Optional[TemperatureReading] = None  # Taken by the latest evaluate()
+        self.pending_start: Optional[datetime] = None
+        self.pending_recheck: Optional[datetime] = None  # When the thermal model expects headroom again
+        self.metrics: Optional[ControllerMetrics] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.slow_cycle_hooks: List[Callable[[CycleStats], None]] = []
+        self._phases: Dict[str, float] = {}
+        self._load_components()
+        
+        # Continuous mode control (set from signal handlers or other threads)
+        self._stop_requested = threading.Event()
+        self._reload_requested = threading.Event()
+        self._wake = threading.Event()
+        self.cycle_count = 0
+        
+        # Setup logging
+        self._setup_logging()
+        
+        logging.info("PeakPause initialized")
+    
+    def _load_components(self):
+        """Load configuration and (re)build all components"""
+        self.config_manager = PeakPauseConfig(self.config_file)
         self.config = self.config_manager.config
         
         # Initialize components
         self.temp_monitor = TemperatureMonitor(self.config["temperature"])
-        self.rates = ULORates(**self.config["rates"])
-        self.scheduler = ULOScheduler(self.rates)
+        self.temp_monitor.add_listener(self._on_temperature_push)
+        self.rates = ULORates(**self.config.get("rates", {}))
+        self.scheduler = make_scheduler(self.config)
         self.temp_thresholds = TempThresholds(**self.config["temperature"]["thresholds"])
         self.mining_controller = MiningController(self.config["mining"])
         
-        # Setup logging
-        self._setup_logging()
+        # Controller state that must survive between cron runs
+        if self.state is None:
+            self.state_file = self.config.get(
+                "state_file", str(Path(self.config_file).with_name("peakpause_state.json")))
+            self.state = _read_json(self.state_file) or {}
+            self._saved_state = json.dumps(self.state, sort_keys=True)
         
-        logging.info("PeakPause initialized")
+        thermal_config = self.config.get("thermal", {})
+        self.thermal = None
+        if thermal_config.get("enabled", False):
+            self.thermal = ThermalModel(thermal_config, self.state.setdefault("thermal", {}))
+        
+        prewarm_config = self.config.get("prewarm", {})
+        self.prewarm = None
+        if prewarm_config.get("enabled", False):
+            self.prewarm = Prewarm(prewarm_config, self.state.setdefault("prewarm", {}))
+        
+        # Flaps are counted even with the guard disabled, to compare against
+        self.guard = StartStopGuard(self.config.get("hysteresis", {}), self.state.setdefault("hysteresis", {}))
+        
+        throttle_config = self.config.get("throttle", {})
+        self.throttle = None
+        if throttle_config.get("enabled", False):
+            self.throttle = ThreadThrottle(throttle_config, self.state.setdefault("throttle", {}))
+        elif self.state.get("throttle"):
+            # Turned off: undo the thread limit left in xmrig's config
+            ThreadThrottle(throttle_config, self.state["throttle"]).restore(self.mining_controller)
+        
+        # Fleet role: standalone (default), coordinator (decides for everyone) or agent
+        fleet_config = self.config.get("fleet", {})
+        role = fleet_config.get("role", "standalone")
+        self.fleet = None
+        if role == "coordinator":
+            self.fleet = FleetCoordinator(fleet_config)
+        elif role == "agent":
+            self.fleet = FleetAgent(fleet_config, on_change=lambda payload: self.wake()).start()
+        
+        # Deterministic per-host delay after a period change, spreading fleet start-ups
+        ramp_window = fleet_config.get("ramp_window", 0)
+        self.worker_name = fleet_config.get("worker_name") or self._xmrig_worker_name() or socket.gethostname()
+        self.start_offset = self.stagger_offset(self.worker_name, ramp_window)
+        
+        log_config = self.config.get("miner_log", {})
+        self.miner_log = None
+        if log_config.get("enabled", False):
+            self.miner_log = LogTailer(self.mining_controller.log_file, self.state.setdefault("miner_log", {}),
+                                       log_config)
+        
+        telemetry_config = self.config.get("telemetry", {})
+        self.telemetry = None
+        if telemetry_config.get("enabled", False):
+            client = self.mining_controller.api or XmrigApiClient.from_xmrig_config(
+                self.mining_controller.config_file, self.config["mining"].get("api"))
+            if client is None:
+                logging.warning("Telemetry needs the xmrig http API enabled, not recording")
+            else:
+                self.telemetry = TelemetryCollector(telemetry_config, client)
+        
+        # Counters carry over config reloads, and across cron runs when written to a textfile
+        metrics_config = self.config.get("metrics", {})
+        self.slow_cycle_seconds = metrics_config.get("slow_cycle_seconds")
+        if not metrics_config.get("enabled", False):
+            self.metrics = None
+        elif self.metrics is None:
+            self.metrics = ControllerMetrics()
+            self.metrics.registry.restore(self.state.get("metrics", {}))
+        if self.metrics is not None:
+            self.temp_monitor.add_read_observer(self._observe_sensor_read)
+        
+        journal_config = self.config.get("journal", {})
+        self.journal = None
+        if journal_config.get("enabled", False):
+            self.journal = JournalWriter(journal_path(self.config_file, journal_config))
+        
+        profitability_config = self.config.get("profitability", {})
+        self.profitability = None
+        if profitability_config.get("enabled", False):
+            self.profitability = ProfitabilityEstimator(profitability_config,
+                                                        self.state.setdefault("profitability", {}))
+    
+    def _xmrig_worker_name(self) -> Optional[str]:
+        """rig-id that setup_config.py wrote into the xmrig config"""
+        pools = (_read_json(self.mining_controller.config_file) or {}).get("pools") or [{}]
+        return pools[0].get("rig-id")
+    
+    @staticmethod
+    def stagger_offset(worker_name: str, ramp_window: float) -> float:
+        """Seconds in [0, ramp_window) derived from the worker name - the same on every run"""
+        if not ramp_window:
+            return 0.0
+        digest = hashlib.sha256(worker_name.encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64 * ramp_window
+    
+    def _start_delay(self, now: datetime) -> float:
+        """Seconds to hold back a start that falls inside this host's ramp slot
+        
+        With pre-warming the launch is brought forward by the start lead, so
+        the miner is hashing when the slot begins.
+        """
+        if not self.start_offset:
+            return 0.0
+        boundary = self.scheduler.last_transition(now)
+        if boundary is None:
+            return 0.0
+        lead = (self.prewarm.start_lead() if self.prewarm is not None else None) or 0.0
+        return max(0.0, (boundary - now).total_seconds() + self.start_offset - lead)
+    
+    def _save_state(self) -> None:
+        """Persist controller state if it changed this cycle"""
+        serialized = json.dumps(self.state, sort_keys=True)
+        if serialized == self._saved_state:
+            return
+        
+        try:
+            _atomic_write_json(self.state_file, self.state)
+            self._saved_state = serialized
+        except OSError as e:
+            logging.warning(f"Could not save state to {self.state_file}: {e}")
+    
+    def reload_config(self) -> bool:
+        """Re-read the config file and rebuild components, keeping the old ones on error"""
+        previous = dict(vars(self))
+        try:
+            self._load_components()
+        except Exception as e:
+            # Components built before the error are dropped, and every attribute goes back at once
+            rebuilt = dict(vars(self))
+            vars(self).clear()
+            vars(self).update(previous)
+            self._release_components(rebuilt, previous)
+            logging.error(f"Config reload failed, keeping previous config: {e}")
+            return False
+        
+        self.mining_controller.take_over(previous["mining_controller"])
+        self._release_components(previous, vars(self))
+        metrics_before, metrics_after = previous["config"].get("metrics", {}), self.config.get("metrics", {})
+        if self.metrics_server is not None and (
+                self.metrics is not previous["metrics"]
+                or any(metrics_before.get(key) != metrics_after.get(key) for key in ("listen", "port"))):
+            # Rebound by run_continuous, on the new address and registry
+            self.metrics_server.close()
+            self.metrics_server = None
+        if previous["telemetry"] is not None and previous["telemetry"].running:
+            previous["telemetry"].stop()  # Saves, so the new collector continues the same history
+            if self.telemetry is not None:
+                self.telemetry.start()
+        
+        logging.getLogger().setLevel(getattr(logging, self.config["logging"]["level"]))
+        logging.info(f"Configuration reloaded from {self.config_file}")
+        return True
+    
+    @staticmethod
+    def _release_components(components: Dict[str, Any], kept: Dict[str, Any]) -> None:
+        """Close the sensor subscriptions, pidfd and fleet link in components that kept does not share"""
+        miner = components.get("mining_controller")
+        if miner is not None and miner is not kept.get("mining_controller"):
+            miner._untrack(remove_pid_file=False)
+        monitor = components.get("temp_monitor")
+        if monitor is not None and monitor is not kept.get("temp_monitor"):
+            monitor.close()
+        fleet = components.get("fleet")
+        if fleet is kept.get("fleet"):
+            return
+        if isinstance(fleet, FleetCoordinator):
+            fleet.close()
+        elif isinstance(fleet, FleetAgent):
+            fleet.stop()
     
     def _setup_logging(self):
         """Setup logging configuration"""
@@ -388,55 +2296,141 @@ class PeakPause:
     
     def should_mine(self, dt: Optional[datetime] = None) -> tuple[bool, str]:
         """Determine if mining should run based on rates and temperature"""
+        decision = self.evaluate(dt)
+        return decision.should_run, decision.reason
+    
+    def decide(self) -> Decision:
+        """Decision for this cycle - the coordinator's when running as a fleet agent"""
+        if isinstance(self.fleet, FleetAgent):
+            payload = self.fleet.current()
+            if payload is not None:
+                return Decision(payload["should_run"], f"Fleet ({payload['coordinator']}): {payload['reason']}",
+                                RatePeriod(payload["period"]), payload["rate"], payload.get("temperature"),
+                                payload.get("threshold"), payload.get("temperature_age"),
+                                payload.get("code", ReasonCode.UNKNOWN), payload.get("forecast"))
+            logging.warning("No fleet decision from the coordinator, deciding locally")
+        
+        decision = self.evaluate()
+        
+        if isinstance(self.fleet, FleetCoordinator):
+            if self.fleet.hold:
+                decision = Decision(False, "Fleet hold: mining stopped on all agents", decision.period,
+                                    decision.rate, decision.temperature, decision.threshold,
+                                    decision.temperature_age, ReasonCode.FLEET_HOLD, decision.forecast)
+            self.fleet.publish({"should_run": decision.should_run, "reason": decision.reason,
+                                "period": decision.period.value, "rate": decision.rate,
+                                "temperature": decision.temperature, "threshold": decision.threshold,
+                                "temperature_age": decision.temperature_age, "code": int(decision.code),
+                                "forecast": decision.forecast})
+        return decision
+    
+    def evaluate(self, dt: Optional[datetime] = None) -> Decision:
+        """Full mining decision, including the readings it was based on"""
+        self._last_reading = self.temp_monitor.get_reading()
+        return self._evaluate(dt, self._last_reading)
+    
+    def _evaluate(self, dt: Optional[datetime], reading: Optional[TemperatureReading]) -> Decision:
+        """Mining decision at dt for a reading already taken"""
         if dt is None:
             dt = datetime.now()
         
         period = self.scheduler.get_current_period(dt)
-        rate = self.scheduler.get_rate(period)
+        rate = self.scheduler.get_rate(period, dt)
         
-        # Get temperature
-        temp = self.temp_monitor.get_temperature()
+        temp = reading.value if reading else None
+        temp_age = reading.age if reading else None
         temp_available = temp is not None
         
         if not temp_available:
             # No temperature reading - only mine during ultra-low rate period for safety
-            if period == RatePeriod.ULTRA_LOW:
+            if period == self.scheduler.cheapest_period:
                 # Only mine during ultra-low rate period (2.8¢/kWh) - cheapest electricity
-                return True, f"Mining approved: {period.value} at {rate}¢/kWh (no temp sensor, ULO only)"
+                return Decision(True, f"Mining approved: {period.value} at {rate}¢/kWh (no temp sensor, ULO only)",
+                                period, rate, code=ReasonCode.NO_SENSOR_CHEAPEST)
             else:
                 # Be conservative during all other periods without temperature
-                return False, f"Mining blocked: {period.value} at {rate}¢/kWh (no temp sensor, ULO only policy)"
+                return Decision(False, f"Mining blocked: {period.value} at {rate}¢/kWh (no temp sensor, ULO only policy)",
+                                period, rate, code=ReasonCode.NO_SENSOR_BLOCKED)
         else:
             temp = float(temp)
         
         # Get temperature threshold for current period
         threshold = getattr(self.temp_thresholds, period.value)
         
+        # A stale cached reading is treated conservatively
+        stale = temp_age > self.temp_monitor.fresh_age
+        if stale:
+            threshold -= self.temp_monitor.stale_margin
+        
+        # With throttling, threads are reduced near the threshold and mining
+        # only stops once the hard margin above it is exceeded
+        limit = threshold + self.throttle.hard_margin if self.throttle else threshold
+        
+        # Where the room will be after the horizon if the miner runs (or is started) now
+        forecast = None
+        if self.thermal is not None:
+            self.thermal.observe(reading.timestamp, temp, self.mining_controller.is_mining())
+            forecast = self.thermal.forecast(temp, True)
+        
         # Check temperature if we have a reading or are in expensive periods
         if temp_available or period in [RatePeriod.MID_PEAK, RatePeriod.ON_PEAK]:
-            if temp > threshold:
-                return False, f"Temperature too high: {temp:.1f}°C > {threshold}°C for {period.value}"
+            if temp > limit:
+                return Decision(False, f"Temperature too high: {temp:.1f}°C > {limit}°C for {period.value}"
+                                       f"{f' (reading {temp_age:.0f}s old)' if stale else ''}",
+                                period, rate, temp, threshold, temp_age, ReasonCode.TOO_HOT, forecast)
+            if forecast is not None and forecast > limit:
+                return Decision(False, f"Temperature forecast too high: {forecast:.1f}°C in "
+                                       f"{self.thermal.horizon} min > {limit}°C for {period.value} "
+                                       f"(now {temp:.1f}°C)",
+                                period, rate, temp, threshold, temp_age, ReasonCode.TOO_HOT, forecast)
         
         # Check mining policy
         policy = self.config["mining_policy"]
+        temp_status = f"temp {temp:.1f}°C" if temp_available else "no temp sensor"
+        if stale:
+            temp_status += f" ({temp_age:.0f}s old)"
+        
+        estimate = None
+        if self.profitability and period in (RatePeriod.MID_PEAK, RatePeriod.ON_PEAK):
+            estimate = self.profitability.estimate(self.telemetry)
+        
+        if estimate is not None:
+            # Expensive periods are mined only when the revenue pays for the electricity
+            margin = estimate.margin(rate)
+            economics = f"revenue {estimate.revenue_per_kwh:.1f}¢/kWh = {margin:.2f}x the rate"
+            if period == RatePeriod.ON_PEAK and estimate.revenue_per_kwh >= policy["force_mine_threshold"]:
+                return Decision(True, f"Mining forced on peak: {economics} ≥ "
+                                      f"{policy['force_mine_threshold']}¢/kWh threshold, {temp_status}",
+                                period, rate, temp, threshold, temp_age, ReasonCode.PROFIT_FORCED, forecast)
+            if period == RatePeriod.ON_PEAK and not policy["mine_on_peak"]:
+                return Decision(False, f"On-peak period blocked by policy: {rate}¢/kWh, {economics}",
+                                period, rate, temp, threshold, temp_age, ReasonCode.ON_PEAK_POLICY, forecast)
+            if margin < policy.get("min_profit_margin", 1.5):
+                return Decision(False, f"Not profitable: {period.value} at {rate}¢/kWh, {economics} "
+                                       f"< {policy.get('min_profit_margin', 1.5)}x margin",
+                                period, rate, temp, threshold, temp_age, ReasonCode.NOT_PROFITABLE, forecast)
+            return Decision(True, f"Mining approved: {period.value} at {rate}¢/kWh, {economics}, {temp_status}",
+                            period, rate, temp, threshold, temp_age, ReasonCode.APPROVED, forecast)
         
         if period == RatePeriod.ON_PEAK:
             if not policy["mine_on_peak"]:
-                return False, f"On-peak period blocked by policy: {rate}¢/kWh"
+                return Decision(False, f"On-peak period blocked by policy: {rate}¢/kWh",
+                                period, rate, temp, threshold, temp_age, ReasonCode.ON_PEAK_POLICY, forecast)
             
             # Only mine on peak if forced by high profitability
             if rate < policy["force_mine_threshold"]:
-                return False, f"On-peak rate too high: {rate}¢/kWh < {policy['force_mine_threshold']}¢/kWh threshold"
+                return Decision(False, f"On-peak rate too high: {rate}¢/kWh < {policy['force_mine_threshold']}¢/kWh threshold",
+                                period, rate, temp, threshold, temp_age, ReasonCode.ON_PEAK_RATE, forecast)
         
         # Mine during all other periods (with temperature check passed if available)
-        temp_status = f"temp {temp:.1f}°C" if temp_available else "no temp sensor"
-        return True, f"Mining approved: {period.value} at {rate}¢/kWh, {temp_status}"
+        return Decision(True, f"Mining approved: {period.value} at {rate}¢/kWh, {temp_status}",
+                        period, rate, temp, threshold, temp_age, ReasonCode.APPROVED, forecast)
     
     def run_once(self, force_mining: bool = False) -> None:
         """Single execution cycle"""
         if force_mining:
             # Force mining regardless of rates or temperature
-            is_running = self.mining_controller.is_running()
+            is_running = self.mining_controller.is_mining()
             if not is_running:
                 logging.info("FORCE MODE: Starting mining regardless of conditions")
                 self.mining_controller.start_mining()
@@ -444,33 +2438,406 @@ class PeakPause:
                 logging.info("FORCE MODE: Mining already running")
             return
         
-        should_run, reason = self.should_mine()
-        is_running = self.mining_controller.is_running()
+        self._phases = {}
+        cycle_started = time.perf_counter()
+        with self._phase("telemetry"):
+            self._poll_telemetry()
+            self._read_miner_log()
+        with self._phase("decision"):
+            decision = self.decide()
+        killed_before = self.mining_controller.duplicates_killed
+        started = stopped = False
+        is_running = self.mining_controller.is_mining()
+        launched_before = self.mining_controller.last_launch
+        decision, prewarm_boundary = self._anticipate(decision, is_running)
+        decision = self.guard.filter(decision, is_running, self.throttle.hard_margin if self.throttle else 0.0,
+                                     warm=self.mining_controller.resumable)
+        self.last_decision = decision
+        should_run = decision.should_run
+        if self.profitability and self.profitability.power:
+            self.profitability.power.update(is_running)
+        
+        logging.info(f"Check: {decision.reason}")
+        
+        if should_run and self.throttle and decision.temperature is not None:
+            # Throttle on the forecast so threads come off before the threshold is reached
+            threads = self.throttle.update(decision.forecast if decision.forecast is not None
+                                           else decision.temperature, decision.threshold)
+            if threads is not None:
+                self.throttle.apply(threads, self.mining_controller)
         
-        logging.info(f"Check: {reason}")
+        start_delay = (self._start_delay(datetime.now())
+                       if should_run and not is_running and prewarm_boundary is None else 0.0)
+        self.pending_start = datetime.now() + timedelta(seconds=start_delay) if start_delay else None
+        action = Action.CONTINUE if is_running else Action.IDLE
         
-        if should_run and not is_running:
+        if start_delay:
+            # Stops are never delayed - only starts are spread out
+            logging.info(f"Staggered start: {self.worker_name} starts {start_delay:.0f}s from now "
+                         f"({self.start_offset:.0f}s after the period change)")
+            action = Action.DEFER
+        elif should_run and not is_running:
             logging.info("Starting mining")
-            self.mining_controller.start_mining()
+            idle_priority = prewarm_boundary is not None and self.prewarm.idle_priority
+            with self._phase("start"):
+                started = self.mining_controller.start_mining(idle_priority)
+            action = Action.START
+            if self.prewarm is not None and self.mining_controller.last_launch != launched_before:
+                self.prewarm.launched(self.mining_controller.last_launch, prewarm_boundary)
         elif not should_run and is_running:
             logging.info("Stopping mining")
-            self.mining_controller.stop_mining()
+            with self._phase("stop"):
+                stopped = self.mining_controller.stop_mining()
+            action = Action.STOP
+            if stopped and self.prewarm is not None:
+                self.prewarm.stopped(self.mining_controller.last_stop_duration)
         elif should_run and is_running:
             logging.info("Mining continues")
+            self._warn_if_stalled()
+            if self.prewarm is not None:
+                self.prewarm.settle(self.mining_controller)
         else:
             logging.info("Mining remains stopped")
+            self.mining_controller.check_paused()
+        self.guard.record(started, stopped, decision, cold=self.mining_controller.last_launch != launched_before)
+        self.pending_recheck = self._headroom_time(decision) if not should_run else None
+        
+        if self.metrics is not None:
+            self._record_metrics(decision, started, stopped, killed_before)
+        if self.journal is not None:
+            self._journal_decision(decision, action, (time.perf_counter() - cycle_started) * 1000.0)
+        self._save_state()
+    
+    @contextmanager
+    def _phase(self, name: str):
+        """Time one phase of the current cycle into self._phases (milliseconds)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = (time.perf_counter() - started) * 1000.0
+    
+    def _anticipate(self, decision: Decision, is_running: bool,
+                    now: Optional[datetime] = None) -> tuple[Decision, Optional[datetime]]:
+        """Act on the next period's decision when its change is closer than the start or stop time
+        
+        Returns the decision to act on and, for a pre-warm start, the period change it is for.
+        """
+        if self.prewarm is None or isinstance(self.fleet, FleetAgent):
+            return decision, None
+        now = datetime.now() if now is None else now
+        change = self.scheduler.next_transition(now)
+        if change is None:
+            return decision, None
+        until_change = (change - now).total_seconds()
+        start_lead = self.prewarm.start_lead()
+        
+        # Starts aim at this host's ramp slot after the change, stops at the change itself
+        slot = change + timedelta(seconds=self.start_offset)
+        if not decision.should_run and start_lead is not None and until_change + self.start_offset <= start_lead:
+            if not is_running and self.mining_controller.paused:
+                return decision, None  # A paused miner resumes instantly at the change
+            upcoming = self._evaluate(change, self._last_reading)
+            if upcoming.should_run:
+                # Launch now, or keep a pre-warmed miner running into its period
+                return replace(upcoming, reason=f"Pre-warming {start_lead:.0f}s before {upcoming.period.value} "
+                                                f"at {slot:%H:%M:%S}: {upcoming.reason}",
+                               code=ReasonCode.PREWARM), change
+        elif decision.should_run and is_running and until_change <= self.prewarm.stop_lead():
+            upcoming = self._evaluate(change, self._last_reading)
+            if not upcoming.should_run:
+                return replace(upcoming, reason=f"Stopping for {upcoming.period.value} at {change:%H:%M}: "
+                                                f"{upcoming.reason}"), None
+        return decision, None
+    
+    def _transition_lead(self) -> float:
+        """How far ahead of the next period change the next cycle should run"""
+        if self.prewarm is None or isinstance(self.fleet, FleetAgent):
+            return 0.0
+        if self.mining_controller.is_mining():
+            return self.prewarm.stop_lead()
+        if self.mining_controller.paused:
+            return 0.0
+        # A slot later than the lead is reached through the staggered start instead
+        return max(0.0, (self.prewarm.start_lead() or 0.0) - self.start_offset)
+    
+    def _headroom_time(self, decision: Decision) -> Optional[datetime]:
+        """When the thermal model expects a miner stopped for temperature could run again"""
+        if self.thermal is None or decision.code not in (ReasonCode.TOO_HOT, ReasonCode.HYSTERESIS):
+            return None
+        limit = decision.threshold + (self.throttle.hard_margin if self.throttle else 0.0)
+        if self.guard.enabled and self.guard.state.get("stopped_hot"):
+            limit -= self.guard.band(decision.period)
+        seconds = self.thermal.seconds_until_headroom(decision.temperature, limit, self.MAX_RECHECK_SECONDS)
+        if seconds is None:
+            return None
+        logging.info(f"Thermal model expects headroom in {seconds / 60:.0f} min")
+        return datetime.now() + timedelta(seconds=seconds)
+    
+    def _journal_decision(self, decision: Decision, action: Action, cycle_ms: float) -> None:
+        """Append this cycle's decision and outcome to the journal"""
+        flags = SHOULD_RUN if decision.should_run else 0
+        if self.mining_controller.is_mining():
+            flags |= MINING
+        if decision.temperature_age is not None and decision.temperature_age > self.temp_monitor.fresh_age:
+            flags |= STALE
+        if isinstance(self.fleet, FleetAgent) and decision.reason.startswith("Fleet ("):
+            flags |= FLEET
+        self.journal.append(time.time(), decision.period.value, action, decision.code, flags, decision.rate,
+                            decision.temperature, decision.threshold, cycle_ms)
+    
+    def _observe_sensor_read(self, source: str, seconds: float, ok: bool) -> None:
+        if self.metrics is None:
+            return
+        self.metrics.sensor_read.observe(seconds, source=source)
+        if not ok:
+            self.metrics.sensor_failures.inc(source=source)
+    
+    def _record_metrics(self, decision: Decision, started: bool, stopped: bool, killed_before: int) -> None:
+        """Update metrics from the phases and outcome of this cycle"""
+        m = self.metrics
+        m.decision.observe(self._phases["decision"] / 1000.0)
+        if "start" in self._phases:
+            m.start_duration.observe(self._phases["start"] / 1000.0)
+        if "stop" in self._phases:
+            m.stop_duration.observe(self._phases["stop"] / 1000.0)
+        if started:
+            m.starts.inc()
+        if stopped:
+            m.stops.inc()
+        killed = self.mining_controller.duplicates_killed - killed_before
+        if killed:
+            m.duplicate_kills.inc(killed)
+        for event in self.guard.events:
+            if event == "hold":
+                m.holds.inc(reason=ReasonCode(decision.code).name.lower())
+            elif event == "avoided":
+                m.restarts_avoided.inc()
+            else:
+                m.flaps.inc()
+        
+        for period in RatePeriod:
+            m.period.set(1 if period == decision.period else 0, period=period.value)
+        m.rate.set(decision.rate)
+        if decision.temperature is not None:
+            m.temperature.set(decision.temperature)
+        if decision.threshold is not None:
+            m.threshold.set(decision.threshold)
+        mining = self.mining_controller.is_mining()
+        m.mining.set(1 if mining else 0)
+        m.update_duty_cycle(self.state.setdefault("duty_cycle", {}), mining)
+    
+    def _poll_telemetry(self) -> None:
+        """Sample the miner once per cron run; in continuous mode a background thread samples"""
+        if self.telemetry is None or self.telemetry.running:
+            return
+        self.telemetry.poll()
+        self.telemetry.save()
+    
+    # Errors from one cycle's log lines that are logged individually
+    MAX_LOGGED_ERRORS = 5
+    
+    def _read_miner_log(self) -> None:
+        """Parse what xmrig logged since the last cycle: latest speed and shares, and its errors"""
+        if self.miner_log is None:
+            return
+        
+        errors = []
+        for event in self.miner_log.read_events():
+            if event.kind == "error":
+                errors.append(event)
+            elif event.kind == "speed":
+                self.miner_log.state["speed"] = dict(event.data, time=event.time)
+            elif event.kind == "ready":
+                seconds = self.prewarm.ready(event.time) if self.prewarm is not None else None
+                if seconds is not None:
+                    logging.info(f"xmrig hashing {seconds:.1f}s after launch "
+                                 f"(pre-warm lead {self.prewarm.start_lead():.0f}s)")
+            else:
+                self.miner_log.state["shares"] = dict(event.data, time=event.time)
+        
+        for event in errors[:self.MAX_LOGGED_ERRORS]:
+            logging.warning(f"xmrig {event.module}: {event.data['message']}")
+        if len(errors) > self.MAX_LOGGED_ERRORS:
+            logging.warning(f"xmrig: {len(errors) - self.MAX_LOGGED_ERRORS} more errors in {self.miner_log.path}")
+    
+    def _warn_if_stalled(self) -> None:
+        """Warn when a running miner has reported no hashrate for stall_seconds"""
+        if self.telemetry is None:
+            return
+        window = self.config["telemetry"].get("stall_seconds", 900)
+        latest = self.telemetry.latest()
+        summary = self.telemetry.summary(window)
+        if latest and summary and latest["uptime"] >= window and summary["hashrate"] == 0:
+            logging.warning(f"Miner is running but reported 0 H/s for {window}s "
+                            f"({summary['samples']:.0f} samples) - check the pool connection")
+    
+    def timed_run_once(self) -> CycleStats:
+        """Run one cycle and measure its wall-clock and CPU cost"""
+        started = datetime.now()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        
+        self.run_once()
+        
+        self.cycle_count += 1
+        stats = CycleStats(
+            started=started,
+            wall_ms=(time.perf_counter() - wall_start) * 1000.0,
+            cpu_ms=(time.process_time() - cpu_start) * 1000.0,
+            cycle=self.cycle_count,
+            phases=dict(self._phases)
+        )
+        logging.debug(f"Cycle {stats.cycle} took {stats.wall_ms:.1f} ms wall, {stats.cpu_ms:.1f} ms CPU")
+        
+        slow = self.slow_cycle_seconds is not None and stats.wall_ms > self.slow_cycle_seconds * 1000.0
+        if slow:
+            phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in
+                               sorted(stats.phases.items(), key=lambda item: -item[1]))
+            logging.warning(f"Slow cycle {stats.cycle}: {stats.wall_ms:.0f} ms ({phases})")
+            for hook in self.slow_cycle_hooks:
+                hook(stats)
+        
+        if self.metrics is not None:
+            self.metrics.cycle.observe(stats.wall_ms / 1000.0)
+            if slow:
+                self.metrics.slow_cycles.inc()
+            self._export_metrics()
+        return stats
+    
+    def _export_metrics(self) -> None:
+        """Write the textfile-collector file; cron runs also keep the counters in the state file"""
+        textfile = self.config.get("metrics", {}).get("textfile")
+        if not textfile:
+            return
+        self.state["metrics"] = self.metrics.registry.state()
+        self._save_state()
+        try:
+            write_textfile(self.metrics.registry, textfile)
+        except OSError as e:
+            logging.warning(f"Could not write metrics to {textfile}: {e}")
+    
+    def _start_metrics_server(self) -> None:
+        metrics_config = self.config.get("metrics", {})
+        if self.metrics is None or self.metrics_server is not None or not metrics_config.get("port"):
+            return
+        try:
+            self.metrics_server = MetricsServer(self.metrics.registry, metrics_config.get("listen", "127.0.0.1"),
+                                                metrics_config.get("port", DEFAULT_METRICS_PORT)).start()
+        except OSError as e:
+            logging.warning(f"Could not start the metrics server: {e}")
     
-    def run_continuous(self, check_interval: int = 300) -> None:
-        """Run continuous monitoring (for testing)"""
+    def request_stop(self) -> None:
+        """Ask run_continuous to exit after the current cycle (signal-safe)"""
+        self._stop_requested.set()
+        self._wake.set()
+    
+    def request_reload(self) -> None:
+        """Ask run_continuous to reload the config before the next cycle (signal-safe)"""
+        self._reload_requested.set()
+        self._wake.set()
+    
+    def _on_temperature_push(self, temp: float) -> None:
+        """Re-check immediately when a pushed reading crosses the current threshold"""
+        decision = self.last_decision
+        if decision is None or decision.temperature is None or decision.threshold is None:
+            return
+        
+        if (temp > decision.threshold) != (decision.temperature > decision.threshold):
+            logging.info(f"Temperature {temp:.1f}°C crossed {decision.threshold}°C, re-checking now")
+            self.wake()
+    
+    def wake(self) -> None:
+        """Run the next cycle immediately instead of waiting for the interval"""
+        self._wake.set()
+    
+    # Wake slightly after a rate change so the new period is already in effect
+    TRANSITION_GUARD = 0.5
+    
+    # Thermal headroom forecasts further ahead than this wait for the regular interval
+    MAX_RECHECK_SECONDS = 3600
+    
+    def _seconds_until_next_cycle(self, check_interval: int) -> float:
+        """Time to wait before the next cycle - the interval, or less if the rate period changes sooner"""
+        now = datetime.now()
+        if self.pending_start is not None:
+            until_start = (self.pending_start - now).total_seconds()
+            if until_start < check_interval:
+                return max(0.0, until_start)
+        if self.pending_recheck is not None:
+            until_headroom = (self.pending_recheck - now).total_seconds()
+            if until_headroom < check_interval:
+                return max(0.0, until_headroom)
+        
+        change = self.scheduler.next_transition(now)
+        if change is None:
+            return float(check_interval)
+        
+        until_change = (change - now).total_seconds() + self.TRANSITION_GUARD
+        lead = self._transition_lead()
+        if lead and until_change - self.TRANSITION_GUARD - lead > 0:
+            # Start (or stop) early enough to be hashing (or stopped) at the change
+            until_change -= self.TRANSITION_GUARD + lead
+        if until_change < check_interval:
+            logging.debug(f"Next cycle at rate change {change:%a %H:%M} "
+                          f"({self.scheduler.period_at(change).value})")
+            return until_change
+        return float(check_interval)
+    
+    def run_continuous(self, check_interval: int = 300,
+                       on_cycle: Optional[Callable[[CycleStats], None]] = None,
+                       on_heartbeat: Optional[Callable[[], None]] = None,
+                       on_reload: Optional[Callable[[bool], None]] = None,
+                       heartbeat_interval: Optional[float] = None,
+                       stop_mining_on_exit: bool = True) -> None:
+        """Run continuous monitoring until request_stop() or Ctrl-C
+        
+        on_cycle is called with the timing of every cycle, on_heartbeat at least
+        every heartbeat_interval seconds while idle, on_reload after a reload.
+        """
         logging.info(f"Starting continuous monitoring (check every {check_interval}s)")
+        next_cycle = time.monotonic()
+        if self.telemetry is not None:
+            self.telemetry.start()
+        self._start_metrics_server()
         
         try:
-            while True:
-                self.run_once()
-                time.sleep(check_interval)
+            while not self._stop_requested.is_set():
+                if self._reload_requested.is_set():
+                    self._reload_requested.clear()
+                    reloaded = self.reload_config()
+                    self._start_metrics_server()
+                    if on_reload:
+                        on_reload(reloaded)
+                
+                if time.monotonic() >= next_cycle:
+                    stats = self.timed_run_once()
+                    if on_cycle:
+                        on_cycle(stats)
+                    next_cycle = time.monotonic() + self._seconds_until_next_cycle(check_interval)
+                
+                if on_heartbeat:
+                    on_heartbeat()
+                
+                timeout = max(0.0, next_cycle - time.monotonic())
+                if heartbeat_interval:
+                    timeout = min(timeout, heartbeat_interval)
+                if self._wake.wait(timeout):
+                    self._wake.clear()
+                    next_cycle = time.monotonic()
         except KeyboardInterrupt:
-            logging.info("Shutting down...")
-            self.mining_controller.stop_mining()
+            pass
+        
+        logging.info("Shutting down...")
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.throttle is not None and self.throttle.restore(self.mining_controller):
+            self._save_state()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        if stop_mining_on_exit:
+            self.mining_controller.terminate_mining()
 
 def main():
     """Main entry point"""
@@ -494,15 +2861,52 @@ def main():
         
         # Show current status
         period = controller.scheduler.get_current_period()
-        rate = controller.scheduler.get_rate(period)
-        temp = controller.temp_monitor.get_temperature()
+        rate = controller.scheduler.get_rate(period, datetime.now())
+        reading = controller.temp_monitor.get_reading()
         is_running = controller.mining_controller.is_running()
+        is_paused = controller.mining_controller.paused
         
         print(f"\nCurrent Status:")
         print(f"Period: {period.value}")
         print(f"Rate: {rate}¢/kWh")
-        print(f"Temperature: {temp}°C" if temp else "Temperature: N/A")
-        print(f"Mining running: {is_running}")
+        print(f"Temperature: {reading.value}°C ({reading.age:.0f}s old)" if reading else "Temperature: N/A")
+        for name, stats in controller.temp_monitor.latency_stats().items():
+            print(f"  {name}: {stats.reads} read(s), {stats.failures} failed, "
+                  f"first {stats.first_ms:.1f} ms, mean {stats.mean_ms:.1f} ms")
+        if controller.thermal is not None and reading:
+            forecast = controller.thermal.forecast(reading.value, True)
+            print(f"Forecast while mining: {forecast:.1f}°C in {controller.thermal.horizon} min"
+                  if forecast is not None else "Forecast: N/A (not enough readings yet)")
+        print(f"Mining running: {is_running}"
+              f"{f' ({controller.mining_controller.pause_method} paused)' if is_paused else ''}")
+        if controller.telemetry is not None:
+            sample = controller.telemetry.poll()
+            summary = controller.telemetry.summary(3600)
+            print(f"Hashrate: {sample['hashrate']:.1f} H/s on {sample['threads']:.0f} threads"
+                  if sample else "Hashrate: N/A (xmrig API not reachable)")
+            if summary:
+                print(f"Last hour: {summary['hashrate']:.1f} H/s average, {summary['accepted']:.0f} accepted, "
+                      f"{summary['rejected']:.0f} rejected shares")
+        if controller.miner_log is not None:
+            # Peek only: the next cycle still reads these lines, and the log is not rotated
+            speed = controller.miner_log.state.get("speed")
+            shares = controller.miner_log.state.get("shares")
+            for event in controller.miner_log.peek_events():
+                if event.kind == "speed":
+                    speed = dict(event.data, time=event.time)
+                elif event.kind in ("accepted", "rejected"):
+                    shares = dict(event.data, time=event.time)
+            if speed and speed["hashrate"] is not None:
+                print(f"Logged speed: {speed['hashrate']:.1f} H/s at {datetime.fromtimestamp(speed['time']):%H:%M:%S}")
+            if shares:
+                print(f"Logged shares: {shares['accepted']} accepted, {shares['rejected']} rejected")
+        guard_state = controller.guard.state
+        print(f"Flaps: {guard_state.get('flaps', 0)}, restarts avoided by the flap guard: "
+              f"{guard_state.get('avoided', 0)}")
+        if controller.profitability is not None:
+            estimate = controller.profitability.estimate(controller.telemetry)
+            print(f"Revenue: {estimate.revenue_per_kwh:.1f}¢/kWh ({estimate.margin(rate):.2f}x the current rate)"
+                  if estimate else "Revenue: N/A (no market snapshot or hashrate)")
         
     elif args.continuous:
         controller.run_continuous(args.interval)
@@ -511,7 +2915,7 @@ def main():
         controller.run_once(force_mining=True)
         print("✅ Force mining command executed")
     else:
-        controller.run_once()
+        controller.timed_run_once()
 
 if __name__ == "__main__":
     main()
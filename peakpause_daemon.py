@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Resident daemon for PeakPause
+Keeps one controller in memory instead of re-launching it from cron every 5 minutes.
+Supports signal-driven shutdown (SIGTERM/SIGINT) and reload (SIGHUP), a pidfile,
+and systemd Type=notify readiness/watchdog integration.
+"""
+
+import sys
+import os
+import fcntl
+import signal
+import socket
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import PeakPause, CycleStats
+
+class SystemdNotifier:
+    """Minimal sd_notify(3) client - a no-op when not started by systemd"""
+
+    def __init__(self):
+        self.address = os.environ.get("NOTIFY_SOCKET")
+        if self.address and self.address.startswith("@"):
+            # Abstract namespace socket
+            self.address = "\0" + self.address[1:]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.address)
+
+    def notify(self, message: str) -> bool:
+        """Send a raw notification such as READY=1"""
+        if not self.address:
+            return False
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.connect(self.address)
+                sock.sendall(message.encode())
+            return True
+        except OSError as e:
+            logging.warning(f"systemd notify failed: {e}")
+            return False
+
+    def ready(self, status: str = "") -> bool:
+        message = "READY=1"
+        if status:
+            message += f"\nSTATUS={status}"
+        return self.notify(message)
+
+    def reloading(self) -> bool:
+        monotonic_usec = int(time.clock_gettime(time.CLOCK_MONOTONIC) * 1_000_000)
+        return self.notify(f"RELOADING=1\nMONOTONIC_USEC={monotonic_usec}")
+
+    def stopping(self) -> bool:
+        return self.notify("STOPPING=1")
+
+    def status(self, text: str) -> bool:
+        return self.notify(f"STATUS={text}")
+
+    def watchdog(self) -> bool:
+        return self.notify("WATCHDOG=1")
+
+    def watchdog_interval(self) -> Optional[float]:
+        """Seconds between watchdog pings (half of WatchdogSec), or None if disabled"""
+        usec = os.environ.get("WATCHDOG_USEC")
+        if not usec:
+            return None
+
+        watchdog_pid = os.environ.get("WATCHDOG_PID")
+        if watchdog_pid and int(watchdog_pid) != os.getpid():
+            return None
+
+        return int(usec) / 1_000_000 / 2
+
+class PidFile:
+    """Locked pidfile - a stale file left by a crashed daemon is simply re-locked"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = None
+
+    def acquire(self) -> None:
+        """Lock the pidfile and write our PID, raising RuntimeError if already held"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(f"Another PeakPause daemon holds {self.path}")
+
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        os.fsync(fd)
+        self.fd = fd
+
+    def release(self) -> None:
+        if self.fd is None:
+            return
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        os.close(self.fd)
+        self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class PeakPauseDaemon:
+    """Long-running controller built on PeakPause.run_continuous"""
+
+    def __init__(self, config_file: str, interval: int = 300,
+                 pidfile: Optional[str] = None, stop_mining_on_exit: bool = True):
+        self.config_file = config_file
+        self.interval = interval
+        self.pidfile = PidFile(pidfile) if pidfile else None
+        self.stop_mining_on_exit = stop_mining_on_exit
+        self.notifier = SystemdNotifier()
+        self.controller = None
+        self.total_wall_ms = 0.0
+        self.total_cpu_ms = 0.0
+
+    def _install_signal_handlers(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+    def _handle_stop(self, signum, frame) -> None:
+        logging.info(f"Received {signal.Signals(signum).name}, stopping")
+        self.controller.request_stop()
+
+    def _handle_reload(self, signum, frame) -> None:
+        logging.info("Received SIGHUP, reloading configuration")
+        self.notifier.reloading()
+        self.controller.request_reload()
+
+    def _on_cycle(self, stats: CycleStats) -> None:
+        self.total_wall_ms += stats.wall_ms
+        self.total_cpu_ms += stats.cpu_ms
+        avg_cpu = self.total_cpu_ms / stats.cycle
+
+        logging.info(f"Cycle {stats.cycle}: {stats.wall_ms:.1f} ms wall, {stats.cpu_ms:.1f} ms CPU "
+                     f"(avg {avg_cpu:.1f} ms CPU)")
+        self.notifier.status(f"Cycle {stats.cycle} at {stats.started:%H:%M:%S}: "
+                             f"{stats.wall_ms:.1f} ms wall, {stats.cpu_ms:.1f} ms CPU")
+
+    def _on_reload(self, reloaded: bool) -> None:
+        self.notifier.ready("Configuration reloaded" if reloaded else "Reload failed, using previous config")
+
+    def run(self) -> int:
+        """Run until SIGTERM/SIGINT, returning an exit code"""
+        startup = time.perf_counter()
+
+        if self.pidfile:
+            try:
+                self.pidfile.acquire()
+            except RuntimeError as e:
+                print(str(e), file=sys.stderr)
+                return 1
+
+        try:
+            self.controller = PeakPause(self.config_file)
+            self._install_signal_handlers()
+
+            watchdog_interval = self.notifier.watchdog_interval()
+            logging.info(f"Daemon started in {(time.perf_counter() - startup) * 1000:.0f} ms "
+                         f"(PID {os.getpid()}, interval {self.interval}s"
+                         f"{f', watchdog every {watchdog_interval:.1f}s' if watchdog_interval else ''})")
+            self.notifier.ready(f"Monitoring every {self.interval}s")
+
+            self.controller.run_continuous(
+                self.interval,
+                on_cycle=self._on_cycle,
+                on_heartbeat=self.notifier.watchdog if watchdog_interval else None,
+                on_reload=self._on_reload,
+                heartbeat_interval=watchdog_interval,
+                stop_mining_on_exit=self.stop_mining_on_exit
+            )
+            self.notifier.stopping()
+            return 0
+        finally:
+            if self.pidfile:
+                self.pidfile.release()
+
+def main():
+    """Main entry point for the daemon"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PeakPause Daemon")
+    parser.add_argument("--config", default=str(script_dir / "peakpause_config.json"), help="Config file path")
+    parser.add_argument("--interval", type=int, default=300, help="Check interval in seconds")
+    parser.add_argument("--pidfile", help="Pidfile path (locked while the daemon runs)")
+    parser.add_argument("--keep-mining", action="store_true", help="Leave the miner running when the daemon exits")
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        print(f"Config file not found: {args.config}", file=sys.stderr)
+        return 1
+
+    daemon = PeakPauseDaemon(args.config, args.interval, args.pidfile,
+                             stop_mining_on_exit=not args.keep_mining)
+    return daemon.run()
+
+if __name__ == "__main__":
+    sys.exit(main())
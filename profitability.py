@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Mining profitability for PeakPause
+Estimates mining revenue per kWh from the measured hashrate, the miner's power draw
+and a locally cached network difficulty/price snapshot, so expensive rate periods
+are only mined when the revenue beats the electricity cost by min_profit_margin.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import importlib
+import requests
+from dataclasses import dataclass
+from typing import Optional, Callable, Dict, Any
+
+RAPL_ENERGY = "/sys/class/powercap/intel-rapl:0/energy_uj"
+
+@dataclass
+class MarketSnapshot:
+    """Network and market figures the revenue estimate is based on"""
+    difficulty: float            # Expected hashes per block
+    block_reward: float          # Coins per block
+    price: float                 # Dollars per coin (same currency as the electricity rates)
+    updated: float               # Epoch seconds the figures were fetched
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.updated)
+
+@dataclass
+class Estimate:
+    """Revenue estimate for the current miner"""
+    revenue_per_kwh: float       # ¢/kWh
+    revenue_per_hour: float      # Dollars per hour
+    hashrate: float              # H/s used for the estimate
+    watts: float                 # Power draw used for the estimate
+    snapshot_age: float          # Seconds
+
+    def margin(self, rate: float) -> float:
+        """Revenue divided by the electricity cost at rate ¢/kWh"""
+        return self.revenue_per_kwh / rate if rate > 0 else float("inf")
+
+def revenue_per_hour(hashrate: float, snapshot: MarketSnapshot, pool_fee: float = 0.0) -> float:
+    """Expected dollars per hour: blocks found per hour times reward and price, less the pool fee"""
+    return hashrate * 3600 / snapshot.difficulty * snapshot.block_reward * snapshot.price * (1 - pool_fee)
+
+def url_fetcher(url: str, timeout: float = 10.0) -> Callable[[], Dict[str, Any]]:
+    """Fetcher for a JSON document with difficulty, block_reward and price"""
+    def fetch() -> Dict[str, Any]:
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    return fetch
+
+def load_fetcher(config: Dict[str, Any]) -> Optional[Callable[[], Dict[str, Any]]]:
+    """Fetcher named by config["source"]: "file" (none), "url", or "module:function" """
+    source = config.get("source", "file")
+    if source == "file":
+        return None  # snapshot_file is kept up to date by something else
+    if source == "url":
+        return url_fetcher(config["url"], config.get("timeout", 10.0))
+    module, _, function = source.partition(":")
+    return getattr(importlib.import_module(module), function)
+
+class MarketData:
+    """Snapshot cached in snapshot_file and refreshed from the fetcher every refresh_interval
+
+    The time of the next fetch attempt and the retry delay after failures are kept
+    in state, so a one-shot run from cron backs off like the daemon does instead of
+    waiting on a dead source every cycle.
+    """
+
+    def __init__(self, config: Dict[str, Any], state: Optional[Dict[str, Any]] = None):
+        self.snapshot_file = config.get("snapshot_file", "profitability.json")
+        self.refresh_interval = config.get("refresh_interval", 3600)
+        self.max_age = config.get("max_age", 86400)  # Older snapshots are not trusted
+        self.retry_interval = config.get("retry_interval", min(self.refresh_interval, 300))
+        self.fetcher = load_fetcher(config)
+        self.state = {} if state is None else state
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._mtime = None
+
+    def _load(self) -> Optional[MarketSnapshot]:
+        try:
+            with open(self.snapshot_file) as f:
+                data = json.load(f)
+            return MarketSnapshot(float(data["difficulty"]), float(data["block_reward"]),
+                                  float(data["price"]), float(data.get("updated", os.path.getmtime(self.snapshot_file))))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Invalid profitability snapshot {self.snapshot_file}: {e}")
+            return None
+
+    def refresh(self) -> Optional[MarketSnapshot]:
+        """Fetch new figures and cache them; None (keeping the old snapshot) on failure"""
+        try:
+            data = self.fetcher()
+            snapshot = MarketSnapshot(float(data["difficulty"]), float(data["block_reward"]),
+                                      float(data["price"]), float(data.get("updated", time.time())))
+        except Exception as e:
+            # Retry after retry_interval, doubling on each failure in a row up to refresh_interval
+            retry = self.state.get("retry")
+            retry = self.retry_interval if retry is None else min(retry * 2, max(self.refresh_interval,
+                                                                                 self.retry_interval))
+            self.state.update(retry=retry, next_fetch=time.time() + retry)
+            logging.warning(f"Profitability fetch failed: {e}; retrying in {retry:.0f}s")
+            return None
+
+        self.state.pop("retry", None)
+        self.state.pop("next_fetch", None)
+        self._snapshot = snapshot  # Used from memory even if it can't be cached
+        try:
+            # mkstemp: an unpredictable name that a planted symlink can't redirect
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.snapshot_file) or ".",
+                                       prefix=f".{os.path.basename(self.snapshot_file)}.")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(snapshot.__dict__, f, indent=2)
+                os.replace(tmp, self.snapshot_file)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            logging.warning(f"Could not cache profitability snapshot in {self.snapshot_file}: {e}")
+        return snapshot
+
+    def snapshot(self) -> Optional[MarketSnapshot]:
+        """Current snapshot, or None if there is none younger than max_age"""
+        try:
+            mtime = os.path.getmtime(self.snapshot_file)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:  # Written by the fetcher, another instance or by hand
+            self._mtime = mtime
+            self._snapshot = self._load() or self._snapshot
+        if (self.fetcher is not None and time.time() >= self.state.get("next_fetch", 0.0)
+                and (self._snapshot is None or self._snapshot.age >= self.refresh_interval)):
+            self.refresh()
+
+        if self._snapshot is None or self._snapshot.age > self.max_age:
+            return None
+        return self._snapshot
+
+class PowerMeter:
+    """Average CPU package power between runs from the RAPL energy counter
+
+    Only intervals where the miner was running at both ends are counted, and
+    the result is smoothed, so it converges on the mining power draw.
+    """
+
+    def __init__(self, state: Dict[str, Any], path: str = RAPL_ENERGY, smoothing: float = 0.3):
+        self.path = path
+        self.state = state
+        self.smoothing = smoothing
+
+    def _read(self) -> Optional[int]:
+        try:
+            with open(self.path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _range(self) -> int:
+        try:
+            with open(os.path.join(os.path.dirname(self.path), "max_energy_range_uj")) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 2 ** 32
+
+    def update(self, mining: bool) -> Optional[float]:
+        energy = self._read()
+        if energy is None:
+            return None
+
+        now = time.time()
+        last = self.state.get("last")
+        self.state["last"] = {"energy_uj": energy, "time": now, "mining": mining}
+        if not (last and last["mining"] and mining) or now <= last["time"]:
+            return self.watts
+
+        used = (energy - last["energy_uj"]) % self._range()  # Counter wraps
+        watts = used / 1e6 / (now - last["time"])
+        previous = self.state.get("watts")
+        self.state["watts"] = watts if previous is None else previous + self.smoothing * (watts - previous)
+        return self.watts
+
+    @property
+    def watts(self) -> Optional[float]:
+        return self.state.get("watts")
+
+class ProfitabilityEstimator:
+    """Revenue per kWh from hashrate, power draw and the market snapshot"""
+
+    def __init__(self, config: Dict[str, Any], state: Dict[str, Any]):
+        self.market = MarketData(config, state.setdefault("market", {}))
+        self.hashrate = config.get("hashrate")  # H/s when telemetry has no measurement
+        self.watts = config.get("watts", 150.0)
+        self.pool_fee = config.get("pool_fee", 0.0)
+        self.power = PowerMeter(state, config.get("power_file", RAPL_ENERGY)) if config.get("measure_power") else None
+
+    @staticmethod
+    def measured_hashrate(telemetry, window: float = 3600) -> Optional[float]:
+        """Mean hashrate over the last hour of telemetry, ignoring minutes the miner was stopped"""
+        if telemetry is None:
+            return None
+        rows = telemetry.query("minute", time.time() - window)
+        mining = [h for h in rows["hashrate"] if h > 0]
+        return sum(mining) / len(mining) if mining else None
+
+    def estimate(self, telemetry=None) -> Optional[Estimate]:
+        """None when there is no usable snapshot or hashrate"""
+        snapshot = self.market.snapshot()
+        hashrate = self.measured_hashrate(telemetry) or self.hashrate
+        if snapshot is None or not hashrate:
+            return None
+
+        watts = (self.power.watts if self.power else None) or self.watts
+        per_hour = revenue_per_hour(hashrate, snapshot, self.pool_fee)
+        return Estimate(per_hour * 100 / (watts / 1000), per_hour, hashrate, watts, snapshot.age)
+
+def main():
+    """Refresh the snapshot and show revenue against each rate"""
+    import argparse
+    from datetime import datetime, timedelta
+
+    parser = argparse.ArgumentParser(description="Show PeakPause mining profitability")
+    parser.add_argument("--config", default="peakpause_config.json", help="Config file path")
+    parser.add_argument("--refresh", action="store_true", help="Fetch a new snapshot first")
+    args = parser.parse_args()
+
+    from peakpause import PeakPause
+    controller = PeakPause(args.config)
+    estimator = controller.profitability
+    if estimator is None:
+        print("profitability is not enabled in the config", file=sys.stderr)
+        return 1
+    if args.refresh and estimator.market.fetcher is not None:
+        estimator.market.refresh()
+
+    estimate = estimator.estimate(controller.telemetry)
+    if estimate is None:
+        print("No usable snapshot or hashrate", file=sys.stderr)
+        return 1
+
+    print(f"Hashrate {estimate.hashrate:.0f} H/s at {estimate.watts:.0f} W, "
+          f"snapshot {estimate.snapshot_age / 3600:.1f}h old")
+    print(f"Revenue: ${estimate.revenue_per_hour * 24:.2f}/day = {estimate.revenue_per_kwh:.1f}¢/kWh")
+    margin = controller.config["mining_policy"].get("min_profit_margin", 1.5)
+    now = datetime.now()
+    # Each period of the coming week, at its current rate
+    periods = dict.fromkeys(period for _, _, period in controller.scheduler.periods_between(now, now + timedelta(days=7)))
+    for period in periods:
+        rate = controller.scheduler.get_rate(period, now)
+        ratio = estimate.margin(rate)
+        print(f"  {period.value:18} {rate:5.1f}¢/kWh  {ratio:5.2f}x {'✅' if ratio >= margin else '❌'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Temperature sensor server for PeakPause
+Serves the port-48910 "temp" protocol used by the socket source (and the legacy
+cron_run.pl). The sensor is read once per interval and every client is answered
+from memory, so one sensor can serve a whole room of rigs. Optionally each reading
+is also broadcast over UDP multicast for the "multicast" source.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import TemperatureMonitor
+from temperature_stream import MulticastPublisher, DEFAULT_MULTICAST_GROUP, DEFAULT_MULTICAST_PORT
+
+class SensorServer:
+    """asyncio server answering "temp" from a periodically sampled reading
+
+    A "stats" request returns the request/latency counters as JSON.
+    """
+
+    # Requests counted by name; anything else a client sends is counted as "other"
+    REQUESTS = ("temp", "stats", "empty")
+
+    def __init__(self, config: Dict[str, Any], temp_monitor: TemperatureMonitor):
+        self.temp_monitor = temp_monitor
+        self.host = config.get("host", "0.0.0.0")
+        self.port = config.get("port", 48910)
+        self.interval = config.get("interval", 10.0)
+        self.max_age = config.get("max_age", self.interval * 3)
+        self.max_connections = config.get("max_connections", 256)
+        self.client_timeout = config.get("client_timeout", 5.0)
+
+        self.value: Optional[float] = None
+        self.timestamp: Optional[float] = None
+        self.active = 0
+        self.stats = {"connections": 0, "rejected": 0, "timeouts": 0, "requests": {},
+                      "sensor_reads": 0, "sensor_failures": 0, "broadcasts": 0,
+                      "latency_total_ms": 0.0, "latency_max_ms": 0.0}
+        self._server = None
+        self._sampler = None
+
+        multicast = config.get("multicast", {})
+        self.publisher = None
+        if multicast.get("enabled", False):
+            self.publisher = MulticastPublisher(multicast.get("group", DEFAULT_MULTICAST_GROUP),
+                                                multicast.get("port", DEFAULT_MULTICAST_PORT),
+                                                multicast.get("ttl", 1),
+                                                multicast.get("interface", "0.0.0.0"))
+
+    async def start(self) -> None:
+        """Take a first reading, then start listening and sampling"""
+        await self._sample()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._sampler = asyncio.create_task(self._sample_forever())
+        logging.info(f"Sensor server listening on {self.host}:{self.port}, sampling every {self.interval}s")
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._sampler:
+            self._sampler.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.publisher:
+            self.publisher.close()
+
+    async def _sample(self) -> None:
+        # Sensor reads block (sockets, HTTP, sysfs) - keep them off the event loop
+        value = await asyncio.get_running_loop().run_in_executor(None, self.temp_monitor.get_temperature)
+        self.stats["sensor_reads"] += 1
+        if value is None:
+            self.stats["sensor_failures"] += 1
+            logging.warning("Sensor read failed, keeping previous value")
+            return
+        self.value = value
+        self.timestamp = time.time()
+        if self.publisher:
+            try:
+                self.publisher.publish(value, self.timestamp)
+                self.stats["broadcasts"] += 1
+            except OSError as e:
+                logging.warning(f"Multicast publish failed: {e}")
+
+    async def _sample_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._sample()
+            except Exception as e:
+                self.stats["sensor_failures"] += 1
+                logging.error(f"Sensor sampling error: {e}")
+
+    def current_value(self) -> Optional[float]:
+        """Latest reading, or None once it is older than max_age"""
+        if self.value is None or time.time() - self.timestamp > self.max_age:
+            return None
+        return self.value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus derived latency and reading age"""
+        requests = sum(self.stats["requests"].values())
+        return dict(self.stats,
+                    active=self.active,
+                    latency_avg_ms=self.stats["latency_total_ms"] / requests if requests else 0.0,
+                    value=self.value,
+                    age=time.time() - self.timestamp if self.timestamp else None)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        if self.active >= self.max_connections:
+            self.stats["rejected"] += 1
+            writer.close()
+            return
+
+        self.active += 1
+        try:
+            data = await asyncio.wait_for(reader.read(1024), self.client_timeout)
+            started = time.perf_counter()
+            request = data.decode(errors="replace").strip()
+            name = request or "empty"
+            if name not in self.REQUESTS:
+                name = "other"
+            self.stats["requests"][name] = self.stats["requests"].get(name, 0) + 1
+
+            if request == "temp":
+                value = self.current_value()
+                if value is not None:
+                    writer.write(f"{value:.2f}".encode())
+            elif request == "stats":
+                writer.write(json.dumps(self.snapshot()).encode())
+            await writer.drain()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats["latency_total_ms"] += elapsed_ms
+            self.stats["latency_max_ms"] = max(self.stats["latency_max_ms"], elapsed_ms)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+def main():
+    """Main entry point for the sensor server"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PeakPause temperature sensor server")
+    parser.add_argument("--config", default=str(script_dir / "peakpause_config.json"),
+                        help="Config file whose temperature section describes the sensor")
+    parser.add_argument("--host", help="Listen address (default 0.0.0.0)")
+    parser.add_argument("--port", type=int, help="Listen port (default 48910)")
+    parser.add_argument("--interval", type=float, help="Sensor sampling interval in seconds")
+
+    args = parser.parse_args()
+
+    try:
+        with open(args.config) as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Cannot read config {args.config}: {e}", file=sys.stderr)
+        return 1
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    server_config = dict(config.get("sensor_server", {}))
+    for key in ("host", "port", "interval"):
+        if getattr(args, key) is not None:
+            server_config[key] = getattr(args, key)
+
+    temperature = server_config.get("temperature", config.get("temperature", {}))
+    server = SensorServer(server_config, TemperatureMonitor(temperature))
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ Creates initial configuration files with modern defaults
 import json
 import socket
 import os
+import secrets
 from pathlib import Path
 
 def get_cpu_info():
@@ -49,6 +50,9 @@ def get_cpu_info():
         except:
             return "Unknown", 1
 
+# Local xmrig HTTP API port (bound to 127.0.0.1 only)
+XMRIG_API_PORT = 18088
+
 def generate_xmrig_config():
     """Generate modern XMRig configuration with intelligent worker naming"""
     hostname = socket.gethostname()
@@ -63,11 +67,11 @@ def generate_xmrig_config():
             "worker-id": None
         },
         "http": {
-            "enabled": False,
+            "enabled": True,            # Local API used by PeakPause to pause/resume mining
             "host": "127.0.0.1",
-            "port": 0,
-            "access-token": None,
-            "restricted": True
+            "port": XMRIG_API_PORT,
+            "access-token": secrets.token_urlsafe(24),
+            "restricted": False         # pause/resume needs an unrestricted API
         },
         "autosave": True,
         "background": False,
@@ -172,7 +176,15 @@ def generate_peakpause_config():
         "mining": {
             "executable": str(script_dir / "xmrig"),
             "config_file": str(script_dir / "xmrig_config.json"),
-            "log_file": str(script_dir / "xmrig.log")
+            "log_file": str(script_dir / "xmrig.log"),
+            "pid_file": str(script_dir / "xmrig.pid"),
+            "stop_timeout": 10.0,       # Seconds to wait for a clean exit before SIGKILL
+            "control_mode": "api",      # Options: kill, api (pause/resume keeps the RandomX dataset), freeze (SIGSTOP/SIGCONT)
+            "freeze": {
+                "min_available_mb": 1024,   # freeze mode: stop for real if less memory is available
+                "max_memory_pressure": 10.0, # freeze mode: stop for real above this PSI some avg10 (%)
+                "max_frozen_seconds": 21600 # freeze mode: restart instead of thawing after 6 hours
+            }
         },
         "temperature": {
             "source": "socket",  # Options: socket, homekit, http, system
@@ -182,18 +194,115 @@ def generate_peakpause_config():
             "homekit_token": "YOUR_HOME_ASSISTANT_TOKEN",
             "http_url": "http://your-temp-sensor/api/temperature",
             "bias": 0.0,
+            "cache": {
+                "enabled": False,       # Share one reading between runs and instances on this host
+                "ttl": 60,              # Seconds a reading is used without re-reading the sensor
+                "max_stale": 600,       # Serve older readings while refreshing, up to this age
+                "stale_margin": 1.0     # Lower thresholds by this much (°C) for stale readings
+            },
             "thresholds": {
                 "ultra_low": 30.0,      # 11pm-7am (2.8¢/kWh) - most permissive
                 "weekend_off_peak": 28.0, # Weekends 7am-11pm (7.6¢/kWh)
                 "mid_peak": 25.0,       # Weekdays 7am-4pm, 9pm-11pm (12.2¢/kWh)
-                "on_peak": 20.0         # Weekdays 4pm-9pm (28.4¢/kWh) - most restrictive
+                "on_peak": 20.0,        # Weekdays 4pm-9pm (28.4¢/kWh) - most restrictive
+                "off_peak": 28.0        # TOU and tiered plans
             }
         },
-        "rates": {
-            "ultra_low": 2.8,           # ¢/kWh - 11pm-7am daily
-            "weekend_off_peak": 7.6,    # ¢/kWh - Weekends 7am-11pm
-            "mid_peak": 12.2,           # ¢/kWh - Weekdays 7am-4pm, 9pm-11pm
-            "on_peak": 28.4             # ¢/kWh - Weekdays 4pm-9pm
+        "tariff": {
+            "plan": "ulo",              # ulo, tou or tiered from tariffs.json; null to use a fixed "rates" section
+            "file": str(script_dir / "tariffs.json")
+        },
+        "throttle": {
+            "enabled": False,           # Scale mining threads with temperature headroom
+            "kp": 0.25,                 # Thread fraction per °C of headroom error
+            "ki": 0.02,                 # Thread fraction per °C per minute
+            "target_headroom": 0.5,     # Aim to stay this far below the threshold (°C)
+            "hard_margin": 1.5,         # Stop completely this far over the threshold (°C)
+            "min_threads": 1,
+            "max_threads": None,        # Default: all CPUs
+            "min_change_interval": 300, # Seconds between thread changes
+            "max_step": 2,              # Threads added/removed per change
+            "apply_via": "config"       # config (xmrig watches its config file) or api
+        },
+        "fleet": {
+            "role": "standalone",       # standalone, coordinator (decides for the fleet) or agent
+            "group": "239.255.48.92",   # Not the sensor multicast group (239.255.48.91)
+            "port": 48912,
+            "ttl": 660,                 # Seconds an agent trusts a decision before deciding locally
+            "broadcast_interval": 5.0,  # Coordinator repeats its decision this often
+            "key": None,                # Shared secret for HMAC-signed decisions
+            "hold": False,              # Coordinator only: stop mining on every agent
+            "ramp_window": 300,         # Spread starts after a period change over 5 minutes
+            "worker_name": None         # Stagger slot key; default: the xmrig rig-id
+        },
+        "miner_log": {
+            "enabled": True,            # Parse new xmrig log lines every cycle and rotate the log
+            "max_bytes": 10485760,      # Rotate xmrig.log at 10MB
+            "backup_count": 5,
+            "compress": True            # gzip rotated copies
+        },
+        "telemetry": {
+            "enabled": True,            # Record hashrate and shares from the local xmrig API
+            "interval": 10,             # Seconds between samples in continuous mode
+            "file": str(script_dir / "telemetry.bin"),
+            "raw_samples": 360,         # 1 hour of raw samples
+            "minute_samples": 10080,    # 7 days of per-minute rollups
+            "hour_samples": 8784,       # 1 year of hourly rollups
+            "stall_seconds": 900        # Warn when a running miner reports 0 H/s this long
+        },
+        "metrics": {
+            "enabled": True,            # Prometheus metrics
+            "listen": "127.0.0.1",
+            "port": 9748,               # /metrics endpoint while running as a daemon; null to disable
+            "textfile": None,           # Cron: e.g. /var/lib/node_exporter/textfile/peakpause.prom
+            "slow_cycle_seconds": 2.0   # Log a phase breakdown for slower cycles
+        },
+        "thermal": {
+            "enabled": True,            # Decide and throttle on a temperature forecast, not just the reading
+            "model": "first_order",     # first_order (learned heating/cooling) or slope (recent trend only)
+            "horizon_minutes": 15,      # Stop if mining is forecast to pass the limit within this time
+            "slope_window": 1800,       # Seconds of recent readings for the trend
+            "learning_half_life": 604800,  # Older heating/cooling observations fade over a week
+            "min_samples": 12           # Reading pairs per state before the learned model is used
+        },
+        "prewarm": {
+            "enabled": True,            # Launch xmrig early enough to be hashing when a cheaper period begins
+            "margin_seconds": 5,        # Added to the longest measured launch-to-hashing time
+            "max_seconds": 300,         # Never launch earlier than this before the period change
+            "samples": 5,               # Launch-to-hashing measurements kept
+            "idle_priority": True       # Run a pre-warming miner under SCHED_IDLE until the period begins
+        },
+        "hysteresis": {
+            "enabled": True,            # Hold back starts and stops that would make the miner flap
+            "bands": {                  # After a temperature stop, restart only this far (°C) below the limit
+                "ultra_low": 1.0,
+                "weekend_off_peak": 1.0,
+                "mid_peak": 1.0,
+                "on_peak": 0.5,
+                "off_peak": 1.0
+            },
+            "min_run_seconds": 900,     # Hold temperature stops this long after a start
+            "min_off_seconds": 600,     # Hold starts this long after a stop
+            "restart_cost_seconds": 30, # Full-power RandomX dataset init per start
+            "restart_budget_seconds": 120,  # Restart cost allowed per budget_window
+            "budget_window": 3600,
+            "flap_seconds": 1800        # Runs or stops shorter than this count as flaps
+        },
+        "journal": {
+            "enabled": True,            # Append every decision to a binary journal (32 bytes each)
+            "file": str(script_dir / "peakpause_journal.bin")  # python3 journal.py --last-month
+        },
+        "profitability": {
+            "enabled": False,           # Mine mid/on-peak only when revenue beats the rate by min_profit_margin
+            "source": "file",           # file (snapshot_file kept current by you), url, or module:function
+            "url": "",                  # JSON with difficulty, block_reward and price (CAD)
+            "snapshot_file": str(script_dir / "profitability.json"),
+            "refresh_interval": 3600,   # Seconds between fetches
+            "max_age": 86400,           # Ignore older snapshots and use the rate-only policy
+            "hashrate": None,           # H/s when telemetry has no measurement
+            "watts": 150.0,             # Miner power draw
+            "measure_power": True,      # Measure the draw with the RAPL energy counter when available
+            "pool_fee": 0.01
         },
         "mining_policy": {
             "mine_on_peak": False,      # Generally avoid peak hours
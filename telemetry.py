@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Miner telemetry for PeakPause
+Polls the xmrig HTTP API (/2/summary and /2/backends) and keeps hashrate, share
+counts, thread count and uptime in fixed-size ring buffers with per-minute and
+per-hour rollups, so months of history fit in about a megabyte.
+"""
+
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import tempfile
+import threading
+from array import array
+from typing import Optional, List, Dict, Any
+
+FIELDS = ("hashrate", "accepted", "rejected", "threads", "uptime")
+ROLLUP_FIELDS = FIELDS + ("samples",)
+FILE_MAGIC = b"PPTELEM1\n"
+
+def sample_from_api(summary: Dict[str, Any], backends: Optional[List[Dict[str, Any]]] = None) -> Dict[str, float]:
+    """Telemetry sample from xmrig's /2/summary (and /2/backends for the thread count)
+
+    accepted/rejected are xmrig's running totals; hashrate is the 10s average,
+    falling back to the 60s and 15m averages while xmrig is still warming up.
+    """
+    hashrate = summary.get("hashrate") or {}
+    total = next((h for h in hashrate.get("total") or [] if h is not None), 0.0)
+    results = summary.get("results") or {}
+    good = results.get("shares_good", 0)
+
+    if backends is not None:
+        threads = sum(len(b.get("threads") or []) for b in backends if b.get("enabled", True))
+    else:
+        threads = len(hashrate.get("threads") or [])
+
+    return {
+        "hashrate": 0.0 if summary.get("paused") else float(total),
+        "accepted": float(good),
+        "rejected": float(results.get("shares_total", good) - good),
+        "threads": float(threads),
+        "uptime": float(summary.get("uptime", 0)),
+    }
+
+class Series:
+    """Ring buffer of timestamped rows, one array('d') per column"""
+
+    def __init__(self, capacity: int, fields=FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self.columns = {name: array("d", bytes(8 * capacity)) for name in ("time",) + fields}
+        self.head = 0    # Next slot to write
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        self.columns["time"][self.head] = timestamp
+        for name in self.fields:
+            self.columns[name][self.head] = values.get(name, 0.0)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _order(self) -> List[int]:
+        """Slot indices from oldest to newest"""
+        first = (self.head - self.count) % self.capacity
+        return [(first + i) % self.capacity for i in range(self.count)]
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, List[float]]:
+        """Columns (including "time") for rows with since <= time < until, oldest first"""
+        order = self._order()
+        times = [self.columns["time"][i] for i in order]
+        lo = bisect.bisect_left(times, since) if since is not None else 0
+        hi = bisect.bisect_left(times, until) if until is not None else len(times)
+        selected = order[lo:hi]
+        return {name: [column[i] for i in selected] for name, column in self.columns.items()}
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return {name: column[i] for name, column in self.columns.items()}
+
+    def oldest_time(self) -> Optional[float]:
+        return self.columns["time"][(self.head - self.count) % self.capacity] if self.count else None
+
+    @property
+    def complete(self) -> bool:
+        """True until the buffer wraps and starts dropping old rows"""
+        return self.count < self.capacity
+
+class Rollup:
+    """Aggregates samples into fixed buckets: mean hashrate/threads, summed shares, last uptime"""
+
+    def __init__(self, seconds: int, capacity: int):
+        self.seconds = seconds
+        self.series = Series(capacity, ROLLUP_FIELDS)
+        self.pending: Optional[Dict[str, float]] = None
+
+    def add(self, timestamp: float, values: Dict[str, float]) -> None:
+        bucket = timestamp - timestamp % self.seconds
+        if self.pending is not None and self.pending["time"] != bucket:
+            self.flush()
+        if self.pending is None:
+            self.pending = dict.fromkeys(ROLLUP_FIELDS, 0.0)
+            self.pending["time"] = bucket
+
+        self.pending["samples"] += 1
+        for name in ("hashrate", "threads", "accepted", "rejected"):
+            self.pending[name] += values[name]
+        self.pending["uptime"] = values["uptime"]
+
+    def _pending_row(self) -> Dict[str, float]:
+        row = dict(self.pending)
+        row["hashrate"] /= row["samples"]
+        row["threads"] /= row["samples"]
+        return row
+
+    def flush(self) -> None:
+        if self.pending is None:
+            return
+        self.series.append(self.pending["time"], self._pending_row())
+        self.pending = None
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, List[float]]:
+        """Completed buckets plus the one still filling"""
+        rows = self.series.query(since, until)
+        if self.pending is not None and (until is None or self.pending["time"] < until):
+            row = self._pending_row()
+            if since is None or row["time"] >= since:
+                for name, column in rows.items():
+                    column.append(row[name])
+        return rows
+
+    @property
+    def count(self) -> int:
+        return self.series.count + (self.pending is not None)
+
+    @property
+    def complete(self) -> bool:
+        return self.series.complete
+
+    def oldest_time(self) -> Optional[float]:
+        if self.series.count:
+            return self.series.oldest_time()
+        return self.pending["time"] if self.pending is not None else None
+
+class TelemetryStore:
+    """Raw samples plus minute and hour rollups, all fixed-size"""
+
+    def __init__(self, raw_samples: int = 360, minute_samples: int = 10080, hour_samples: int = 8784):
+        self.raw = Series(raw_samples)
+        self.minute = Rollup(60, minute_samples)
+        self.hour = Rollup(3600, hour_samples)
+        self._totals: Optional[Dict[str, float]] = None  # Last xmrig counters, to turn them into deltas
+
+    def add(self, sample: Dict[str, float], timestamp: Optional[float] = None) -> None:
+        """Record a sample of xmrig's running totals, stored as per-sample share deltas"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        previous = self._totals
+        restarted = (previous is None or sample["uptime"] < previous["uptime"]
+                     or sample["accepted"] < previous["accepted"] or sample["rejected"] < previous["rejected"])
+        values = dict(sample)
+        for name in ("accepted", "rejected"):
+            # The first sample only sets the baseline; after a restart the counters start from 0
+            values[name] = (sample[name] if previous is not None else 0.0) if restarted \
+                else sample[name] - previous[name]
+        self._totals = {name: sample[name] for name in ("accepted", "rejected", "uptime")}
+
+        self.raw.append(timestamp, values)
+        self.minute.add(timestamp, values)
+        self.hour.add(timestamp, values)
+
+    def series(self, resolution: str = "minute"):
+        """Series or Rollup for "raw", "minute" or "hour" - both have query()"""
+        return {"raw": self.raw, "minute": self.minute, "hour": self.hour}[resolution]
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        return self.raw.latest()
+
+    def summary(self, seconds: float, now: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Mean hashrate and share totals over the last `seconds`, from the finest series covering it"""
+        now = time.time() if now is None else now
+        since = now - seconds
+        # Finest resolution that reaches back far enough or still holds its whole history
+        series = next((s for s in (self.raw, self.minute, self.hour)
+                       if s.count and (s.oldest_time() <= since or s.complete)), self.hour)
+        rows = series.query(since)
+        if not rows["time"]:
+            return None
+
+        weights = rows.get("samples") or [1.0] * len(rows["time"])
+        samples = sum(weights)
+        accepted, rejected = sum(rows["accepted"]), sum(rows["rejected"])
+        return {
+            "since": rows["time"][0],
+            "samples": samples,
+            "hashrate": sum(h * w for h, w in zip(rows["hashrate"], weights)) / samples,
+            "accepted": accepted,
+            "rejected": rejected,
+            "reject_rate": rejected / (accepted + rejected) if accepted + rejected else 0.0,
+        }
+
+    def save(self, path: str) -> None:
+        """Write all buffers to path atomically: a JSON header line, then the raw arrays"""
+        # Pending rollup buckets are saved too, so the next cron run continues them
+        header = {
+            "totals": self._totals,
+            "series": {name: {"capacity": s.capacity, "head": s.head, "count": s.count}
+                       for name, s in self._all_series().items()},
+            "pending": {"minute": self.minute.pending, "hour": self.hour.pending},
+        }
+        # mkstemp: an unpredictable name that a planted symlink can't redirect
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(FILE_MAGIC)
+                f.write(json.dumps(header).encode() + b"\n")
+                for series in self._all_series().values():
+                    for column in series.columns.values():
+                        column.tofile(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load(self, path: str) -> bool:
+        """Restore buffers saved with the same capacities; False leaves the store empty"""
+        try:
+            with open(path, "rb") as f:
+                if f.readline() != FILE_MAGIC:
+                    return False
+                header = json.loads(f.readline())
+                for name, series in self._all_series().items():
+                    saved = header["series"][name]
+                    if saved["capacity"] != series.capacity:
+                        logging.info(f"Telemetry {name} capacity changed, starting a new history")
+                        return False
+                for name, series in self._all_series().items():
+                    saved = header["series"][name]
+                    for column in series.columns.values():
+                        del column[:]
+                        column.fromfile(f, series.capacity)
+                    series.head, series.count = saved["head"], saved["count"]
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"Could not load telemetry from {path}: {e}")
+            self.__init__(self.raw.capacity, self.minute.series.capacity, self.hour.series.capacity)
+            return False
+
+        self._totals = header["totals"]
+        self.minute.pending = header["pending"]["minute"]
+        self.hour.pending = header["pending"]["hour"]
+        return True
+
+    def _all_series(self) -> Dict[str, Series]:
+        return {"raw": self.raw, "minute": self.minute.series, "hour": self.hour.series}
+
+class TelemetryCollector:
+    """Polls xmrig's API into a TelemetryStore, once per call or from a background thread
+
+    client is anything with summary() and backends(), normally peakpause.XmrigApiClient.
+    """
+
+    def __init__(self, config: Dict[str, Any], client):
+        self.client = client
+        self.interval = config.get("interval", 10.0)
+        self.file = config.get("file")
+        self.store = TelemetryStore(config.get("raw_samples", 360), config.get("minute_samples", 10080),
+                                    config.get("hour_samples", 8784))
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._loaded = True
+            if self.file:
+                self.store.load(self.file)
+
+    def poll(self) -> Optional[Dict[str, float]]:
+        """Take one sample; None while the API is unreachable (e.g. the miner is stopped)"""
+        self._ensure_loaded()
+        try:
+            summary = self.client.summary()
+            try:
+                backends = self.client.backends()
+            except Exception:
+                backends = None  # Older xmrig builds without /2/backends
+        except Exception as e:
+            logging.debug(f"Telemetry poll failed: {e}")
+            return None
+
+        sample = sample_from_api(summary, backends)
+        with self._lock:
+            self.store.add(sample)
+        return sample
+
+    def save(self) -> None:
+        if not self.file:
+            return
+        with self._lock:
+            try:
+                self.store.save(self.file)
+            except OSError as e:
+                logging.warning(f"Could not save telemetry to {self.file}: {e}")
+
+    def query(self, resolution: str = "minute", since: Optional[float] = None,
+              until: Optional[float] = None) -> Dict[str, List[float]]:
+        self._ensure_loaded()
+        with self._lock:
+            return self.store.series(resolution).query(since, until)
+
+    def summary(self, seconds: float) -> Optional[Dict[str, float]]:
+        self._ensure_loaded()
+        with self._lock:
+            return self.store.summary(seconds)
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        self._ensure_loaded()
+        with self._lock:
+            return self.store.latest()
+
+    def start(self) -> "TelemetryCollector":
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self.save()
+
+    def _run(self) -> None:
+        saved = time.monotonic()
+        self.poll()
+        while not self._stop.wait(self.interval):
+            self.poll()
+            if time.monotonic() - saved >= 300:
+                self.save()
+                saved = time.monotonic()
+
+def main():
+    """Print recorded miner telemetry"""
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Show PeakPause miner telemetry")
+    parser.add_argument("--config", default="peakpause_config.json", help="Config file path")
+    parser.add_argument("--resolution", choices=("raw", "minute", "hour"), default="hour")
+    parser.add_argument("--hours", type=float, default=24.0, help="How far back to show")
+    parser.add_argument("--poll", action="store_true", help="Take a sample from xmrig first")
+    args = parser.parse_args()
+
+    from peakpause import XmrigApiClient
+    try:
+        with open(args.config) as f:
+            config = json.load(f)  # Read only: a missing config is an error, not a new default one
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Cannot read config {args.config}: {e}", file=sys.stderr)
+        return 1
+    telemetry_config = config.get("telemetry", {})
+    if not telemetry_config.get("file"):
+        print("No telemetry.file configured", file=sys.stderr)
+        return 1
+
+    client = XmrigApiClient.from_xmrig_config(config["mining"]["config_file"], config["mining"].get("api"))
+    collector = TelemetryCollector(telemetry_config, client)
+    if args.poll:
+        if client is None or collector.poll() is None:
+            print("xmrig API not reachable", file=sys.stderr)
+        collector.save()
+
+    rows = collector.query(args.resolution, time.time() - args.hours * 3600)
+    print(f"{'Time':16} {'H/s':>9} {'Accepted':>9} {'Rejected':>9} {'Threads':>8} {'Uptime h':>9}")
+    for i, timestamp in enumerate(rows["time"]):
+        print(f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M} {rows['hashrate'][i]:9.1f} "
+              f"{rows['accepted'][i]:9.0f} {rows['rejected'][i]:9.0f} {rows['threads'][i]:8.1f} "
+              f"{rows['uptime'][i] / 3600:9.1f}")
+
+    summary = collector.summary(args.hours * 3600)
+    if summary:
+        print(f"\nLast {args.hours:g}h: {summary['hashrate']:.1f} H/s average, "
+              f"{summary['accepted']:.0f} accepted, {summary['rejected']:.0f} rejected "
+              f"({summary['reject_rate']:.1%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
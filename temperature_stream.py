@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Push-based temperature sources for PeakPause
+Subscribes to Home Assistant (WebSocket API), ESPHome (/events stream) or a LAN
+multicast broadcast of a shared sensor, and keeps the latest value in memory, so a
+resident daemon sees a change within about a second without a request per cycle.
+"""
+
+import os
+import ssl
+import json
+import math
+import time
+import base64
+import socket
+import struct
+import logging
+import threading
+import requests
+from datetime import datetime
+from typing import Optional, Callable, List, Tuple, Dict, Any
+from urllib.parse import urlparse
+
+class LatestValue:
+    """Thread-safe slot holding the most recent pushed value
+
+    The value is current as of its own timestamp, or as of the last sign of life
+    from a subscription that would have reported a change (confirm()).
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._value = None
+        self._timestamp = None
+        self._confirmed = None
+        self.connected = False
+        self._listeners: List[Callable[[float], None]] = []
+
+    def add_listener(self, callback: Callable[[float], None]) -> None:
+        """Call callback(value) from the stream thread on every update"""
+        self._listeners.append(callback)
+
+    def set(self, value: float, timestamp: Optional[float] = None) -> None:
+        with self._condition:
+            self._value = value
+            self._timestamp = timestamp or time.time()
+            self._condition.notify_all()
+
+        for callback in self._listeners:
+            try:
+                callback(value)
+            except Exception as e:
+                logging.warning(f"Temperature listener failed: {e}")
+
+    def confirm(self, timestamp: Optional[float] = None) -> None:
+        """The subscription is alive, so the value has not changed up to timestamp"""
+        with self._condition:
+            self._confirmed = timestamp or time.time()
+
+    def get(self, max_age: float) -> Optional[Tuple[float, float]]:
+        """(value, time it was last known current) if that is within max_age"""
+        with self._condition:
+            if self._value is None:
+                return None
+            current = max(self._timestamp, self._confirmed or 0.0)
+            if time.time() - current > max_age:
+                return None
+            return self._value, current
+
+    def wait(self, timeout: float) -> bool:
+        """Wait until a first value has arrived"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._value is not None, timeout)
+
+class WebSocketClient:
+    """Minimal RFC 6455 client - text frames, ping/pong and close"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        parsed = urlparse(url)
+        secure = parsed.scheme == "wss"
+        port = parsed.port or (443 if secure else 80)
+
+        sock = socket.create_connection((parsed.hostname, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parsed.hostname)
+        self.sock = sock
+        self._buffer = b""
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parsed.path or "/"
+        request = (f"GET {path} HTTP/1.1\r\nHost: {parsed.hostname}:{port}\r\n"
+                   f"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                   f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        self.sock.sendall(request.encode())
+
+        response = self._read_until(b"\r\n\r\n")
+        if not response.startswith(b"HTTP/1.1 101"):
+            raise ConnectionError(f"WebSocket upgrade refused: {response.splitlines()[0]!r}")
+
+    def _read_until(self, marker: bytes) -> bytes:
+        while marker not in self._buffer:
+            self._fill()
+        head, self._buffer = self._buffer.split(marker, 1)
+        return head
+
+    def _read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            self._fill()
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _fill(self) -> None:
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("WebSocket closed by server")
+        self._buffer += chunk
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 65536:
+            header += bytes([0x80 | 126]) + struct.pack("!H", length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", length)
+
+        # Client frames must be masked
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(header + mask + masked)
+
+    def send_json(self, message: Dict[str, Any]) -> None:
+        self._send_frame(0x1, json.dumps(message).encode())
+
+    def recv_json(self) -> Dict[str, Any]:
+        """Next text message, answering pings along the way
+
+        A read timeout between messages raises socket.timeout; one part-way
+        through a message leaves the stream unusable and raises ConnectionError.
+        """
+        message = b""
+        while True:
+            try:
+                first, second = self._read_exact(2)
+            except socket.timeout:
+                if message:
+                    raise ConnectionError("WebSocket message stalled")
+                raise
+            try:
+                payload = self._read_payload(second)
+            except socket.timeout:
+                raise ConnectionError("WebSocket frame stalled")
+
+            opcode = first & 0x0F
+            if opcode == 0x8:
+                raise ConnectionError("WebSocket closed by server")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode in (0x0, 0x1):
+                message += payload
+                if first & 0x80:
+                    return json.loads(message)
+
+    def _read_payload(self, second: int) -> bytes:
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read_exact(8))[0]
+        mask = self._read_exact(4) if second & 0x80 else None
+        payload = self._read_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return payload
+
+    def close(self) -> None:
+        try:
+            self._send_frame(0x8, b"")
+        except OSError:
+            pass
+        self.sock.close()
+
+class TemperatureStream:
+    """Background subscription feeding a LatestValue slot, reconnecting with backoff"""
+
+    name = "stream"
+
+    def __init__(self, slot: Optional[LatestValue] = None, max_backoff: float = 60.0):
+        self.slot = slot or LatestValue()
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "TemperatureStream":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._subscribe()
+                backoff = 1.0
+            except Exception as e:
+                logging.warning(f"{self.name} temperature stream disconnected: {e}")
+            finally:
+                self.slot.connected = False
+
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _subscribe(self) -> None:
+        """Connect and feed the slot until the connection drops"""
+        raise NotImplementedError
+
+class HomeAssistantStream(TemperatureStream):
+    """Home Assistant WebSocket API subscription for one sensor entity
+
+    Uses subscribe_trigger on the entity's state by default, or the
+    state_changed event bus with subscription "events". A ping is sent after
+    heartbeat seconds without a message, and the connection is dropped when
+    no pong arrives within another heartbeat.
+    """
+
+    name = "homeassistant"
+
+    def __init__(self, url: str, token: str, entity_id: str, subscription: str = "trigger",
+                 slot: Optional[LatestValue] = None, heartbeat: float = 30.0):
+        super().__init__(slot)
+        self.url = url
+        self.token = token
+        self.entity_id = entity_id
+        self.subscription = subscription
+        self.heartbeat = heartbeat
+
+    def _initial_state(self) -> Tuple[Optional[float], Optional[float]]:
+        """Current (value, timestamp) over REST - subscriptions only report changes"""
+        parsed = urlparse(self.url)
+        scheme = "https" if parsed.scheme == "wss" else "http"
+        response = requests.get(f"{scheme}://{parsed.netloc}/api/states/{self.entity_id}",
+                                headers={"Authorization": f"Bearer {self.token}"}, timeout=(3, 5))
+        response.raise_for_status()
+        return self._parse_state(response.json())
+
+    @staticmethod
+    def _parse_state(state: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+        """(value, when Home Assistant last updated it) from a state object"""
+        try:
+            value = float(state.get("state"))
+        except (TypeError, ValueError):
+            return None, None  # "unavailable", "unknown"
+        try:
+            timestamp = datetime.fromisoformat(state["last_updated"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            timestamp = None
+        return value, timestamp
+
+    def _state_from_event(self, event: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+        if "variables" in event:
+            new_state = event["variables"]["trigger"].get("to_state") or {}
+        else:
+            data = event.get("data", {})
+            if data.get("entity_id") != self.entity_id:
+                return None, None
+            new_state = data.get("new_state") or {}
+        return self._parse_state(new_state)
+
+    def _subscribe(self) -> None:
+        client = WebSocketClient(self.url)
+        try:
+            # State changes can be hours apart: time out after a heartbeat and ping instead
+            client.sock.settimeout(self.heartbeat)
+            if client.recv_json().get("type") != "auth_required":
+                raise ConnectionError("Unexpected Home Assistant greeting")
+            client.send_json({"type": "auth", "access_token": self.token})
+            reply = client.recv_json()
+            if reply.get("type") != "auth_ok":
+                raise ConnectionError(f"Home Assistant authentication failed: {reply.get('message')}")
+
+            if self.subscription == "events":
+                client.send_json({"id": 1, "type": "subscribe_events", "event_type": "state_changed"})
+            else:
+                client.send_json({"id": 1, "type": "subscribe_trigger",
+                                  "trigger": {"platform": "state", "entity_id": self.entity_id}})
+
+            value, timestamp = self._initial_state()
+            if value is not None:
+                self.slot.set(value, timestamp)
+                self.slot.confirm()
+            self.slot.connected = True
+            logging.info(f"Subscribed to Home Assistant {self.entity_id}")
+
+            message_id = 1
+            pinged = False
+            while not self._stop.is_set():
+                try:
+                    message = client.recv_json()
+                except socket.timeout:
+                    if pinged:
+                        raise ConnectionError(f"No pong from Home Assistant within {self.heartbeat:g}s")
+                    message_id += 1
+                    client.send_json({"id": message_id, "type": "ping"})
+                    pinged = True
+                    continue
+
+                pinged = False
+                if message.get("type") == "result" and not message.get("success"):
+                    raise ConnectionError(f"Subscription failed: {message.get('error')}")
+                if message.get("type") == "event":
+                    value, timestamp = self._state_from_event(message["event"])
+                    if value is not None:
+                        self.slot.set(value, timestamp)
+                self.slot.confirm()
+        finally:
+            client.close()
+
+class ESPHomeEventStream(TemperatureStream):
+    """ESPHome web_server Server-Sent Events (/events) subscription for one sensor"""
+
+    name = "esphome"
+
+    def __init__(self, url: str, sensor_id: str, slot: Optional[LatestValue] = None,
+                 idle_timeout: float = 30.0):
+        super().__init__(slot)
+        self.url = url.rstrip('/') + "/events" if not url.rstrip('/').endswith("/events") else url
+        self.sensor_id = sensor_id  # e.g. "sensor-room_temperature"
+        self.idle_timeout = idle_timeout  # ESPHome sends a ping event about every 10 s
+
+    def _subscribe(self) -> None:
+        with requests.get(self.url, stream=True, timeout=(3, self.idle_timeout),
+                          headers={"Accept": "text/event-stream"}) as response:
+            response.raise_for_status()
+            self.slot.connected = True
+            logging.info(f"Subscribed to ESPHome events for {self.sensor_id}")
+
+            event = "message"
+            # chunk_size=None hands over each chunk as it arrives instead of waiting for 512 bytes
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if self._stop.is_set():
+                    return
+                self.slot.confirm()  # Any line, pings included, shows the stream is alive
+                if not line:
+                    event = "message"
+                elif line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "state":
+                    try:
+                        data = json.loads(line[5:].strip())
+                    except ValueError:
+                        continue
+                    value = data.get("value")
+                    if data.get("id") == self.sensor_id and value is not None and not math.isnan(value):
+                        self.slot.set(float(value))
+        raise ConnectionError("ESPHome event stream ended")
+
+# Multicast datagram: magic, publisher timestamp, temperature, sequence number (20 bytes)
+MULTICAST_FORMAT = struct.Struct("!4sdfI")
+MULTICAST_MAGIC = b"PPT1"
+DEFAULT_MULTICAST_GROUP = "239.255.48.91"
+DEFAULT_MULTICAST_PORT = 48911
+
+def pack_reading(value: float, timestamp: float, seq: int) -> bytes:
+    return MULTICAST_FORMAT.pack(MULTICAST_MAGIC, timestamp, value, seq & 0xFFFFFFFF)
+
+def unpack_reading(datagram: bytes) -> Optional[Tuple[float, float, int]]:
+    """(value, timestamp, seq), or None for anything that is not a reading"""
+    if len(datagram) != MULTICAST_FORMAT.size:
+        return None
+    magic, timestamp, value, seq = MULTICAST_FORMAT.unpack(datagram)
+    if magic != MULTICAST_MAGIC or math.isnan(value):
+        return None
+    return value, timestamp, seq
+
+def multicast_sender(ttl: int = 1, interface: str = "0.0.0.0") -> socket.socket:
+    """UDP socket for sending to a multicast group; ttl 1 keeps datagrams on the local subnet"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+    return sock
+
+def multicast_receiver(group: str, port: int, interface: str = "0.0.0.0") -> socket.socket:
+    """UDP socket joined to a multicast group, with a short timeout so loops can notice a stop"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("", port))
+    membership = socket.inet_aton(group) + socket.inet_aton(interface)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    sock.settimeout(1.0)
+    return sock
+
+class MulticastPublisher:
+    """Broadcasts readings to every PeakPause instance listening on the LAN"""
+
+    def __init__(self, group: str = DEFAULT_MULTICAST_GROUP, port: int = DEFAULT_MULTICAST_PORT,
+                 ttl: int = 1, interface: str = "0.0.0.0"):
+        self.address = (group, port)
+        self.seq = 0
+        self.sock = multicast_sender(ttl, interface)
+
+    def publish(self, value: float, timestamp: Optional[float] = None) -> None:
+        self.seq += 1
+        self.sock.sendto(pack_reading(value, timestamp or time.time(), self.seq), self.address)
+
+    def close(self) -> None:
+        self.sock.close()
+
+class MulticastListener(TemperatureStream):
+    """Passive listener for MulticastPublisher datagrams
+
+    Freshness comes from the publisher's timestamp, so the slot is never marked
+    connected and max_age always applies.
+    """
+
+    name = "multicast"
+
+    def __init__(self, group: str = DEFAULT_MULTICAST_GROUP, port: int = DEFAULT_MULTICAST_PORT,
+                 interface: str = "0.0.0.0", slot: Optional[LatestValue] = None):
+        super().__init__(slot)
+        self.group = group
+        self.port = port
+        self.interface = interface
+
+    def _subscribe(self) -> None:
+        with multicast_receiver(self.group, self.port, self.interface) as sock:
+            logging.info(f"Listening for temperature broadcasts on {self.group}:{self.port}")
+
+            newest = 0.0
+            while not self._stop.is_set():
+                try:
+                    datagram = sock.recv(64)
+                except socket.timeout:
+                    continue
+                reading = unpack_reading(datagram)
+                if reading is None or reading[1] <= newest:
+                    continue  # Foreign, duplicate or reordered datagram
+                newest = reading[1]
+                self.slot.set(reading[0], reading[1])
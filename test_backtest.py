@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized policy backtester against PeakPause.evaluate
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import PeakPause, RatePeriod, TemperatureReading, StartStopGuard
+from backtest import backtest, load_temperature_csv, minute_grid, temperatures_at, one_year_after
+
+START = datetime(2025, 1, 1)
+END = datetime(2026, 1, 1)
+
+def write_year_csv(path: str) -> None:
+    """Five-minute readings swinging 18-30°C daily and seasonally, with a two-day sensor outage"""
+    with open(path, "w") as f:
+        f.write("timestamp,temperature\n")
+        t = START
+        while t < END:
+            if not datetime(2025, 3, 10) <= t < datetime(2025, 3, 12):
+                day = (t - START).total_seconds() / 86400
+                temp = 24 + 4 * np.sin(2 * np.pi * day / 365) + 2 * np.sin(2 * np.pi * (day % 1))
+                f.write(f"{t.isoformat()},{temp:.2f}\n")
+            t += timedelta(minutes=5)
+
+def test_year_backtest():
+    """Test a full year in one batch: fast, complete, and consistent with evaluate()"""
+    print("🧪 Testing one-year policy backtest")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        csv_path = os.path.join(work_dir, "temps.csv")
+        write_year_csv(csv_path)
+        times, temps = load_temperature_csv(csv_path)
+
+        controller = PeakPause(os.path.join(work_dir, "config.json"))
+        controller.thermal = None  # Not simulated by the backtester
+        result = backtest(controller.config, START, END, times, temps, watts=150)
+
+        print(f"✅ {result.minutes:,} minutes in {result.elapsed_ms:.0f} ms: {result.mined_hours:.0f} h mined, "
+              f"{result.kwh:.0f} kWh, ${result.cost:.2f}, {result.starts} starts / {result.stops} stops")
+        assert result.minutes == 365 * 1440
+        assert abs(sum(p.hours for p in result.periods) - 365 * 24) < 1e-6
+        assert result.elapsed_ms < 1000
+        on_peak = next(p for p in result.periods if p.period == RatePeriod.ON_PEAK)
+        assert on_peak.hours > 0 and on_peak.mined_hours == 0  # mine_on_peak is off by default
+        assert abs(result.starts - result.stops) <= 1
+        assert result.restarts_avoided > 0  # The flap guard is on by default
+
+        # Spot-check minutes against the real controller with the same reading
+        minutes = minute_grid(START, END)
+        minute_temps = temperatures_at(minutes, times, temps)
+        rng = random.Random(7)
+        for i in rng.sample(range(len(minutes)), 300):
+            dt = minutes[i].astype(datetime)
+            value = minute_temps[i]
+            controller.temp_monitor.get_reading = (
+                lambda: None if np.isnan(value) else TemperatureReading(float(value), time.time(), "csv"))
+            assert controller.evaluate(dt).should_run == result.policy[i], dt
+        print("✅ 300 random minutes match PeakPause.evaluate")
+
+        # The flap guard replayed on every minute, as the controller would apply it
+        guard = StartStopGuard(controller.config["hysteresis"], {})
+        running = False
+        for i in range(60 * 24 * 28):
+            dt = minutes[i].astype(datetime)
+            value = minute_temps[i]
+            controller.temp_monitor.get_reading = (
+                lambda: None if np.isnan(value) else TemperatureReading(float(value), time.time(), "csv"))
+            now = START.timestamp() + i * 60
+            decision = guard.filter(controller.evaluate(dt), running, now=now)
+            if decision.should_run != running:
+                guard.record(decision.should_run, running, decision, now=now)
+                running = decision.should_run
+            assert running == result.mining[i], dt
+        print(f"✅ Four weeks match the flap guard minute by minute ({guard.state.get('avoided', 0)} avoided)")
+
+def test_default_end():
+    """Test the default end a year after --start, including from a leap day"""
+    assert one_year_after(datetime(2025, 3, 1)) == datetime(2026, 3, 1)
+    assert one_year_after(datetime(2024, 2, 29, 6)) == datetime(2025, 2, 28, 6)
+    print("✅ A year after 2024-02-29 ends on 2025-02-28")
+
+def main():
+    """Run all tests"""
+    test_year_backtest()
+    test_default_end()
+    print("\n🎉 Backtest tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test fleet coordinator/agent decision sharing over multicast
+"""
+
+import sys
+import json
+import time
+import socket
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import PeakPause
+from fleet import FleetAgent, encode_message, decode_message, PROTOCOL_VERSION, DEFAULT_FLEET_GROUP
+from temperature_stream import DEFAULT_MULTICAST_GROUP
+from test_mining_controller import make_peakpause
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("", 0))
+        return sock.getsockname()[1]
+
+def test_signed_messages():
+    """Test that tampered, unsigned and replayed decisions are rejected"""
+    print("🧪 Testing fleet message authentication")
+
+    payload = {"v": PROTOCOL_VERSION, "should_run": True, "coordinator": "c", "seq": 1,
+               "issued": time.time(), "ttl": 60}
+    datagram = encode_message(payload, b"secret")
+    assert decode_message(datagram, b"secret") == payload
+    assert decode_message(datagram.replace(b"true", b"false"), b"secret") is None
+    assert decode_message(encode_message(payload), b"secret") is None
+    assert decode_message(datagram, b"other") is None
+
+    agent = FleetAgent({})
+    assert agent.group == DEFAULT_FLEET_GROUP != DEFAULT_MULTICAST_GROUP  # Sensor readings go elsewhere
+    assert agent._accept(payload, time.time())
+    assert not agent._accept(payload, time.time())  # Replay
+    assert not agent._accept(dict(payload, seq=2, issued=time.time() - 120), time.time())  # Expired
+    print("✅ Only fresh, correctly signed decisions accepted")
+
+def test_agent_follows_coordinator():
+    """Test that agents apply the coordinator's decision and fall back when it is gone"""
+    print("\n🧪 Testing coordinator -> agent decisions")
+
+    port = free_udp_port()
+    fleet = {"port": port, "key": "fleet-secret", "initial_wait": 2.0}
+    with tempfile.TemporaryDirectory() as work_dir:
+        coordinator = make_peakpause(work_dir, {"fleet": dict(fleet, role="coordinator", name="rig0")},
+                                     name="coordinator")
+        agent = make_peakpause(work_dir, {"fleet": dict(fleet, role="agent")}, name="agent")
+
+        local = coordinator.decide()
+        shared = agent.decide()
+        print(f"✅ Agent decision: {shared.reason}")
+        assert shared.reason.startswith("Fleet (rig0)")
+        assert shared.should_run == local.should_run and shared.period == local.period
+
+        coordinator.fleet.hold = True
+        coordinator.decide()
+        deadline = time.monotonic() + 2
+        while agent.decide().should_run and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not agent.decide().should_run
+        print("✅ Fleet hold stopped the agent")
+
+        orphan = make_peakpause(work_dir, {"fleet": {"role": "agent", "port": free_udp_port(), "initial_wait": 0.2}},
+                                name="orphan")
+        fallback = orphan.decide()
+        print(f"✅ Without a coordinator: {fallback.reason}")
+        assert not fallback.reason.startswith("Fleet")
+
+        coordinator.fleet.close()
+        agent.fleet.stop()
+        orphan.fleet.stop()
+
+def test_staggered_start():
+    """Test that starts right after a period change are spread by worker name"""
+    print("\n🧪 Testing staggered start-up")
+
+    offsets = {name: PeakPause.stagger_offset(name, 300) for name in ("rig1_16c", "rig2_16c", "rig3_8c")}
+    print(f"✅ Offsets in a 300s window: { {k: round(v) for k, v in offsets.items()} }")
+    assert all(0 <= offset < 300 for offset in offsets.values())
+    assert len(set(offsets.values())) == 3
+    assert PeakPause.stagger_offset("rig1_16c", 300) == offsets["rig1_16c"]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir, {"fleet": {"ramp_window": 300, "worker_name": "rig1_16c"}})
+        offset = controller.start_offset
+        assert controller._start_delay(datetime(2025, 9, 1, 23, 0, 10)) == offset - 10
+        assert controller._start_delay(datetime(2025, 9, 1, 23, 5, 0)) == 0.0   # Past the ramp window
+        assert controller._start_delay(datetime(2025, 9, 2, 2, 0, 0)) == 0.0    # Mid-period start
+        print(f"✅ rig1_16c starts {offset:.0f}s after 23:00")
+
+        unstaggered = make_peakpause(work_dir, name="solo")
+        assert unstaggered._start_delay(datetime(2025, 9, 1, 23, 0, 10)) == 0.0
+
+def test_failed_reload_releases_agent():
+    """Test that a reload failing after the fleet agent was built restores everything and stops the agent"""
+    print("\n🧪 Testing a failed config reload")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir)
+        before = dict(vars(controller))
+        with open(controller.config_file) as f:
+            config = json.load(f)
+        config["fleet"] = {"role": "agent", "port": free_udp_port(), "initial_wait": 0.2}
+        config["thermal"]["enabled"] = False
+        config["journal"]["file"] = 5  # Fails after the fleet agent has started
+        with open(controller.config_file, "w") as f:
+            json.dump(config, f)
+
+        assert not controller.reload_config()
+        assert vars(controller) == before
+        assert controller.fleet is None and controller.thermal is before["thermal"] is not None
+        time.sleep(1.5)  # The listener notices a stop within its 1s receive timeout
+        assert not any(thread.name == "fleet-agent" for thread in threading.enumerate())
+        print("✅ Previous components kept, the new agent stopped")
+
+def main():
+    """Run all tests"""
+    test_signed_messages()
+    test_agent_follows_coordinator()
+    test_staggered_start()
+    test_failed_reload_releases_agent()
+    print("\n🎉 Fleet tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test connection reuse and latency stats for HTTP temperature sources
+"""
+
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import TemperatureMonitor
+
+class KeepAliveSensor(BaseHTTPRequestHandler):
+    """Stand-in HTTP sensor that counts TCP connections"""
+
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        KeepAliveSensor.connections += 1
+
+    def do_GET(self):
+        body = json.dumps({"temperature": 21.5}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def test_session_reuses_connection():
+    """Test that repeated reads share one keep-alive connection"""
+    print("🧪 Testing HTTP source connection reuse")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveSensor)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monitor = TemperatureMonitor({
+            "source": "http",
+            "http_url": f"http://127.0.0.1:{server.server_address[1]}/temp",
+            "connect_timeout": 1.0,
+            "read_timeout": 2.0
+        })
+        values = [monitor.get_temperature() for _ in range(5)]
+        stats = monitor.latency_stats()["http"]
+        print(f"✅ {stats.reads} reads over {KeepAliveSensor.connections} connection(s), "
+              f"first {stats.first_ms:.1f} ms, mean {stats.mean_ms:.1f} ms")
+        assert values == [21.5] * 5
+        assert KeepAliveSensor.connections == 1
+        assert stats.reads == 5 and stats.failures == 0
+    finally:
+        server.shutdown()
+
+def main():
+    """Run all tests"""
+    test_session_reuses_connection()
+    print("\n🎉 HTTP source tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the flap guard: hysteresis bands, minimum run/off times and the restart budget
+"""
+
+import sys
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import StartStopGuard, Decision, RatePeriod
+from decisions import ReasonCode
+
+THRESHOLD = 25.0
+
+def policy(temp: float) -> Decision:
+    """The plain threshold rule, as evaluate() applies it during mid-peak"""
+    if temp > THRESHOLD:
+        return Decision(False, "Temperature too high", RatePeriod.MID_PEAK, 12.2, temp, THRESHOLD,
+                        code=ReasonCode.TOO_HOT)
+    return Decision(True, "Mining approved", RatePeriod.MID_PEAK, 12.2, temp, THRESHOLD, code=ReasonCode.APPROVED)
+
+def simulate(config: dict, temps: list, interval: float = 300) -> dict:
+    """Run the guard over one reading per cycle; returns the guard state"""
+    state = {}
+    guard = StartStopGuard(config, state)
+    running = False
+    for i, temp in enumerate(temps):
+        now = 1_000_000 + i * interval
+        decision = guard.filter(policy(temp), running, now=now)
+        started = decision.should_run and not running
+        stopped = running and not decision.should_run
+        guard.record(started, stopped, decision, now=now)
+        running = decision.should_run
+    return state
+
+def test_hovering_room():
+    """Test that a room hovering at the threshold no longer starts and stops every cycle"""
+    print("🧪 Testing a room hovering at its threshold")
+
+    # Mining warms the room past the threshold, stopping cools it back below
+    temps = [24.8, 25.2] * 24
+    unguarded = simulate({"enabled": False}, temps)
+    assert unguarded["flaps"] == 47  # Every change but the first start
+
+    # One stop once the minimum run time is over, then the room never gets a band below the threshold
+    guarded = simulate({"enabled": True, "bands": {"mid_peak": 1.0}}, temps)
+    assert guarded["flaps"] == 1 and guarded["stopped_hot"] and guarded["avoided"] == 23
+    print(f"✅ Flaps: {unguarded['flaps']} without the guard, {guarded['flaps']} with it, "
+          f"{guarded['avoided']} restarts avoided")
+
+def test_min_run_and_off():
+    """Test that temperature stops wait for the minimum run time, and starts for the minimum off time"""
+    print("\n🧪 Testing minimum run and off times")
+
+    state = {}
+    guard = StartStopGuard({"enabled": True, "min_run_seconds": 900, "min_off_seconds": 600, "band": 1.0}, state)
+    guard.record(True, False, policy(24.0), now=0)
+
+    held = guard.filter(policy(25.5), True, now=300)
+    assert held.should_run and held.code == ReasonCode.MIN_RUN and "600s left" in held.reason
+    assert guard.filter(policy(26.5), True, now=400).should_run is False  # A band over: stop regardless
+    assert guard.filter(policy(25.5), True, now=900).should_run is False  # Minimum run time is over
+
+    # Cooling back down before the hold ended means the stop (and the next start) was never needed
+    guard.filter(policy(25.5), True, now=300)
+    assert guard.filter(policy(24.5), True, now=600).should_run and state["avoided"] == 1
+
+    # Rate-driven stops are never held
+    on_peak = Decision(False, "On-peak period blocked by policy", RatePeriod.ON_PEAK, 28.4, 22.0, 20.0,
+                       code=ReasonCode.ON_PEAK_POLICY)
+    assert guard.filter(on_peak, True, now=300).should_run is False
+
+    guard.record(False, True, on_peak, now=1000)
+    held = guard.filter(policy(22.0), False, now=1300)
+    assert not held.should_run and held.code == ReasonCode.MIN_OFF
+    assert guard.filter(policy(22.0), False, now=1600).should_run  # Not a temperature stop: no band
+    print("✅ Holds end on time, and a hold that outlives its reason counts as an avoided restart")
+
+def test_restart_budget():
+    """Test that starts beyond the restart cost budget wait for the window to move on"""
+    print("\n🧪 Testing the restart budget")
+
+    state = {}
+    guard = StartStopGuard({"enabled": True, "min_off_seconds": 0, "restart_cost_seconds": 30,
+                            "restart_budget_seconds": 90, "budget_window": 3600}, state)
+    for now in (0, 600, 1200):
+        assert guard.filter(policy(20.0), False, now=now).should_run
+        guard.record(True, False, policy(20.0), now=now)
+        guard.record(False, True, policy(26.0), now=now + 1)
+
+    held = guard.filter(policy(20.0), False, now=1800)
+    assert not held.should_run and held.code == ReasonCode.RESTART_BUDGET
+    assert guard.filter(policy(20.0), False, now=1800, warm=True).should_run  # Resuming a paused miner is free
+    guard.record(True, False, policy(20.0), now=1800, cold=False)
+    assert len(state["starts"]) == 3
+    assert guard.filter(policy(20.0), False, now=3601).should_run
+    print(f"✅ 3 starts per hour at 30s each, then held ({held.reason})")
+
+def main():
+    """Run all tests"""
+    test_hovering_room()
+    test_min_run_and_off()
+    test_restart_budget()
+    print("\n🎉 Flap guard tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the binary decision journal: appends, torn-record recovery and range queries
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from journal import Journal, JournalWriter, RECORD, HEADER, SHOULD_RUN, MINING
+from decisions import Action, ReasonCode
+from test_mining_controller import make_peakpause
+
+def test_summary():
+    """Test mining hours per period, starts/stops and flaps over a simulated day"""
+    print("🧪 Testing journal queries")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "journal.bin")
+        writer = JournalWriter(path)
+        day = datetime(2025, 9, 1)
+        t0 = day.timestamp()
+        # 5-minute cycles: ULO mining midnight-7am, a 10-minute flap at 8am, mid-peak idle after
+        for i in range(24 * 12):
+            now = t0 + i * 300
+            hour = i / 12
+            period = "ultra_low" if hour < 7 else "mid_peak"
+            mining = hour < 7 or 8 <= hour < 8 + 10 / 60
+            if i == 0 or i == 8 * 12:
+                action = Action.START
+            elif i == 7 * 12 or i == 8 * 12 + 2:
+                action = Action.STOP
+            else:
+                action = Action.CONTINUE if mining else Action.IDLE
+            flags = (SHOULD_RUN | MINING) if mining else 0
+            writer.append(now, period, action, ReasonCode.APPROVED if mining else ReasonCode.TOO_HOT,
+                          flags, 2.8 if period == "ultra_low" else 15.7, 21.0, None, 1.5)
+        assert os.path.getsize(path) == HEADER.size + 24 * 12 * RECORD.size
+
+        with Journal(path) as journal:
+            started = time.perf_counter()
+            result = journal.summary(day, day + timedelta(days=1))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            assert result["records"] == 288
+            assert abs(result["mining_hours"]["ultra_low"] - 7.0) < 1e-6
+            assert abs(result["mining_hours"]["mid_peak"] - 10 / 60) < 1e-6
+            assert abs(result["hours"]["mid_peak"] - 17.0) < 1e-6
+            assert result["starts"] == 2 and result["stops"] == 2
+            assert result["flaps"] == 1  # The 10-minute run at 8am
+            assert result["reasons"]["APPROVED"] == 86 and result["cycle_ms_p50"] == 1.5
+            assert journal.summary(day - timedelta(days=1), day)["records"] == 0
+        print(f"✅ Day summarised in {elapsed_ms:.2f} ms")
+
+        # A crash mid-write leaves a partial record, which the next append drops
+        with open(path, "ab") as f:
+            f.write(b"\x01" * 10)
+        writer.append(t0 + 86400, "ultra_low", Action.START, ReasonCode.APPROVED, SHOULD_RUN | MINING,
+                      2.8, None, None, 1.0)
+        with Journal(path) as journal:
+            assert len(journal) == 289 and journal.records["time"][-1] == t0 + 86400
+        print("✅ Torn record dropped")
+
+def test_controller_writes_journal():
+    """Test that each run_once appends a record with a reason code"""
+    print("\n🧪 Testing run_once journal records")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir, temperature=18.0)
+        journal_file = controller.config["journal"]["file"]
+        try:
+            controller.run_once()
+            controller.run_once()
+        finally:
+            controller.mining_controller.terminate_mining()
+
+        with Journal(journal_file) as journal:
+            records = journal.records
+            assert len(records) == 2
+            assert records["code"][0] == controller.last_decision.code != ReasonCode.UNKNOWN
+            assert records["temperature"][0] == 18.0
+            if controller.last_decision.should_run:
+                assert list(records["action"]) == [Action.START, Action.CONTINUE]
+            else:
+                assert list(records["action"]) == [Action.IDLE, Action.IDLE]
+            assert records["cycle_ms"][0] > 0
+        print(f"✅ 2 records, {ReasonCode(controller.last_decision.code).name}")
+
+        # The query tool finds the same file through the config, from another directory
+        with open(controller.config_file) as f:
+            config = json.load(f)
+        config["journal"]["file"] = "decisions.bin"
+        with open(controller.config_file, "w") as f:
+            json.dump(config, f)
+        os.replace(journal_file, os.path.join(work_dir, "decisions.bin"))
+        result = subprocess.run([sys.executable, str(script_dir / "journal.py"), "--config", controller.config_file,
+                                 "--since", "2000-01-01"], cwd=os.path.dirname(work_dir),
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0 and ": 2 of 2 decisions" in result.stdout, result.stderr
+        print("✅ journal.py read the config's relative journal path")
+
+def main():
+    """Run all tests"""
+    test_summary()
+    test_controller_writes_journal()
+    print("\n🎉 Journal tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the Prometheus registry, textfile export from cron runs and the HTTP endpoint
+"""
+
+import os
+import sys
+import json
+import tempfile
+import requests
+from pathlib import Path
+from datetime import datetime
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import PeakPause
+from metrics import Registry, MetricsServer, ControllerMetrics
+from test_mining_controller import make_peakpause
+
+ULTRA_LOW = datetime(2025, 9, 3, 2, 0)  # Wednesday 2am: mined below 30°C
+
+def test_text_format():
+    """Test counters, labelled gauges and cumulative histogram buckets"""
+    print("🧪 Testing Prometheus text format")
+
+    registry = Registry()
+    reads = registry.histogram("reads_seconds", "Read latency", ("source",), buckets=(0.01, 0.1))
+    starts = registry.counter("starts_total", "Starts")
+    temp = registry.gauge("temperature_celsius", "Temperature", ("room",))
+    for value in (0.005, 0.05, 0.5):
+        reads.observe(value, source="socket:192.168.1.185")
+    starts.inc()
+    temp.set(21.5, room='den "east"')
+
+    text = registry.render()
+    assert '# TYPE reads_seconds histogram' in text
+    assert 'reads_seconds_bucket{source="socket:192.168.1.185",le="0.01"} 1' in text
+    assert 'reads_seconds_bucket{source="socket:192.168.1.185",le="0.1"} 2' in text
+    assert 'reads_seconds_bucket{source="socket:192.168.1.185",le="+Inf"} 3' in text
+    assert 'reads_seconds_count{source="socket:192.168.1.185"} 3' in text
+    assert 'starts_total 1' in text
+    assert 'temperature_celsius{room="den \\"east\\""} 21.5' in text
+
+    restored = Registry()
+    restored.histogram("reads_seconds", "Read latency", ("source",), buckets=(0.01, 0.1))
+    restored.counter("starts_total", "Starts")
+    restored.restore(json.loads(json.dumps(registry.state())))
+    assert restored.render() == text.replace('\ntemperature_celsius{room="den \\"east\\""} 21.5', "") \
+        .replace("# HELP temperature_celsius Temperature\n# TYPE temperature_celsius gauge\n", "")
+    print("✅ Text format and state round trip")
+
+def test_duty_cycle():
+    """Test the exponentially weighted mining duty cycle"""
+    metrics = ControllerMetrics()
+    state = {}
+    metrics.update_duty_cycle(state, False, now=0)
+    assert metrics.update_duty_cycle(state, True, now=86400) == 0.0     # Idle for a day
+    duty = metrics.update_duty_cycle(state, False, now=2 * 86400)     # Then mined for a day
+    assert abs(duty - 0.632) < 0.001
+    assert metrics.update_duty_cycle(state, False, now=3 * 86400) < duty
+    print(f"\n✅ Duty cycle after a day mining: {duty:.3f}")
+
+def make_ulo_peakpause(work_dir: str, metrics: dict, temperature: float) -> PeakPause:
+    """Controller deciding at ULTRA_LOW on a fixed reading, whatever the time of day"""
+    controller = make_peakpause(work_dir, {"metrics": metrics}, temperature=temperature)
+    controller.evaluate = lambda dt=None: PeakPause.evaluate(controller, dt or ULTRA_LOW)
+    return controller
+
+def test_cron_textfile_and_endpoint():
+    """Test that cron runs accumulate counters in the textfile and the daemon serves them"""
+    print("\n🧪 Testing textfile collector mode and /metrics")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        textfile = os.path.join(work_dir, "peakpause.prom")
+        config = {"enabled": True, "textfile": textfile, "slow_cycle_seconds": 0.0}
+        slow = []
+        first = make_ulo_peakpause(work_dir, config, 18.0)
+        first.slow_cycle_hooks.append(slow.append)
+        stats = first.timed_run_once()
+        assert slow == [stats] and "decision" in stats.phases
+        assert first.mining_controller.is_mining()
+
+        second = make_ulo_peakpause(work_dir, config, 18.0)  # The next cron run
+        try:
+            second.timed_run_once()
+            with open(textfile) as f:
+                text = f.read()
+            assert "peakpause_cycle_seconds_count 2" in text
+            assert "peakpause_decision_seconds_count 2" in text
+            assert "peakpause_slow_cycles_total 2" in text
+            assert "peakpause_miner_starts_total 1" in text
+            assert "peakpause_mining 1" in text
+            assert "peakpause_temperature_celsius 18" in text
+            assert 'peakpause_rate_period{period="ultra_low"} 1' in text
+            print(f"✅ Textfile after 2 mining runs ({len(text.splitlines())} lines)")
+
+            server = MetricsServer(second.metrics.registry, port=0).start()
+            try:
+                response = requests.get(f"http://127.0.0.1:{server.port}/metrics", timeout=2)
+                assert response.status_code == 200 and "peakpause_cycle_seconds_count 2" in response.text
+                print("✅ Served on /metrics")
+            finally:
+                server.close()
+        finally:
+            second.mining_controller.terminate_mining()
+            first.mining_controller.get_mining_pid()  # reap our child
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        textfile = os.path.join(work_dir, "peakpause.prom")
+        hot = make_ulo_peakpause(work_dir, {"enabled": True, "textfile": textfile}, 40.0)
+        hot.timed_run_once()
+        assert not hot.mining_controller.is_mining()
+        with open(textfile) as f:
+            text = f.read()
+        assert "\npeakpause_miner_starts_total " not in text  # Never incremented
+        assert "peakpause_mining 0" in text
+        assert "peakpause_temperature_celsius 40" in text
+        print("✅ Textfile after an idle run (too hot)")
+
+def main():
+    """Run all tests"""
+    test_text_format()
+    test_duty_cycle()
+    test_cron_textfile_and_endpoint()
+    print("\n🎉 Metrics tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
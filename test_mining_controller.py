@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test MiningController process tracking with a stand-in miner
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import MiningController, PeakPause, PeakPauseConfig, TemperatureReading
+
+FAKE_MINER = """#!/bin/sh
+trap 'exit 0' TERM
+while true; do sleep 0.1; done
+"""
+
+def make_controller(work_dir: str, script: str = FAKE_MINER) -> MiningController:
+    """Create a controller whose 'xmrig' is a small shell script"""
+    executable = os.path.join(work_dir, "xmrig")
+    with open(executable, "w") as f:
+        f.write(script)
+    os.chmod(executable, 0o755)
+
+    return MiningController({
+        "executable": executable,
+        "config_file": os.path.join(work_dir, "config.json"),
+        "log_file": os.path.join(work_dir, "xmrig.log")
+    })
+
+def make_peakpause(work_dir: str, overrides: Optional[Dict[str, Any]] = None, script: str = FAKE_MINER,
+                   temperature: Optional[float] = None, name: str = "peakpause") -> PeakPause:
+    """PeakPause on the default config with a stand-in miner, writing only inside work_dir
+
+    Each overrides entry updates that config section (or replaces a non-dict
+    value). With a temperature, the sensor always returns that reading.
+    """
+    config_file = os.path.join(work_dir, f"{name}_config.json")
+    config = PeakPauseConfig(config_file).config  # Writes the default config
+    miner = make_controller(work_dir, script)
+    config["mining"].update(executable=miner.executable, config_file=miner.config_file, log_file=miner.log_file)
+    config["temperature"]["source"] = "system"
+    config["state_file"] = os.path.join(work_dir, f"{name}_state.json")
+    config["journal"]["file"] = os.path.join(work_dir, f"{name}_journal.bin")
+    config["logging"]["file"] = os.path.join(work_dir, f"{name}.log")
+    config["telemetry"]["file"] = os.path.join(work_dir, f"{name}_telemetry.bin")
+    config["profitability"]["snapshot_file"] = os.path.join(work_dir, f"{name}_market.json")
+    for section, values in (overrides or {}).items():
+        if isinstance(values, dict) and isinstance(config.get(section), dict):
+            config[section].update(values)
+        else:
+            config[section] = values
+    with open(config_file, "w") as f:
+        json.dump(config, f)
+
+    controller = PeakPause(config_file)
+    if temperature is not None:
+        controller.temp_monitor.get_reading = lambda: TemperatureReading(temperature, time.time(), "test")
+    return controller
+
+def test_pidfile_tracking():
+    """Test that a started miner is tracked and re-adopted through the pidfile"""
+    print("🧪 Testing pidfile + pidfd process tracking")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_controller(work_dir)
+        assert not controller.is_running()
+
+        assert controller.start_mining()
+        pid = controller.get_mining_pid()
+        state = json.load(open(controller.pid_file))
+        print(f"✅ Started stand-in miner PID {pid}, pidfile {state}")
+        assert state["pid"] == pid
+
+        # A new controller (the next cron run) adopts the miner without a scan
+        next_run = make_controller(work_dir)
+        assert next_run.get_mining_pid() == pid
+        print("✅ Next run adopted the miner from the pidfile")
+
+        assert next_run.stop_mining()
+        controller.get_mining_pid()  # reap our child
+        assert not os.path.exists(controller.pid_file)
+        assert not next_run.is_running()
+        print("✅ Stopped miner and removed pidfile")
+
+def test_stale_pidfile_rejected():
+    """Test that a pidfile pointing at a recycled PID is ignored"""
+    print("\n🧪 Testing stale pidfile rejection")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_controller(work_dir)
+        # Our own PID with a wrong start time looks like a recycled PID
+        with open(controller.pid_file, "w") as f:
+            json.dump({"pid": os.getpid(), "start_time": 1, "executable": controller.executable}, f)
+
+        assert not controller.is_running()
+        assert not os.path.exists(controller.pid_file)
+        print("✅ Stale pidfile ignored and removed")
+
+def test_duplicate_scan():
+    """Test that the slow-path scan adopts one orphan and kills the rest"""
+    print("\n🧪 Testing duplicate detection")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_controller(work_dir)
+        orphans = [subprocess.Popen([controller.executable, "--config", controller.config_file])
+                   for _ in range(2)]
+        time.sleep(0.2)
+
+        killed = controller.kill_duplicates()
+        print(f"✅ Adopted PID {controller.process_pid}, killed {killed} duplicate(s)")
+        assert killed == 1
+        assert controller.process_pid == orphans[0].pid
+        assert orphans[1].wait(timeout=5) == 0
+
+        controller.stop_mining()
+        orphans[0].wait(timeout=5)
+
+def test_graceful_stop_timing():
+    """Test that stop returns as soon as the miner exits and escalates only when needed"""
+    print("\n🧪 Testing bounded graceful stop")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_controller(work_dir)
+        controller.start_mining()
+        assert controller.stop_mining()
+        print(f"✅ Cooperative miner stopped in {controller.last_stop_duration:.2f}s")
+        assert not controller.last_stop_forced
+        assert controller.last_stop_duration < 1.0
+
+        stubborn = make_controller(work_dir, FAKE_MINER.replace("exit 0", ""))
+        stubborn.stop_timeout = 0.5
+        stubborn.start_mining()
+        time.sleep(0.2)  # let the shell install its trap
+        assert stubborn.stop_mining()
+        print(f"✅ Stubborn miner killed after {stubborn.last_stop_duration:.2f}s")
+        assert stubborn.last_stop_forced
+        assert not stubborn.is_running()
+
+def wait_for_state(pid: int, frozen: bool) -> bool:
+    """Signals are delivered asynchronously - wait briefly for the process state to change"""
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        if (MiningController._proc_stat(pid)[0] == "T") == frozen:
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_freeze_mode():
+    """Test SIGSTOP/SIGCONT freezing, memory-pressure fallback and stale-session restart"""
+    print("\n🧪 Testing freeze mode")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        base = make_controller(work_dir)
+        controller = MiningController(dict(base.config, control_mode="freeze"))
+        controller.start_mining()
+        pid = controller.process_pid
+
+        assert controller.stop_mining()
+        assert controller.pause_method == "freeze"
+        assert wait_for_state(pid, frozen=True)
+        print(f"✅ Froze PID {pid}")
+
+        assert controller.start_mining()
+        assert controller.process_pid == pid and not controller.paused
+        assert wait_for_state(pid, frozen=False)
+        print(f"✅ Thawed PID {pid}")
+
+        # Frozen too long: resume restarts the miner instead of thawing it
+        controller.stop_mining()
+        controller.paused_since -= controller.freeze_max_seconds + 1
+        assert controller.start_mining()
+        assert controller.process_pid != pid and not controller.paused
+        print(f"✅ Stale frozen miner replaced by PID {controller.process_pid}")
+
+        # Killed while frozen, after the liveness check: the thaw fails and a new miner starts
+        controller.stop_mining()
+        frozen_pid = controller.process_pid
+        send_signal = controller._send_signal
+
+        def killed_first(sig):
+            if sig == signal.SIGCONT:
+                os.kill(frozen_pid, signal.SIGKILL)
+                controller._process.wait()
+            send_signal(sig)
+
+        controller._send_signal = killed_first
+        assert controller.start_mining()
+        controller._send_signal = send_signal
+        assert controller.process_pid not in (None, frozen_pid) and not controller.paused
+        print(f"✅ Vanished frozen miner replaced by PID {controller.process_pid}")
+
+        # Host short on memory: stop for real instead of freezing
+        controller.freeze_min_available_mb = 10 ** 9
+        assert controller.stop_mining()
+        assert not controller.is_running()
+        print("✅ Memory pressure forced a real stop")
+
+def free_tcp_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_reload_keeps_miner():
+    """Test that config reloads hand the tracked miner to the new controller and rebind a moved metrics port"""
+    print("\n🧪 Testing config reloads")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir, {"metrics": {"enabled": True, "port": free_tcp_port()}})
+        first = controller.mining_controller
+        assert first.start_mining()
+        pid, pidfd = first.process_pid, first._pidfd
+        controller._start_metrics_server()
+        server = controller.metrics_server
+        try:
+            open_fds = len(os.listdir("/proc/self/fd"))
+            for _ in range(3):
+                assert controller.reload_config()
+            assert len(os.listdir("/proc/self/fd")) == open_fds  # Nothing leaked per reload
+            miner = controller.mining_controller
+            assert miner is not first and first._pidfd is None and first.process_pid is None
+            assert miner.process_pid == pid and miner._pidfd == pidfd and miner.is_mining()
+            assert controller.metrics_server is server  # Same address: kept
+
+            with open(controller.config_file) as f:
+                config = json.load(f)
+            config["metrics"]["port"] = port = free_tcp_port()
+            with open(controller.config_file, "w") as f:
+                json.dump(config, f)
+            assert controller.reload_config() and controller.metrics_server is None
+            controller._start_metrics_server()  # As run_continuous does after a reload
+            assert controller.metrics_server.port == port
+        finally:
+            controller.mining_controller.terminate_mining()
+            if controller.metrics_server is not None:
+                controller.metrics_server.close()
+        assert not os.path.exists(f"/proc/{pid}")  # Reaped through the carried-over Popen handle
+        print(f"✅ PID {pid} kept across 4 reloads, metrics moved to port {port}")
+
+def main():
+    """Run all tests"""
+    test_pidfile_tracking()
+    test_stale_pidfile_rejected()
+    test_duplicate_scan()
+    test_graceful_stop_timing()
+    test_freeze_mode()
+    test_reload_keeps_miner()
+    print("\n🎉 Process tracking tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test pre-warming: measuring launch-to-hashing time, starting ahead of a cheaper
+period under SCHED_IDLE and stopping ahead of a more expensive one
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import Prewarm, TemperatureReading, RatePeriod
+from decisions import ReasonCode
+from xmrig_log import parse_line
+from test_mining_controller import make_peakpause
+
+# Prints xmrig's READY line after a short "dataset init"
+READY_MINER = """#!/bin/sh
+trap 'exit 0' TERM
+sleep 0.3
+echo "[$(date '+%Y-%m-%d %H:%M:%S.%3N')]  cpu      READY threads 4/4 (4) huge pages 100% 4/4 memory 2097152 KB (12 ms)"
+while true; do sleep 0.1; done
+"""
+
+def test_measurements():
+    """Test the start lead from recent launch-to-ready times and the smoothed stop time"""
+    print("🧪 Testing start-up measurements")
+
+    event = parse_line("[2025-09-03 22:59:40.250]  cpu      READY threads 8/8 (8) huge pages 100% 8/8 "
+                       "memory 2097152 KB (21 ms)")
+    assert event.kind == "ready" and event.data == {"threads": 8, "total": 8, "huge_pages": 100}
+
+    state = {}
+    prewarm = Prewarm({"margin_seconds": 5, "samples": 3}, state)
+    assert prewarm.start_lead() is None  # Nothing measured: start at the change as before
+    for launched, init in ((1000, 12.0), (2000, 20.0), (3000, 14.0), (4000, 15.0)):
+        prewarm.launched(launched)
+        assert prewarm.ready(launched + init) == init
+    assert state["init_seconds"] == [20.0, 14.0, 15.0] and prewarm.start_lead() == 25.0
+    assert prewarm.ready(5000) is None  # No launch being timed
+
+    prewarm.stopped(1.0)
+    prewarm.stopped(2.0)
+    assert abs(prewarm.stop_lead() - 1.3) < 1e-9
+    print(f"✅ Start lead {prewarm.start_lead():.0f}s, stop lead {prewarm.stop_lead():.1f}s")
+
+def test_anticipate_period_changes():
+    """Test starting before 23:00, keeping a pre-warmed miner running and stopping before 07:00"""
+    print("\n🧪 Testing decisions ahead of period changes")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Between the mid-peak (25°C) and ultra-low (30°C) thresholds
+        controller = make_peakpause(work_dir, script=READY_MINER, temperature=27.0)
+        controller.prewarm.state.update(init_seconds=[20.0], stop_seconds=0.5)
+
+        before_ulo = datetime(2025, 9, 3, 22, 59, 45)  # Wednesday, mid-peak
+        decision = controller.evaluate(before_ulo)
+        assert not decision.should_run and decision.code == ReasonCode.TOO_HOT
+
+        prewarm, boundary = controller._anticipate(decision, False, before_ulo)
+        assert prewarm.should_run and prewarm.code == ReasonCode.PREWARM
+        assert prewarm.period == RatePeriod.ULTRA_LOW and boundary == datetime(2025, 9, 3, 23, 0)
+        kept, _ = controller._anticipate(decision, True, before_ulo)
+        assert kept.should_run  # Not stopped seconds before its period
+        early = datetime(2025, 9, 3, 22, 59, 30)
+        assert controller._anticipate(decision, False, early)[0] is decision  # Outside the 25s lead
+
+        before_mid_peak = datetime(2025, 9, 4, 6, 59, 59, 700000)
+        decision = controller.evaluate(before_mid_peak)
+        assert decision.should_run
+        stop, _ = controller._anticipate(decision, True, before_mid_peak)
+        assert not stop.should_run and stop.code == ReasonCode.TOO_HOT and stop.period == RatePeriod.MID_PEAK
+        assert controller._anticipate(decision, False, before_mid_peak)[0] is decision
+        print(f"✅ {prewarm.reason}")
+        print(f"✅ {stop.reason}")
+
+def test_prewarm_with_ramp_window():
+    """Test that the start lead is taken from this host's ramp slot, and the sensor is read once"""
+    print("\n🧪 Testing pre-warming with a staggered start")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir, script=READY_MINER, temperature=27.0)
+        controller.prewarm.state.update(init_seconds=[20.0])
+        controller.start_offset = 40.0  # Slot at 23:00:40, launch 25s before it
+        reads = []
+        controller.temp_monitor.get_reading = lambda: reads.append(1) or TemperatureReading(27.0, time.time(), "t")
+
+        before_ulo = datetime(2025, 9, 3, 22, 59, 45)
+        decision = controller.evaluate(before_ulo)
+        assert controller._anticipate(decision, False, before_ulo)[0] is decision  # Slot is 55s away
+        assert controller._transition_lead() == 0.0  # Reached through the staggered start
+
+        in_window = datetime(2025, 9, 3, 23, 0, 5)
+        assert controller._start_delay(in_window) == 10.0  # 23:00:15, 25s before the slot
+
+        controller.start_offset = 10.0  # Slot at 23:00:10
+        prewarm, boundary = controller._anticipate(decision, False, before_ulo)
+        assert prewarm.code == ReasonCode.PREWARM and boundary == datetime(2025, 9, 3, 23, 0)
+        assert "23:00:10" in prewarm.reason and controller._transition_lead() == 15.0
+        assert len(reads) == 1  # The next period is judged on the reading already taken
+        print(f"✅ {prewarm.reason}")
+
+def test_idle_priority_launch():
+    """Test that a pre-warm launch runs under SCHED_IDLE and its start-up time is measured from the log"""
+    print("\n🧪 Testing a SCHED_IDLE launch")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir, script=READY_MINER, temperature=27.0)
+        miner = controller.mining_controller
+        try:
+            assert miner.start_mining(idle_priority=True)
+            pid = miner.get_mining_pid()
+            assert os.sched_getscheduler(pid) == os.SCHED_IDLE
+            controller.prewarm.launched(miner.last_launch, datetime.fromtimestamp(time.time() - 1))
+
+            time.sleep(0.8)
+            controller._read_miner_log()
+            measured = controller.prewarm.state["init_seconds"]
+            assert len(measured) == 1 and 0.2 < measured[0] < 0.8
+
+            controller.prewarm.settle(miner)  # The period has begun
+            if os.geteuid() == 0:  # Leaving SCHED_IDLE needs CAP_SYS_NICE at nice 19
+                assert os.sched_getscheduler(pid) == os.SCHED_OTHER
+            assert controller.prewarm.state["boundary"] is None
+            print(f"✅ Launch to READY in {measured[0]:.2f}s")
+        finally:
+            miner.terminate_mining()
+
+def main():
+    """Run all tests"""
+    test_measurements()
+    test_anticipate_period_changes()
+    test_prewarm_with_ramp_window()
+    test_idle_priority_launch()
+    print("\n🎉 Pre-warm tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test revenue estimates, the cached market snapshot and margin-aware decisions
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import importlib
+from datetime import datetime
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import PeakPause
+from profitability import MarketData, MarketSnapshot, PowerMeter, revenue_per_hour
+from test_mining_controller import make_peakpause
+
+FETCHES = []
+
+def fake_fetch():
+    """Pluggable fetcher, configured as "test_profitability:fake_fetch" """
+    FETCHES.append(time.time())  # On the imported module, also when run as a script
+    return {"difficulty": 300e9, "block_reward": 0.6, "price": 300.0}
+
+def test_revenue_math():
+    """Test revenue for a 10 kH/s rig against a known difficulty"""
+    print("🧪 Testing revenue estimate")
+
+    snapshot = MarketSnapshot(difficulty=300e9, block_reward=0.6, price=300.0, updated=time.time())
+    # 10,000 H/s * 3600 s / 300e9 hashes per block = 1.2e-4 blocks/h -> 0.0216 $/h
+    per_hour = revenue_per_hour(10_000, snapshot)
+    assert abs(per_hour - 0.0216) < 1e-9
+    assert abs(revenue_per_hour(10_000, snapshot, pool_fee=0.5) - 0.0108) < 1e-9
+    print(f"✅ 10 kH/s: ${per_hour * 24:.3f}/day, {per_hour * 100 / 0.15:.1f}¢/kWh at 150 W")
+
+def test_snapshot_refresh():
+    """Test that the snapshot is fetched once, cached to disk and reused"""
+    print("\n🧪 Testing market snapshot cache")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = {"source": "test_profitability:fake_fetch", "snapshot_file": os.path.join(work_dir, "market.json")}
+        market = MarketData(config)
+        fetches = importlib.import_module("test_profitability").FETCHES
+        fetches.clear()
+        assert market.snapshot().difficulty == 300e9 and len(fetches) == 1
+        assert market.snapshot() is not None and len(fetches) == 1
+
+        offline = MarketData(dict(config, source="file"))
+        assert offline.snapshot().price == 300.0 and len(fetches) == 1
+        with open(config["snapshot_file"], "w") as f:
+            json.dump({"difficulty": 1, "block_reward": 1, "price": 1, "updated": time.time() - 2 * 86400}, f)
+        assert offline.snapshot() is None  # Too old to trust
+        assert [name for name in os.listdir(work_dir)] == ["market.json"]  # No temporary files left
+
+        unwritable = MarketData(dict(config, snapshot_file=os.path.join(work_dir, "missing", "market.json")))
+        assert unwritable.snapshot().price == 300.0 and len(fetches) == 2  # Kept in memory
+        assert unwritable.snapshot() is not None and len(fetches) == 2
+        print("✅ Fetched once, reused from disk, stale snapshots ignored, kept in memory if not writable")
+
+def failing_fetch():
+    """Fetcher for a source that is down, configured as "test_profitability:failing_fetch" """
+    FETCHES.append(time.time())
+    raise ConnectionError("source unreachable")
+
+def test_fetch_backoff():
+    """Test that failed fetches back off across runs that share only the state file"""
+    print("\n🧪 Testing fetch retries from cron")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = {"source": "test_profitability:failing_fetch", "refresh_interval": 3600,
+                  "snapshot_file": os.path.join(work_dir, "market.json")}
+        fetches = importlib.import_module("test_profitability").FETCHES
+        fetches.clear()
+        state = {}
+        for _ in range(3):  # One process per cycle, as from cron
+            assert MarketData(config, state).snapshot() is None
+        assert len(fetches) == 1 and state["retry"] == 300
+        assert state["next_fetch"] > time.time() + 290
+
+        for retry in (600, 1200, 2400, 3600, 3600):
+            state["next_fetch"] = 0.0  # Retry is due
+            MarketData(config, state).snapshot()
+            assert state["retry"] == retry
+        assert len(fetches) == 6
+
+        state["next_fetch"] = 0.0
+        assert MarketData(dict(config, source="test_profitability:fake_fetch"), state).snapshot() is not None
+        assert "retry" not in state and "next_fetch" not in state
+        print("✅ Retried after 5, 10, 20, 40 then 60 minutes; reset on success")
+
+def test_power_meter():
+    """Test RAPL energy deltas, only counting intervals spent mining"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        energy = os.path.join(work_dir, "energy_uj")
+        state = {}
+        meter = PowerMeter(state, energy)
+        for uj, mining in ((1_000_000, True), (4_000_000, False), (5_000_000, True)):
+            with open(energy, "w") as f:
+                f.write(str(uj))
+            meter.update(mining)
+        assert meter.watts is None
+        state["last"]["time"] -= 10
+        with open(energy, "w") as f:
+            f.write(str(1_505_000_000))
+        assert abs(meter.update(True) - 150.0) < 1.0
+        print("\n✅ RAPL meter: 1500 J over 10 s = 150 W")
+
+def make_controller(work_dir: str, snapshot: dict) -> PeakPause:
+    snapshot_file = os.path.join(work_dir, "market.json")
+    with open(snapshot_file, "w") as f:
+        json.dump(dict(snapshot, updated=time.time()), f)
+    return make_peakpause(work_dir, {"tariff": {"plan": "ulo"},
+                                     "profitability": {"enabled": True, "snapshot_file": snapshot_file,
+                                                       "hashrate": 10_000, "watts": 150}}, temperature=18.0)
+
+def test_margin_aware_decisions():
+    """Test that mid/on-peak mining follows revenue, and cheap periods are unaffected"""
+    print("\n🧪 Testing margin-aware decisions (2025-26 ULO rates)")
+
+    mid_peak = datetime(2025, 11, 4, 10, 0)   # 15.7¢/kWh
+    on_peak = datetime(2025, 11, 4, 18, 0)    # 39.1¢/kWh
+    overnight = datetime(2025, 11, 4, 2, 0)   # 3.9¢/kWh
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 14.4¢/kWh revenue: below mid-peak cost
+        poor = make_controller(work_dir, {"difficulty": 300e9, "block_reward": 0.6, "price": 300.0})
+        assert not poor.evaluate(mid_peak).should_run
+        assert poor.evaluate(overnight).should_run
+        print(f"✅ {poor.evaluate(mid_peak).reason}")
+
+        # 36¢/kWh revenue: 2.3x mid-peak, still short of on-peak
+        fair = make_controller(work_dir, {"difficulty": 120e9, "block_reward": 0.6, "price": 300.0})
+        assert fair.evaluate(mid_peak).should_run
+        assert not fair.evaluate(on_peak).should_run
+        print(f"✅ {fair.evaluate(mid_peak).reason}")
+
+        # 72¢/kWh revenue: above force_mine_threshold, mined even though mine_on_peak is off
+        rich = make_controller(work_dir, {"difficulty": 60e9, "block_reward": 0.6, "price": 300.0})
+        assert rich.evaluate(on_peak).should_run
+        print(f"✅ {rich.evaluate(on_peak).reason}")
+
+def main():
+    """Run all tests"""
+    test_revenue_math()
+    test_snapshot_refresh()
+    test_fetch_backoff()
+    test_power_meter()
+    test_margin_aware_decisions()
+    print("\n🎉 Profitability tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
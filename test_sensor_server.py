@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test the asyncio sensor server against many socket-source clients
+"""
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import TemperatureMonitor
+from sensor_server import SensorServer
+
+class CountingMonitor(TemperatureMonitor):
+    """Monitor whose sensor is a counter instead of hardware"""
+
+    def __init__(self, value: float):
+        super().__init__({"source": "system"})
+        self.value = value
+        self.reads = 0
+
+    def get_temperature(self):
+        self.reads += 1
+        return self.value
+
+def start_server(config, monitor):
+    """Run a SensorServer on its own event loop thread"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = SensorServer(dict(config, host="127.0.0.1", port=0), monitor)
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(timeout=5)
+    return server, loop
+
+def request(port: int, message: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=2) as sock:
+        sock.sendall(message)
+        return sock.recv(4096)
+
+def test_many_clients_one_sensor_read():
+    """Test that dozens of rigs are answered from one cached sensor read"""
+    print("🧪 Testing sensor server fan-out")
+
+    monitor = CountingMonitor(23.456)
+    server, loop = start_server({"interval": 60}, monitor)
+    clients = TemperatureMonitor({"source": "socket", "socket_host": "127.0.0.1",
+                                  "socket_port": server.port})
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        readings = list(pool.map(lambda _: clients.get_temperature(), range(48)))
+
+    print(f"✅ {len(readings)} client reads, {monitor.reads} sensor read(s)")
+    assert readings == [23.46] * 48
+    assert monitor.reads == 1
+
+    for junk in (b"GET / HTTP/1.0", b"temp2", b"\xff\xfe"):
+        request(server.port, junk)
+    stats = json.loads(request(server.port, b"stats"))
+    print(f"✅ Stats: {stats['requests']} avg {stats['latency_avg_ms']:.3f} ms")
+    assert stats["requests"]["temp"] == 48
+    assert stats["requests"]["other"] == 3 and len(stats["requests"]) == 3  # temp, other, stats
+    assert stats["sensor_reads"] == 1
+
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=5)
+
+def test_connection_limit_and_stale_value():
+    """Test that excess connections are refused and stale readings are not served"""
+    print("\n🧪 Testing connection limit")
+
+    monitor = CountingMonitor(21.0)
+    server, loop = start_server({"interval": 60, "max_connections": 1}, monitor)
+    client = TemperatureMonitor({"source": "socket", "socket_host": "127.0.0.1",
+                                 "socket_port": server.port, "timeout": 1})
+
+    idle = socket.create_connection(("127.0.0.1", server.port))
+    try:
+        assert client.get_temperature() is None
+    finally:
+        idle.close()
+    print(f"✅ Second connection refused ({server.stats['rejected']} rejected)")
+    assert server.stats["rejected"] == 1
+
+    while server.active:
+        time.sleep(0.01)  # Server notices the idle client hanging up
+    assert client.get_temperature() == 21.0
+    server.timestamp -= server.max_age + 1
+    assert client.get_temperature() is None
+    print("✅ Stale reading withheld")
+
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=5)
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("", 0))
+        return sock.getsockname()[1]
+
+def test_multicast_broadcast():
+    """Test that every listener gets the reading from one sensor read per interval"""
+    print("\n🧪 Testing multicast temperature broadcast")
+
+    port = free_udp_port()
+    monitor = CountingMonitor(24.5)
+    server, loop = start_server({"interval": 0.2, "multicast": {"enabled": True, "port": port}}, monitor)
+    listeners = [TemperatureMonitor({"source": "multicast", "multicast_port": port, "max_age": 5})
+                 for _ in range(5)]
+
+    # Foreign traffic on the group is ignored
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(b"not a reading", ("239.255.48.91", port))
+
+    readings = [listener.get_temperature() for listener in listeners]
+    print(f"✅ {len(listeners)} listeners read {readings[0]}°C, {monitor.reads} sensor read(s), "
+          f"{server.stats['broadcasts']} broadcast(s)")
+    assert readings == [24.5] * 5
+    assert server.stats["connections"] == 0  # Nobody polled the server
+
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=5)
+    for listener in listeners:
+        listener.close()
+
+def main():
+    """Run all tests"""
+    test_many_clients_one_sensor_read()
+    test_connection_limit_and_stale_value()
+    test_multicast_broadcast()
+    print("\n🎉 Sensor server tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
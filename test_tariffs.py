@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the date-versioned tariff engine and holiday calendar
+"""
+
+import sys
+import json
+import time
+import logging
+from datetime import datetime, date
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import RatePeriod, TariffScheduler, ULOScheduler, holiday_dates, make_scheduler
+
+TARIFFS = str(script_dir / "tariffs.json")
+
+def test_ontario_holidays():
+    """Test holiday rules, including weekend holidays moved to the next weekday"""
+    print("🧪 Testing Ontario holiday calendar")
+
+    rules = json.load(open(TARIFFS))["holidays"]["ontario"]
+    holidays_2025 = holiday_dates(rules, 2025)
+    assert {date(2025, 2, 17), date(2025, 4, 18), date(2025, 5, 19), date(2025, 8, 4),
+            date(2025, 10, 13), date(2025, 12, 25), date(2025, 12, 26)} <= holidays_2025
+    assert len(holidays_2025) == 10
+
+    # Christmas on Saturday, Boxing Day on Sunday -> Monday and Tuesday
+    holidays_2027 = holiday_dates(rules, 2027)
+    assert date(2027, 12, 27) in holidays_2027 and date(2027, 12, 28) in holidays_2027
+    # Canada Day on Saturday -> Monday
+    assert date(2023, 7, 3) in holiday_dates(rules, 2023)
+    print(f"✅ 2025: {', '.join(f'{d:%b %d}' for d in sorted(holidays_2025))}")
+
+def test_ulo_versions_and_holidays():
+    """Test that ULO rates roll over on their effective date and holidays bill as off-peak"""
+    print("\n🧪 Testing ULO plan versions")
+
+    ulo = TariffScheduler.from_file(TARIFFS, "ulo")
+    cases = [
+        (datetime(2025, 10, 31, 18, 0), RatePeriod.ON_PEAK, 28.4),          # Last day of the old rates
+        (datetime(2025, 11, 3, 18, 0), RatePeriod.ON_PEAK, 39.1),           # New rates
+        (datetime(2025, 11, 3, 2, 0), RatePeriod.ULTRA_LOW, 3.9),
+        (datetime(2025, 12, 25, 18, 0), RatePeriod.WEEKEND_OFF_PEAK, 9.8),  # Christmas (Thursday)
+        (datetime(2025, 12, 25, 23, 30), RatePeriod.ULTRA_LOW, 3.9),
+    ]
+    for dt, period, rate in cases:
+        actual = ulo.period_at(dt)
+        print(f"✅ {dt:%a %Y-%m-%d %H:%M} | {actual.value:18} | {ulo.get_rate(actual, dt)}¢/kWh")
+        assert actual == period and ulo.get_rate(actual, dt) == rate
+
+    assert ulo.next_transition(datetime(2025, 10, 31, 18, 0)) == datetime(2025, 10, 31, 21, 0)
+    assert ulo.last_transition(datetime(2025, 11, 4, 3, 0)) == datetime(2025, 11, 3, 23, 0)
+    # Christmas Eve mid-peak runs straight into the holiday's ultra-low night
+    assert ulo.next_transition(datetime(2025, 12, 24, 22, 0)) == datetime(2025, 12, 24, 23, 0)
+    assert ulo.next_transition(datetime(2025, 12, 24, 23, 30)) == datetime(2025, 12, 25, 7, 0)
+    assert ulo.cheapest_period == RatePeriod.ULTRA_LOW
+
+def test_tou_seasons_and_tiered():
+    """Test TOU winter/summer schedules and the flat tiered plan"""
+    print("\n🧪 Testing TOU seasons and tiered plan")
+
+    tou = TariffScheduler.from_file(TARIFFS, "tou")
+    assert tou.period_at(datetime(2025, 7, 15, 12, 0)) == RatePeriod.ON_PEAK    # Summer midday
+    assert tou.period_at(datetime(2026, 1, 13, 12, 0)) == RatePeriod.MID_PEAK   # Winter midday
+    assert tou.period_at(datetime(2026, 1, 13, 8, 0)) == RatePeriod.ON_PEAK     # Winter morning
+    assert tou.period_at(datetime(2026, 1, 17, 12, 0)) == RatePeriod.OFF_PEAK   # Saturday
+    assert tou.get_rate(RatePeriod.ON_PEAK, datetime(2026, 1, 13)) == 20.3
+    assert tou.cheapest_period == RatePeriod.OFF_PEAK
+    print("✅ TOU winter/summer schedules")
+
+    tiered = TariffScheduler.from_file(TARIFFS, "tiered")
+    assert tiered.period_at(datetime(2026, 1, 13, 18, 0)) == RatePeriod.OFF_PEAK
+    assert tiered.get_rate(RatePeriod.OFF_PEAK, datetime(2026, 1, 13)) == 12.0
+    assert tiered.tier2(date(2026, 1, 1)) == (14.1, 1000)
+    assert tiered.tier2(date(2026, 7, 1)) == (14.1, 600)
+    print("✅ Tiered plan with seasonal tier-2 thresholds")
+
+def test_compiled_lookup_speed():
+    """Test that lookups stay fast, including outside the initially compiled years"""
+    ulo = TariffScheduler.from_file(TARIFFS, "ulo")
+    assert ulo.period_at(datetime(2031, 6, 2, 17, 0)) == RatePeriod.ON_PEAK  # Compiles further years
+
+    started = time.perf_counter()
+    for hour in range(100_000):
+        ulo.period_at(datetime(2026, 1, 1 + hour % 28, hour % 24, 30))
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ 100,000 lookups over {len(ulo._intervals):,} intervals in {elapsed * 1000:.0f} ms")
+    assert elapsed < 2.0
+
+def test_plan_or_fixed_rates():
+    """Test that a plan wins over a fixed "rates" section, with a warning, and null selects the rates"""
+    print("\n🧪 Testing plan and fixed rates")
+
+    rates = {"ultra_low": 1.0, "weekend_off_peak": 2.0, "mid_peak": 3.0, "on_peak": 4.0}
+    warnings = []
+    handler = logging.Handler(logging.WARNING)
+    handler.emit = warnings.append
+    logging.getLogger().addHandler(handler)
+    try:
+        planned = make_scheduler({"tariff": {"plan": "ulo", "file": TARIFFS}, "rates": rates})
+        assert isinstance(planned, TariffScheduler) and len(warnings) == 1
+        assert "rates" in warnings[0].getMessage()
+        assert make_scheduler({"tariff": {"plan": "ulo", "file": TARIFFS}}) and len(warnings) == 1
+    finally:
+        logging.getLogger().removeHandler(handler)
+
+    fixed = make_scheduler({"tariff": {"plan": None}, "rates": rates})
+    assert isinstance(fixed, ULOScheduler) and fixed.get_rate(RatePeriod.ON_PEAK) == 4.0
+    print(f"✅ {warnings[0].getMessage()}")
+
+def main():
+    """Run all tests"""
+    test_ontario_holidays()
+    test_ulo_versions_and_holidays()
+    test_tou_seasons_and_tiered()
+    test_compiled_lookup_speed()
+    test_plan_or_fixed_rates()
+    print("\n🎉 Tariff tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test miner telemetry ring buffers, rollups and polling against a stand-in xmrig API
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import XmrigApiClient
+from telemetry import TelemetryStore, TelemetryCollector, Series, sample_from_api
+
+class StandInXmrigApi(BaseHTTPRequestHandler):
+    """Serves /2/summary and /2/backends like a running xmrig"""
+
+    summary = {"uptime": 3600, "paused": False,
+               "hashrate": {"total": [None, 4210.5, 4180.0], "threads": [[700.0]] * 6},
+               "results": {"shares_good": 120, "shares_total": 123}}
+    backends = [{"type": "cpu", "enabled": True, "threads": [{}] * 6},
+                {"type": "opencl", "enabled": False, "threads": [{}] * 2}]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = {"/2/summary": self.summary, "/2/backends": self.backends}.get(self.path)
+        data = json.dumps(body).encode()
+        self.send_response(200 if body is not None else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def sample(hashrate, accepted, rejected=0, uptime=100):
+    return {"hashrate": hashrate, "accepted": accepted, "rejected": rejected, "threads": 4, "uptime": uptime}
+
+def test_ring_buffer_bounded():
+    """Test that a series keeps only the newest rows and queries them in order"""
+    print("🧪 Testing ring buffer")
+
+    series = Series(5)
+    for t in range(12):
+        series.append(float(t), {"hashrate": t * 10.0})
+    rows = series.query()
+    assert rows["time"] == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert series.query(since=9, until=11)["hashrate"] == [90.0, 100.0]
+    assert series.latest()["hashrate"] == 110.0
+    print("✅ 12 appends into 5 slots kept rows 7-11")
+
+def test_rollups_and_share_deltas():
+    """Test minute/hour rollups and share counters across a miner restart"""
+    print("\n🧪 Testing rollups")
+
+    store = TelemetryStore(raw_samples=10)
+    start = 1_700_000_400.0  # On an hour boundary
+    accepted = 0
+    for i in range(180):  # 30 minutes of 10s samples, restart after 15 minutes
+        accepted = accepted + 1 if i != 90 else 2
+        store.add(sample(1000.0 + i % 6, accepted, uptime=(i % 90) * 10 + 10), start + i * 10)
+
+    minutes = store.series("minute").query()
+    assert len(minutes["time"]) == 30 and minutes["samples"][0] == 6
+    assert minutes["hashrate"][0] == 1002.5
+    # 89 increments before the restart, then 2 + 89 after it
+    assert sum(minutes["accepted"]) == 89 + 2 + 89
+    assert len(store.raw) == 10
+
+    hour = store.summary(3600, now=start + 1800)
+    print(f"✅ 30 min: {hour['hashrate']:.1f} H/s, {hour['accepted']:.0f} shares")
+    assert hour["accepted"] == 180 and len(store.series("hour").query()["time"]) == 1
+
+def test_collector_with_stand_in_api():
+    """Test polling the API and persisting history between cron runs"""
+    print("\n🧪 Testing collector against a stand-in xmrig API")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInXmrigApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            config = {"file": os.path.join(work_dir, "telemetry.bin"), "minute_samples": 100}
+            client = XmrigApiClient("127.0.0.1", server.server_address[1])
+            collector = TelemetryCollector(config, client)
+            first = collector.poll()
+            assert first == {"hashrate": 4210.5, "accepted": 120.0, "rejected": 3.0, "threads": 6.0,
+                             "uptime": 3600.0}
+            collector.save()
+            assert os.listdir(work_dir) == ["telemetry.bin"]  # Written through a temporary file, now gone
+
+            StandInXmrigApi.summary = dict(StandInXmrigApi.summary, uptime=3610,
+                                           results={"shares_good": 125, "shares_total": 128})
+            next_run = TelemetryCollector(config, client)
+            next_run.poll()
+            summary = next_run.summary(600)
+            assert len(next_run.query("raw")["time"]) == 2
+            assert summary["accepted"] == 5 and summary["rejected"] == 0
+            print(f"✅ {summary['hashrate']:.1f} H/s, +{summary['accepted']:.0f} shares across runs")
+
+            unreachable = TelemetryCollector(config, XmrigApiClient("127.0.0.1", 1, timeout=0.2))
+            assert unreachable.poll() is None
+    finally:
+        server.shutdown()
+
+    assert sample_from_api({"paused": True, "hashrate": {"total": [900.0]}})["hashrate"] == 0.0
+
+def test_cli_needs_config():
+    """Test that the query tool fails on a missing config instead of writing a default one"""
+    print("\n🧪 Testing the telemetry CLI without a config")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run([sys.executable, str(script_dir / "telemetry.py")], cwd=work_dir,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 1 and "Cannot read config" in result.stderr
+        assert os.listdir(work_dir) == []
+        print("✅ Exited with an error, nothing written")
+
+def main():
+    """Run all tests"""
+    test_ring_buffer_bounded()
+    test_rollups_and_share_deltas()
+    test_collector_with_stand_in_api()
+    test_cli_needs_config()
+    print("\n🎉 Telemetry tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the shared on-disk temperature cache
+"""
+
+import os
+import sys
+import stat
+import time
+import json
+import tempfile
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import TemperatureCache
+
+class CountingSensor:
+    """Stand-in sensor that counts how often it is read"""
+
+    def __init__(self, value: float = 22.5, delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.reads = 0
+
+    def __call__(self):
+        time.sleep(self.delay)
+        self.reads += 1
+        return self.value
+
+def test_fresh_reading_shared():
+    """Test that instances sharing the cache file read the sensor once per TTL"""
+    print("🧪 Testing shared temperature cache")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = {"file": os.path.join(work_dir, "temp.json"), "ttl": 60, "max_stale": 600}
+        sensor = CountingSensor()
+        first = TemperatureCache(config, "socket:host:48910:0.0", sensor)
+        second = TemperatureCache(config, "socket:host:48910:0.0", sensor)
+
+        assert first.get().value == 22.5
+        reading = second.get()
+        print(f"✅ Second instance served {reading.value}°C ({reading.age:.1f}s old), {sensor.reads} sensor read")
+        assert sensor.reads == 1
+
+        # A different source must not reuse the reading
+        other = TemperatureCache(config, "http:http://x:0.0", CountingSensor(30.0))
+        assert other.get().value == 30.0
+
+def test_stale_while_revalidate():
+    """Test that a stale reading is served immediately while a refresh runs"""
+    print("\n🧪 Testing stale-while-revalidate")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "temp.json")
+        with open(path, "w") as f:
+            json.dump({"key": "k", "value": 21.0, "timestamp": time.time() - 120, "source": "k"}, f)
+
+        sensor = CountingSensor(value=24.0, delay=0.3)
+        cache = TemperatureCache({"file": path, "ttl": 60, "max_stale": 600}, "k", sensor)
+
+        started = time.perf_counter()
+        reading = cache.get()
+        elapsed = time.perf_counter() - started
+        print(f"✅ Served stale {reading.value}°C ({reading.age:.0f}s old) in {elapsed * 1000:.1f} ms")
+        assert reading.value == 21.0 and reading.age >= 120
+        assert elapsed < 0.2
+
+        cache._refresh_thread.join()
+        assert cache.get().value == 24.0
+        print("✅ Background refresh published the new reading")
+
+        # Too old to serve: blocking refresh
+        with open(path, "w") as f:
+            json.dump({"key": "k", "value": 21.0, "timestamp": time.time() - 3600, "source": "k"}, f)
+        assert cache.get().value == 24.0
+
+def test_planted_symlinks():
+    """Test that symlinks planted at the lock and cache paths are never written through"""
+    print("\n🧪 Testing planted symlinks")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        victim = os.path.join(work_dir, "victim")
+        with open(victim, "w") as f:
+            f.write("precious")
+        path = os.path.join(work_dir, "temp.json")
+        os.symlink(victim, f"{path}.lock")
+
+        cache = TemperatureCache({"file": path}, "k", CountingSensor(23.0))
+        assert cache.get().value == 23.0  # Read uncached
+        assert open(victim).read() == "precious" and not os.path.exists(path)
+
+        os.unlink(f"{path}.lock")
+        os.symlink(victim, path)
+        assert cache.get().value == 23.0
+        assert open(victim).read() == "precious" and not os.path.islink(path)  # Replaced, not followed
+        assert stat.S_IMODE(os.stat(f"{path}.lock").st_mode) == 0o600
+        assert sorted(os.listdir(work_dir)) == ["temp.json", "temp.json.lock", "victim"]  # No temp files left
+        print("✅ Lock opened with O_NOFOLLOW, cache replaced through an unpredictable temp file")
+
+    # Without a "file", the cache lives in a directory only this user can enter
+    default = TemperatureCache({}, "k", CountingSensor())
+    directory = os.path.dirname(default.path)
+    assert stat.S_IMODE(os.stat(directory).st_mode) & 0o077 == 0 and os.stat(directory).st_uid == os.getuid()
+    print(f"✅ Default cache directory {directory}")
+
+def main():
+    """Run all tests"""
+    test_fresh_reading_shared()
+    test_stale_while_revalidate()
+    test_planted_symlinks()
+    print("\n🎉 Temperature cache tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test parallel multi-source temperature fusion with stand-in socket sensors
+"""
+
+import sys
+import time
+import socket
+import threading
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import TemperatureMonitor
+
+def start_sensor(reply, delay: float = 0.0) -> int:
+    """Stand-in for the port-48910 sensor server; reply=None never answers"""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def serve():
+        while True:
+            conn, _ = server.accept()
+            conn.recv(16)
+            if reply is None:
+                continue  # Hold the connection open without answering
+            time.sleep(delay)
+            conn.sendall(str(reply).encode())
+            conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server.getsockname()[1]
+
+def make_monitor(ports, strategy, **fusion) -> TemperatureMonitor:
+    return TemperatureMonitor({
+        "source": "socket",
+        "socket_host": "127.0.0.1",
+        "sources": [{"name": f"sensor{i}", "socket_port": port, "timeout": 1} for i, port in enumerate(ports)],
+        "fusion": dict(strategy=strategy, deadline=0.5, outlier_threshold=3.0, **fusion)
+    })
+
+def test_fusion_strategies():
+    """Test median/max/first fusion with an outlier and a dead sensor"""
+    print("🧪 Testing multi-source temperature fusion")
+
+    ports = [start_sensor(22.0), start_sensor(23.0), start_sensor(24.0, delay=0.1),
+             start_sensor(40.0), start_sensor(None)]
+
+    for strategy, expected in (("median", 23.0), ("max", 24.0)):
+        monitor = make_monitor(ports, strategy)
+        started = time.perf_counter()
+        value = monitor.get_temperature()
+        elapsed = time.perf_counter() - started
+        print(f"✅ {strategy:6} -> {value}°C in {elapsed:.2f}s (outlier 40°C rejected, dead sensor skipped)")
+        assert value == expected
+        assert elapsed < 1.0  # Bounded by the deadline, not the 5 s socket timeout
+
+    first = make_monitor(ports, "first").get_temperature()
+    print(f"✅ first  -> {first}°C")
+    assert first is not None
+
+def test_ema_smoothing():
+    """Test that the EMA smooths consecutive fused readings"""
+    monitor = make_monitor([start_sensor(20.0), start_sensor(20.0)], "median", ema_alpha=0.5)
+    assert monitor.get_temperature() == 20.0
+    monitor.sources[0]["socket_port"] = monitor.sources[1]["socket_port"] = start_sensor(30.0)
+    assert monitor.get_temperature() == 25.0
+
+def test_hung_source():
+    """Test that a source stuck past the deadline doesn't hold on to a worker the next read needs"""
+    print("\n🧪 Testing a hung source")
+
+    monitor = make_monitor([start_sensor(None), start_sensor(20.0)], "median")
+    monitor.sources[0]["timeout"] = 3  # Still blocked when the next read starts
+    assert monitor.get_temperature() == 20.0
+    executor = monitor._executor
+    assert monitor.get_temperature() == 20.0  # The old pool's only idle worker would take the hung read
+    assert monitor._executor is not executor
+    monitor.close()
+    print("✅ New workers after a hung read")
+
+def main():
+    """Run all tests"""
+    test_fusion_strategies()
+    test_ema_smoothing()
+    test_hung_source()
+    print("\n🎉 Fusion tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Test push-based temperature sources with stand-in Home Assistant and ESPHome servers
+"""
+
+import sys
+import json
+import time
+import queue
+import base64
+import select
+import socket
+import struct
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import TemperatureMonitor
+
+TOKEN = "test-token"
+ENTITY = "sensor.living_room_temperature"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class StandInHomeAssistant:
+    """REST /api/states plus the WebSocket auth/subscribe/event flow"""
+
+    def __init__(self, state: float, last_updated: float = None):
+        self.state = state
+        self.last_updated = last_updated or time.time()
+        self.silent = False  # Stop answering, like a host that vanished without closing
+        self.updates = queue.Queue()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def push(self, state: float) -> None:
+        self.state = state
+        self.last_updated = time.time()
+        self.updates.put(state)
+
+    def _state_object(self):
+        return {"entity_id": ENTITY, "state": str(self.state),
+                "last_updated": datetime.fromtimestamp(self.last_updated, timezone.utc).isoformat()}
+
+    def _serve(self):
+        while True:
+            conn, _ = self.server.accept()
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        headers = dict(line.split(": ", 1) for line in request.decode().split("\r\n")[1:] if ": " in line)
+
+        if "Upgrade" not in headers:
+            body = json.dumps(self._state_object()).encode()
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+            conn.close()
+            return
+
+        accept = base64.b64encode(hashlib.sha1((headers["Sec-WebSocket-Key"] + WS_GUID).encode()).digest())
+        conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+        self._send(conn, {"type": "auth_required"})
+        auth = self._recv(conn)
+        if auth.get("access_token") != TOKEN:
+            self._send(conn, {"type": "auth_invalid", "message": "Invalid access token"})
+            return conn.close()
+        self._send(conn, {"type": "auth_ok"})
+
+        subscribe = self._recv(conn)
+        self._send(conn, {"id": subscribe["id"], "type": "result", "success": True, "result": None})
+        while True:
+            if select.select([conn], [], [], 0.01)[0]:
+                message = self._recv(conn)
+                if message is None:
+                    return conn.close()
+                if message.get("type") == "ping" and not self.silent:
+                    self._send(conn, {"id": message["id"], "type": "pong"})
+            try:
+                self.updates.get_nowait()
+            except queue.Empty:
+                continue
+            self._send(conn, {"id": subscribe["id"], "type": "event", "event": {
+                "variables": {"trigger": {"platform": "state", "entity_id": ENTITY,
+                                          "to_state": self._state_object()}}}})
+
+    @staticmethod
+    def _send(conn, message):
+        payload = json.dumps(message).encode()
+        header = bytes([0x81, len(payload)]) if len(payload) < 126 else \
+            bytes([0x81, 126]) + struct.pack("!H", len(payload))
+        conn.sendall(header + payload)
+
+    @staticmethod
+    def _recv(conn):
+        def exact(size):
+            data = b""
+            while len(data) < size:
+                data += conn.recv(size - len(data))
+            return data
+
+        first, second = exact(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", exact(2))[0]
+        mask = exact(4)
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(exact(length)))
+        return None if first & 0x0F == 0x8 else json.loads(payload)  # None for a close frame
+
+class StandInESPHomeEvents(BaseHTTPRequestHandler):
+    """ESPHome web_server /events stream emitting two state events"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for sensor_id, value in (("sensor-outdoor", 5.0), ("sensor-room_temperature", 21.5),
+                                 ("sensor-room_temperature", 22.0)):
+            event = f"event: state\ndata: {json.dumps({'id': sensor_id, 'value': value})}\n\n".encode()
+            self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            self.wfile.flush()
+            time.sleep(0.05)
+        time.sleep(5)  # Hold the stream open
+
+def test_homeassistant_websocket():
+    """Test that a Home Assistant subscription delivers state changes without polling"""
+    print("🧪 Testing Home Assistant WebSocket source")
+
+    hass = StandInHomeAssistant(21.0)
+    monitor = TemperatureMonitor({
+        "source": "homeassistant_ws",
+        "ha_ws_url": f"ws://127.0.0.1:{hass.port}/api/websocket",
+        "homekit_token": TOKEN,
+        "entity_id": ENTITY
+    })
+    pushed = []
+    monitor.add_listener(pushed.append)
+
+    assert monitor.get_temperature() == 21.0
+    print("✅ Initial state read over REST after subscribing")
+
+    started = time.perf_counter()
+    hass.push(26.5)
+    while 26.5 not in pushed and time.perf_counter() - started < 2:
+        time.sleep(0.01)
+    print(f"✅ Pushed update seen by listener in {(time.perf_counter() - started) * 1000:.1f} ms")
+    assert 26.5 in pushed
+    assert monitor.get_temperature() == 26.5
+    monitor.close()
+
+def test_homeassistant_heartbeat():
+    """Test that pongs keep an unchanged value fresh, and a silent host is dropped and goes stale"""
+    print("\n🧪 Testing Home Assistant heartbeat")
+
+    hass = StandInHomeAssistant(21.0, last_updated=time.time() - 3600)
+    monitor = TemperatureMonitor({
+        "source": "homeassistant_ws",
+        "ha_ws_url": f"ws://127.0.0.1:{hass.port}/api/websocket",
+        "homekit_token": TOKEN,
+        "entity_id": ENTITY,
+        "heartbeat": 0.2,
+        "max_age": 1.0
+    })
+    stream = None
+    try:
+        # Unchanged for an hour, but the live subscription would have reported a change
+        time.sleep(0.7)
+        reading = monitor.get_reading()
+        assert reading.value == 21.0 and reading.age < 0.5
+        stream = monitor._streams["homeassistant_ws"]
+        assert stream.slot.connected
+        print(f"✅ Hour-old state kept current by pongs (age {reading.age:.1f}s)")
+
+        hass.silent = True
+        time.sleep(0.6)
+        assert not stream.slot.connected  # Dropped after a heartbeat without a pong
+        time.sleep(0.8)
+        assert stream.slot.get(1.0) is None
+        print("✅ Silent host dropped, its last value expired after max_age")
+    finally:
+        monitor.close()
+
+def test_esphome_events():
+    """Test that ESPHome /events updates the matching sensor only"""
+    print("\n🧪 Testing ESPHome event stream source")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInESPHomeEvents)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monitor = TemperatureMonitor({
+            "source": "esphome_events",
+            "esphome_url": f"http://127.0.0.1:{server.server_address[1]}",
+            "esphome_sensor_id": "sensor-room_temperature"
+        })
+        assert monitor.get_temperature() == 21.5
+        time.sleep(0.2)
+        assert monitor.get_temperature() == 22.0
+        print("✅ ESPHome state events tracked for sensor-room_temperature")
+        monitor.close()
+    finally:
+        server.shutdown()
+
+def main():
+    """Run all tests"""
+    test_homeassistant_websocket()
+    test_homeassistant_heartbeat()
+    test_esphome_events()
+    print("\n🎉 Temperature stream tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the thermal model: trend and learned first-order forecasts, and stopping on a forecast
+"""
+
+import sys
+import json
+import math
+import time
+import tempfile
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import ThermalModel, TemperatureReading, RatePeriod
+from decisions import ReasonCode
+from test_mining_controller import make_peakpause
+
+# A room that settles at 30°C while mining and 18°C while idle
+MINING_EQ, IDLE_EQ, K = 30.0, 18.0, 0.05
+
+def simulate_room(model: ThermalModel, hours: int = 12, start: float = 1_000_000) -> float:
+    """Alternate an hour of mining and an hour idle, one reading every 5 minutes"""
+    temp = IDLE_EQ
+    now = start
+    for step in range(hours * 12):
+        mining = (step // 12) % 2 == 0
+        model.observe(now, temp, mining)
+        equilibrium = MINING_EQ if mining else IDLE_EQ
+        temp = equilibrium + (temp - equilibrium) * math.exp(-K * 5)
+        now += 300
+    return now
+
+def test_slope_forecast():
+    """Test that the recent trend is extrapolated before anything is learned"""
+    print("🧪 Testing trend forecasts")
+
+    model = ThermalModel({"model": "slope", "horizon_minutes": 15}, {})
+    assert model.forecast(22.0, True) is None
+    for i, temp in enumerate((22.0, 22.2, 22.4, 22.6)):
+        model.observe(1000 + i * 60, temp, True)
+    model.observe(1000 + 3 * 60, 99.0, True)  # Repeated cached reading: ignored
+    assert abs(model.forecast(22.6, True) - 25.6) < 1e-9
+    assert model.forecast(22.6, False) is None  # Nothing known about idling yet
+    print(f"✅ 0.2°C/min for 15 min: {model.forecast(22.6, True):.1f}°C")
+
+def test_learned_model():
+    """Test that heating and cooling constants are learned from alternating mining and idle hours"""
+    print("\n🧪 Testing the learned first-order model")
+
+    state = {}
+    model = ThermalModel({"horizon_minutes": 15}, state)
+    simulate_room(model)
+    mining, idle = model.learned(True), model.learned(False)
+    assert abs(mining["equilibrium"] - MINING_EQ) < 0.1 and abs(idle["equilibrium"] - IDLE_EQ) < 0.1
+    assert abs(mining["k"] - K) < 0.005 and abs(idle["k"] - K) < 0.005
+
+    expected = MINING_EQ + (24.0 - MINING_EQ) * math.exp(-K * 15)
+    assert abs(model.forecast(24.0, True) - expected) < 0.1
+    json.dumps(state)  # Kept in the state file
+
+    # From 27°C, idling until mining for 15 minutes stays under 25°C
+    seconds = model.seconds_until_headroom(27.0, 25.0, 3600)
+    idle_temp = IDLE_EQ + (27.0 - IDLE_EQ) * math.exp(-K * seconds / 60)
+    assert model.forecast(model.forecast(27.0, False, seconds / 60), True) <= 25.0
+    assert abs(MINING_EQ + (idle_temp - MINING_EQ) * math.exp(-K * 15) - 25.0) < 0.1  # Close to the real room
+    assert model.seconds_until_headroom(27.0, 15.0, 3600) is None  # Never, at 30°C while mining
+    print(f"✅ Learned k={mining['k']:.3f}/min towards {mining['equilibrium']:.1f}°C mining, "
+          f"{idle['equilibrium']:.1f}°C idle; headroom from 27°C after {seconds / 60:.1f} min")
+
+def test_stop_on_forecast():
+    """Test that evaluate() stops before the threshold when mining would pass it within the horizon"""
+    print("\n🧪 Testing decisions on the forecast")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_peakpause(work_dir, {"temperature": {"thresholds": {p.value: 25.0 for p in RatePeriod}}})
+        simulate_room(controller.thermal, start=time.time() - 12 * 3600)
+        controller.temp_monitor.get_reading = lambda: TemperatureReading(24.0, time.time(), "test")
+        decision = controller.evaluate()
+        assert not decision.should_run and decision.code == ReasonCode.TOO_HOT
+        assert decision.temperature == 24.0 and decision.forecast > 25.0
+        assert "forecast" in decision.reason
+
+        controller.temp_monitor.get_reading = lambda: TemperatureReading(19.0, time.time() + 60, "test")
+        assert controller.evaluate().forecast < 25.0
+        print(f"✅ {decision.reason}")
+
+def main():
+    """Run all tests"""
+    test_slope_forecast()
+    test_learned_model()
+    test_stop_on_forecast()
+    print("\n🎉 Thermal model tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test closed-loop thread throttling against temperature headroom
+"""
+
+import os
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import ThreadThrottle
+from test_mining_controller import make_controller, make_peakpause
+
+def make_throttle(state=None) -> ThreadThrottle:
+    return ThreadThrottle({"enabled": True, "max_threads": 8, "min_change_interval": 300},
+                          state if state is not None else {})
+
+def test_throttle_tracks_headroom():
+    """Test that threads drop while over the threshold and recover with headroom"""
+    print("🧪 Testing PI thread throttle")
+
+    throttle = make_throttle()
+    now = 1_000_000.0
+    threshold = 25.0
+
+    # Plenty of headroom: stay at full threads
+    assert throttle.update(20.0, threshold, now) is None
+    assert throttle.threads == 8
+
+    # Hovering just over the threshold: step down, rate limited
+    changes = []
+    for minute in range(1, 121):
+        threads = throttle.update(25.3, threshold, now + minute * 60)
+        if threads is not None:
+            changes.append((minute, threads))
+    print(f"✅ Over threshold: {changes}")
+    assert changes and changes[-1][1] < 8
+    assert all(b[0] - a[0] >= 5 for a, b in zip(changes, changes[1:]))   # min_change_interval
+    assert all(abs(b[1] - a[1]) <= 2 for a, b in zip(changes, changes[1:]))  # max_step
+    assert throttle.threads >= 1
+
+    # Room cools down: threads come back
+    low = throttle.threads
+    for minute in range(121, 241):
+        throttle.update(21.0, threshold, now + minute * 60)
+    print(f"✅ Recovered from {low} to {throttle.threads} threads")
+    assert throttle.threads == 8
+
+def test_throttle_state_survives_cron_runs():
+    """Test that throttle state is carried in the persisted state dict"""
+    state = {}
+    make_throttle(state).update(26.0, 25.0, 1000.0)
+    restored = make_throttle(json.loads(json.dumps(state)))
+    assert restored.state["last_update"] == 1000.0
+    assert restored.state["integral"] == state["integral"]
+
+def test_apply_trims_rx_profile():
+    """Test that applying a thread count trims xmrig's RandomX thread list"""
+    print("\n🧪 Testing thread limit written to xmrig config")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_controller(work_dir)
+        with open(controller.config_file, "w") as f:
+            json.dump({"cpu": {"rx": [0, 1, 2, 3, 4, 5, 6, 7]}, "watch": True}, f)
+        os.chmod(controller.config_file, 0o640)
+
+        throttle = make_throttle()
+        assert throttle.apply(3, controller)
+        assert json.load(open(controller.config_file))["cpu"]["rx"] == [0, 1, 2]
+        assert os.stat(controller.config_file).st_mode & 0o777 == 0o640
+        assert not [name for name in os.listdir(work_dir) if name.startswith(".")]  # No temporary file left
+        assert throttle.apply(8, controller)
+        assert json.load(open(controller.config_file))["cpu"]["rx"] == list(range(8))
+        print("✅ rx profile trimmed and restored")
+
+def test_restore_xmrig_threads():
+    """Test that the saved thread list or hint goes back into xmrig's config when throttling is turned off"""
+    print("\n🧪 Testing xmrig's own thread configuration restored")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_controller(work_dir)
+        with open(controller.config_file, "w") as f:
+            json.dump({"cpu": {"enabled": True}}, f)
+        throttle = make_throttle()
+        assert throttle.apply(4, controller)
+        assert json.load(open(controller.config_file))["cpu"]["max-threads-hint"] == 50
+        assert throttle.restore(controller)
+        assert json.load(open(controller.config_file)) == {"cpu": {"enabled": True}}
+        assert "threads_hint" not in throttle.state and throttle.threads == 8
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        peakpause = make_peakpause(work_dir, {"throttle": {"enabled": True, "max_threads": 8}})
+        xmrig_config_file = peakpause.mining_controller.config_file
+        with open(xmrig_config_file, "w") as f:
+            json.dump({"cpu": {"rx": list(range(8))}}, f)
+        assert peakpause.throttle.apply(3, peakpause.mining_controller)
+
+        with open(peakpause.config_file) as f:
+            config = json.load(f)
+        config["throttle"]["enabled"] = False
+        with open(peakpause.config_file, "w") as f:
+            json.dump(config, f)
+        assert peakpause.reload_config() and peakpause.throttle is None
+        assert json.load(open(xmrig_config_file))["cpu"]["rx"] == list(range(8))
+        assert "rx_profile" not in peakpause.state["throttle"]
+        print("✅ Thread hint removed, rx profile put back after disabling the throttle")
+
+def main():
+    """Run all tests"""
+    test_throttle_tracks_headroom()
+    test_throttle_state_survives_cron_runs()
+    test_apply_trims_rx_profile()
+    test_restore_xmrig_threads()
+    print("\n🎉 Throttle tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,7 +11,7 @@ from datetime import datetime, timedelta
 script_dir = Path(__file__).parent.absolute()
 sys.path.insert(0, str(script_dir))
 
-from peakpause import PeakPause, RatePeriod
+from peakpause import PeakPause, RatePeriod, ULOScheduler, ULORates
 
 def test_periods_without_temperature():
     """Test mining decisions during different periods without temperature sensor"""
@@ -100,6 +100,48 @@ def test_weekend_preference():
     else:
         print("\n⚠️  Some weekend periods were not blocked")
 
+def test_weekly_table_transitions():
+    """Test the compiled weekly table and next-transition lookup"""
+    print("\n📅 Weekly Tariff Table Test")
+    print("=" * 50)
+    
+    scheduler = ULOScheduler(ULORates())
+    
+    # (time, expected period, expected next change)
+    cases = [
+        (datetime(2025, 9, 1, 6, 59), RatePeriod.ULTRA_LOW, datetime(2025, 9, 1, 7, 0)),       # Monday early
+        (datetime(2025, 9, 1, 7, 0), RatePeriod.MID_PEAK, datetime(2025, 9, 1, 16, 0)),
+        (datetime(2025, 9, 1, 18, 30), RatePeriod.ON_PEAK, datetime(2025, 9, 1, 21, 0)),
+        (datetime(2025, 9, 1, 22, 15), RatePeriod.MID_PEAK, datetime(2025, 9, 1, 23, 0)),
+        (datetime(2025, 9, 5, 23, 30), RatePeriod.ULTRA_LOW, datetime(2025, 9, 6, 7, 0)),      # Friday night
+        (datetime(2025, 9, 6, 12, 0), RatePeriod.WEEKEND_OFF_PEAK, datetime(2025, 9, 6, 23, 0)),
+        (datetime(2025, 9, 7, 23, 0), RatePeriod.ULTRA_LOW, datetime(2025, 9, 8, 7, 0)),       # Wraps past Sunday
+    ]
+    
+    for test_time, expected_period, expected_change in cases:
+        period = scheduler.period_at(test_time)
+        change = scheduler.next_transition(test_time)
+        ok = period == expected_period and change == expected_change
+        status_icon = "✅" if ok else "❌"
+        print(f"{status_icon} {test_time:%a %H:%M} | {period.value:18} | next change {change:%a %H:%M}")
+        assert ok
+    
+    # Segments cover the range exactly and alternate periods
+    start, end = datetime(2025, 9, 1, 0, 0), datetime(2025, 9, 8, 0, 0)
+    segments = scheduler.periods_between(start, end)
+    assert segments[0][0] == start and segments[-1][1] == end
+    assert all(a[1] == b[0] and a[2] != b[2] for a, b in zip(segments, segments[1:]))
+    
+    ulo_hours = sum((seg_end - seg_start).total_seconds() / 3600
+                    for seg_start, seg_end, period in segments if period == RatePeriod.ULTRA_LOW)
+    print(f"✅ {len(segments)} segments in one week, {ulo_hours:.0f} ultra-low hours")
+    assert ulo_hours == 7 * 8
+    
+    # Period starts, including an ultra-low run that began the previous day
+    assert scheduler.last_transition(datetime(2025, 9, 2, 3, 10)) == datetime(2025, 9, 1, 23, 0)
+    assert scheduler.last_transition(datetime(2025, 9, 8, 0, 30)) == datetime(2025, 9, 7, 23, 0)
+    assert scheduler.last_transition(datetime(2025, 9, 1, 16, 0)) == datetime(2025, 9, 1, 16, 0)
+
 def main():
     """Run all tests"""
     print("🔋 PeakPause ULO Logic Test Suite")
@@ -110,6 +152,7 @@ def main():
         test_periods_without_temperature()
         test_ultra_low_preference()
         test_weekend_preference()
+        test_weekly_table_transitions()
         
         print("\n" + "=" * 60)
         print("💡 Key Logic:")
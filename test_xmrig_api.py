@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test pause/resume through the xmrig HTTP API with a local stand-in server
+"""
+
+import sys
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from peakpause import MiningController, PeakPause, TemperatureReading
+from test_mining_controller import make_controller, make_peakpause
+
+TOKEN = "test-token"
+
+class StandInXmrigApi(BaseHTTPRequestHandler):
+    """Implements the parts of the xmrig HTTP API that PeakPause uses"""
+
+    state = {"paused": False, "calls": []}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        return self.headers.get("Authorization") == f"Bearer {TOKEN}"
+
+    def do_GET(self):
+        if not self._authorized():
+            return self._reply(401, {"error": "Unauthorized"})
+        if self.path == "/2/summary":
+            return self._reply(200, {"paused": self.state["paused"]})
+        self._reply(404, {"error": "Not Found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return self._reply(401, {"error": "Unauthorized"})
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.state["calls"].append(request["method"])
+        if request["method"] in ("pause", "resume"):
+            self.state["paused"] = request["method"] == "pause"
+            return self._reply(200, {"id": request["id"], "jsonrpc": "2.0", "result": "OK"})
+        self._reply(200, {"id": request["id"], "jsonrpc": "2.0", "error": {"code": -32601}})
+
+def start_stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInXmrigApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def make_api_controller(work_dir: str, port: int) -> MiningController:
+    """Stand-in miner whose xmrig config enables the HTTP API on port"""
+    controller = make_controller(work_dir)
+    with open(controller.config_file, "w") as f:
+        json.dump({"http": {"enabled": True, "host": "127.0.0.1", "port": port,
+                            "access-token": TOKEN, "restricted": False}}, f)
+    return MiningController(dict(controller.config, control_mode="api"))
+
+def test_pause_resume_keeps_process():
+    """Test that stop/start pause and resume the same xmrig process"""
+    print("🧪 Testing xmrig API pause/resume")
+
+    server = start_stand_in_server()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            controller = make_api_controller(work_dir, server.server_address[1])
+            assert controller.start_mining()
+            pid = controller.process_pid
+
+            assert controller.stop_mining()
+            assert controller.is_running() and not controller.is_mining()
+            assert StandInXmrigApi.state["paused"]
+            print(f"✅ Paused PID {pid} without killing it")
+
+            # The next cron run sees the paused state from the pidfile
+            next_run = make_api_controller(work_dir, server.server_address[1])
+            assert next_run.get_mining_pid() == pid and next_run.paused
+
+            assert next_run.start_mining()
+            assert next_run.is_mining() and next_run.process_pid == pid
+            assert not StandInXmrigApi.state["paused"]
+            print(f"✅ Resumed PID {pid} via API")
+
+            next_run.terminate_mining()
+            controller.get_mining_pid()  # reap our child
+    finally:
+        server.shutdown()
+
+def test_api_unreachable_falls_back_to_kill():
+    """Test that an unreachable API falls back to stopping the process"""
+    print("\n🧪 Testing kill fallback when the API is down")
+
+    server = start_stand_in_server()
+    port = server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller = make_api_controller(work_dir, port)
+        controller.start_mining()
+        assert controller.stop_mining()
+        assert not controller.is_running()
+        print("✅ Miner stopped with kill fallback")
+
+def test_resumes_skip_restart_budget():
+    """Test that resuming a paused miner isn't held by the minimum off time or charged to the restart budget"""
+    print("\n🧪 Testing the flap guard with API resumes")
+
+    server = start_stand_in_server()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            # Room for one launch per hour, and none within 10 minutes of a stop
+            controller = make_peakpause(work_dir, {"hysteresis": {"min_run_seconds": 0, "min_off_seconds": 600,
+                                                                  "restart_budget_seconds": 30}})
+            controller.mining_controller = make_api_controller(work_dir, server.server_address[1])
+            ulo = datetime(2025, 9, 3, 2, 0)  # Mined below 30°C
+            controller.evaluate = lambda dt=None: PeakPause.evaluate(controller, dt or ulo)
+            reading = {"value": 18.0}
+            controller.temp_monitor.get_reading = lambda: TemperatureReading(reading["value"], time.time(), "test")
+            try:
+                for temp in (18.0, 40.0, 18.0, 40.0, 18.0):
+                    reading["value"] = temp
+                    controller.run_once()
+                    assert controller.mining_controller.is_mining() == (temp < 30.0), temp
+                assert len(controller.guard.state["starts"]) == 1 and controller.guard.state["flaps"] == 4
+            finally:
+                controller.mining_controller.terminate_mining()
+        print("✅ 1 launch and 2 resumes in a budget of one")
+    finally:
+        server.shutdown()
+
+def main():
+    """Run all tests"""
+    test_pause_resume_keeps_process()
+    test_api_unreachable_falls_back_to_kill()
+    test_resumes_skip_restart_budget()
+    print("\n🎉 xmrig API tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test xmrig log parsing, incremental reads and size-based rotation
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+from pathlib import Path
+
+# Add the script directory to path
+script_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(script_dir))
+
+from xmrig_log import LogTailer, parse_line
+
+SAMPLE = [
+    "[2025-09-01 23:00:15.123]  miner    speed 10s/60s/15m 4210.5 4180.0 n/a H/s max 4300.1 H/s",
+    "[2025-09-01 23:00:16.500]  cpu      accepted (12/0) diff 120001 (35 ms)",
+    "[2025-09-01 23:00:17.000]  cpu      rejected (12/1) diff 120001 \"Low difficulty share\" (41 ms)",
+    "[2025-09-01 23:00:18.000]  net      pool.example.com:3333 read error: \"end of file\"",
+    "[2025-09-01 23:00:19.000]  net      new job from pool.example.com:3333 diff 120001 algo rx/0 height 3000000",
+]
+
+def test_parse_lines():
+    """Test that speed, share and error lines become events, with or without colors"""
+    print("🧪 Testing xmrig log line parsing")
+
+    events = [parse_line(line) for line in SAMPLE]
+    assert events[0].kind == "speed" and events[0].data["hashrate"] == 4210.5 and events[0].data["15m"] is None
+    assert events[1].kind == "accepted" and events[1].data == {"accepted": 12, "rejected": 0,
+                                                              "difficulty": 120001, "latency_ms": 35}
+    assert events[2].kind == "rejected" and events[2].data["reason"] == "Low difficulty share"
+    assert events[3].kind == "error" and events[3].module == "net"
+    assert events[4] is None
+
+    colored = "\x1b[1;37m[2025-09-01 23:00:15.123]\x1b[0m  \x1b[44m miner \x1b[0m   speed 10s/60s/15m " \
+              "\x1b[1;36m4210.5\x1b[0m \x1b[0;36m4180.0\x1b[0m \x1b[0;36mn/a\x1b[0m H/s max \x1b[1;36m4300.1 H/s\x1b[0m"
+    assert parse_line(colored).data["hashrate"] == 4210.5
+    print(f"✅ {sum(e is not None for e in events)} events from {len(SAMPLE)} lines")
+
+def test_incremental_reads():
+    """Test that each read returns only new complete lines, across runs and truncation"""
+    print("\n🧪 Testing incremental reads")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "xmrig.log")
+        state = {}
+        with open(log_file, "w") as f:
+            f.write("x" * 100000 + "\n" + SAMPLE[0] + "\n")
+        # First sight of a big log: only its tail is read, starting at a line boundary
+        assert LogTailer(log_file, state).read_lines() == [SAMPLE[0]]
+
+        with open(log_file, "a") as f:
+            f.write(SAMPLE[1] + "\n" + SAMPLE[2][:20])
+        next_run = LogTailer(log_file, state)  # State survives between cron runs
+        assert next_run.read_lines() == [SAMPLE[1]]
+        with open(log_file, "a") as f:
+            f.write(SAMPLE[2][20:] + "\n")
+        assert next_run.read_lines() == [SAMPLE[2]]
+        assert next_run.read_lines() == []
+
+        os.truncate(log_file, 0)
+        with open(log_file, "a") as f:
+            f.write(SAMPLE[3] + "\n")
+        assert next_run.read_lines() == [SAMPLE[3]]
+        print(f"✅ Offset {state['offset']} after truncation")
+
+def test_rotation():
+    """Test that the log is gzipped and truncated in place once it passes max_bytes"""
+    print("\n🧪 Testing size-based rotation")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "xmrig.log")
+        state = {}
+        tailer = LogTailer(log_file, state, {"max_bytes": 1000, "backup_count": 2})
+        with open(log_file, "a") as xmrig_stdout:  # Opened like MiningController opens it
+            for rotation in range(3):
+                for line in SAMPLE * 4:
+                    xmrig_stdout.write(line + "\n")
+                xmrig_stdout.flush()
+                if rotation == 0:  # As --test does: nothing moves or rotates
+                    assert len(tailer.peek_events()) == 16 and "offset" not in state
+                    assert os.path.getsize(log_file) > 1000
+                events = tailer.read_events()
+                assert len(events) == 16 and os.path.getsize(log_file) == 0
+            xmrig_stdout.write(SAMPLE[0] + "\n")
+
+        assert sorted(os.listdir(work_dir)) == ["xmrig.log", "xmrig.log.1.gz", "xmrig.log.2.gz"]
+        with gzip.open(f"{log_file}.1.gz", "rt") as f:
+            assert f.read().splitlines() == SAMPLE * 4
+        with open(log_file) as f:
+            assert f.read() == SAMPLE[0] + "\n"  # O_APPEND writer continues at the new end
+        assert [e.kind for e in tailer.read_events()] == ["speed"]
+        print("✅ Rotated 3 times, 2 compressed copies kept")
+
+def main():
+    """Run all tests"""
+    test_parse_lines()
+    test_incremental_reads()
+    test_rotation()
+    print("\n🎉 xmrig log tests passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
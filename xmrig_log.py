@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Incremental xmrig log reader for PeakPause
+Reads only the bytes xmrig appended since the last run, using a byte offset and
+inode kept in the controller state, turns speed/share/error lines into events,
+and rotates the log by size (copy, gzip, truncate) so long-running rigs don't
+fill their disks.
+"""
+
+import os
+import re
+import sys
+import gzip
+import shutil
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+LINE = re.compile(r"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?)\]\s+(\S+)\s+(.*)$")
+SPEED = re.compile(r"speed 10s/60s/15m (\S+) (\S+) (\S+) H/s max (\S+)")
+READY = re.compile(r"READY threads (\d+)/(\d+)(?: \(\d+\))?(?: huge pages (\d+)%)?")
+SHARE = re.compile(r"(accepted|rejected) \((\d+)/(\d+)\) diff (\d+)(?: \"([^\"]*)\")?(?: \((\d+) ms\))?")
+ERROR = re.compile(r"\berror\b|\bfailed\b", re.IGNORECASE)
+
+# A first read of an existing log, or one that grew by more than MAX_READ since
+# the last read, skips ahead to this far from the end
+INITIAL_BACKLOG = 65536
+MAX_READ = 4194304
+
+@dataclass
+class LogEvent:
+    """One parsed xmrig log line"""
+    time: float                  # Epoch seconds from the line's timestamp
+    kind: str                    # speed, ready (threads hashing), accepted, rejected or error
+    module: str                  # xmrig subsystem: miner, cpu, net, ...
+    data: Dict[str, Any] = field(default_factory=dict)
+
+def _hashrate(value: str) -> Optional[float]:
+    return None if value == "n/a" else float(value)
+
+def parse_line(line: str) -> Optional[LogEvent]:
+    """Event for a speed, ready, share or error line; None for everything else"""
+    match = LINE.match(ANSI_ESCAPE.sub("", line).strip())
+    if match is None:
+        return None
+    timestamp, module, message = match.groups()
+    when = datetime.fromisoformat(timestamp).timestamp()
+
+    speed = SPEED.search(message)
+    if speed:
+        rates = [_hashrate(value) for value in speed.groups()]
+        return LogEvent(when, "speed", module, {"hashrate": next((r for r in rates[:3] if r is not None), None),
+                                                "10s": rates[0], "60s": rates[1], "15m": rates[2], "max": rates[3]})
+    ready = READY.search(message)
+    if ready:
+        threads, total, huge_pages = ready.groups()
+        return LogEvent(when, "ready", module, {"threads": int(threads), "total": int(total),
+                                                "huge_pages": int(huge_pages) if huge_pages else None})
+    share = SHARE.search(message)
+    if share:
+        kind, accepted, rejected, difficulty, reason, latency = share.groups()
+        data = {"accepted": int(accepted), "rejected": int(rejected), "difficulty": int(difficulty)}
+        if reason:
+            data["reason"] = reason
+        if latency:
+            data["latency_ms"] = int(latency)
+        return LogEvent(when, kind, module, data)
+    if ERROR.search(message):
+        return LogEvent(when, "error", module, {"message": message})
+    return None
+
+class LogTailer:
+    """Reads new complete lines from a log that is appended to and rotated in place
+
+    state holds {"inode", "offset"} and is saved with the controller state, so
+    each cron run only reads what xmrig wrote since the previous run.
+    """
+
+    def __init__(self, path: str, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.path = path
+        self.state = state
+        self.max_bytes = config.get("max_bytes", 10485760)
+        self.backup_count = config.get("backup_count", 5)
+        self.compress = config.get("compress", True)
+
+    def read_lines(self) -> List[str]:
+        """Complete lines added since the last call; a trailing partial line waits for the next one"""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+
+        with f:
+            stat = os.fstat(f.fileno())
+            offset = self.state.get("offset", 0)
+            skip_partial = False
+            if self.state.get("inode") != stat.st_ino:
+                # A replaced file is read from the start, one seen for the first time from near its end
+                offset = 0 if "inode" in self.state else max(0, stat.st_size - INITIAL_BACKLOG)
+                skip_partial = offset > 0
+            elif stat.st_size < offset:
+                offset = 0  # Truncated by a rotation
+            if stat.st_size - offset > MAX_READ:
+                offset = stat.st_size - INITIAL_BACKLOG
+                skip_partial = True
+            f.seek(offset)
+            data = f.read(stat.st_size - offset)
+
+        start = data.find(b"\n") + 1 if skip_partial else 0
+        end = data.rfind(b"\n") + 1
+        self.state.update(inode=stat.st_ino, offset=offset + end)
+        return data[start:end].decode(errors="replace").splitlines() if end > start else []
+
+    def read_events(self) -> List[LogEvent]:
+        """Parsed events from the new lines, rotating the log afterwards if it is too big"""
+        events = [event for event in map(parse_line, self.read_lines()) if event is not None]
+        if self.max_bytes and self.state.get("offset", 0) >= self.max_bytes:
+            self.rotate()
+        return events
+
+    def peek_events(self) -> List[LogEvent]:
+        """Parsed events from the new lines, leaving the offset and the log as they are for the next read"""
+        lines = LogTailer(self.path, dict(self.state)).read_lines()
+        return [event for event in map(parse_line, lines) if event is not None]
+
+    def _backup(self, n: int) -> str:
+        return f"{self.path}.{n}{'.gz' if self.compress else ''}"
+
+    def rotate(self) -> None:
+        """Copy the log to .1(.gz), shifting older copies, then truncate it in place
+
+        xmrig keeps writing to its open file descriptor (opened with O_APPEND), so
+        copy-and-truncate works without restarting it. Lines written between the
+        copy and the truncate are lost.
+        """
+        try:
+            if self.backup_count:
+                for n in range(self.backup_count - 1, 0, -1):
+                    if os.path.exists(self._backup(n)):
+                        os.replace(self._backup(n), self._backup(n + 1))
+                with open(self.path, "rb") as src, \
+                        (gzip.open if self.compress else open)(f"{self._backup(1)}.tmp", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(f"{self._backup(1)}.tmp", self._backup(1))
+            os.truncate(self.path, 0)
+        except OSError as e:
+            logging.warning(f"Could not rotate {self.path}: {e}")
+            return
+
+        self.state["offset"] = 0
+        logging.info(f"Rotated {self.path}")
+
+def main():
+    """Print events from an xmrig log"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parse xmrig log lines into events")
+    parser.add_argument("log_file", help="xmrig log (use - for stdin)")
+    args = parser.parse_args()
+
+    lines = sys.stdin if args.log_file == "-" else open(args.log_file, errors="replace")
+    for line in lines:
+        event = parse_line(line)
+        if event is not None:
+            print(f"{datetime.fromtimestamp(event.time):%Y-%m-%d %H:%M:%S} {event.kind:8} {event.data}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())